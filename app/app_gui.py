@@ -1,26 +1,36 @@
 import tkinter as tk
 from tkinter import filedialog, messagebox, Menu, simpledialog, ttk
-from test_definitions import Eth0Test, USBTest, RTCTest, XbeeTest, BatteryTest, RelayTest, SIMTest, BLETest, WiFiTest  # Importing our test classes
+from test_definitions import TESTS, Eth0Test, XbeeTest, WiFiTest  # Importing our test classes
 from excel_writer import append_test_results, get_next_available_mac
 from label_create import create_label
 import os
 import subprocess
 import configparser
+import ipaddress
 from appdirs import user_config_dir
 from help_gui import HelpCenter
 from _version import __version__
 from mac_generator import MACGeneratorFrame
+from station_gui import StationFrame
+from station import make_tester
+from test_scheduler import RunAllScheduler, TERMINAL_STATE
 from log import logger,initialize_logging # Custom logging setup
+from metrics import metrics
 from serial_autoconnect import SerialAutoConnector
-# import re
-import time
+from serial_expect import SerialExpect
+from uboot_tester import UBOOT_PROMPT, AUTOBOOT_STOP_KEY, TestAborted
+from boot_tracker import BootTracker
+from terminal_state import TerminalStateMonitor
+from console_session import ConsoleSession
+from log_sink import TkLogSink
+import re
+import sys
+import queue
+import threading
 
 # Global configurations
-patter_state = 0;
-OPENWRT_PROMPT = "esp32_sdio_c5: print_capabilities"
-OPENWRT_PROMPT_2 = "nuc980-emac0 b0012000.emac0: eth0 is"
-# UBOOT_PROMPT = "Hit any key to stop autoboot"       # old prompt
-UBOOT_PROMPT = "Autoboot in 1 seconds"               # new prompt
+# A terminal state the console showed this recently is trusted without probing (seconds)
+TERMINAL_STATE_MAX_AGE = 5.0
 # Load configuration file
 cfg = configparser.ConfigParser()
 path = os.path.join(user_config_dir("IGTestApp","ECSI"), "settings.ini")
@@ -48,6 +58,12 @@ class HardwareTestApp:
             logger.error("Warning: No available MAC address found!")
 
         self.server_ip = "192.168.0.1"
+        # Ethernet qualification: minimum TFTP throughput (MB/s, 0 = DHCP check only) and server port
+        self.eth_min_mbps = 0.0
+        self.tftp_port = 69
+        # Embedded DHCP responder: first pool address ("" = lease from the LAN's server) and test NIC
+        self.dhcp_pool = ""
+        self.dhcp_interface = ""
         self.auto_advance = True
         self.print_labels = True
         # WiFi settings
@@ -61,18 +77,7 @@ class HardwareTestApp:
         # Store test results: "Pending", "PASS", or "FAIL"
         self.test_results = {}
         # Test definitions are stored here along with the reference to the test class.
-        self.tests = [
-            {"name": "Ethernet Test", "requires_input": False, "os":"uboot", "class": Eth0Test},
-            {"name": "RTC Test", "requires_input": False, "os":"uboot", "class": RTCTest},
-            {"name": "Xbee Test", "requires_input": False,  "os":"uboot","class": XbeeTest},
-            {"name": "Battery Test", "requires_input": False, "os":"uboot", "class": BatteryTest},
-            {"name": "Relay Test", "requires_input": True, "os":"uboot", "class": RelayTest},
-            {"name": "BLE Test", "requires_input": True, "os":"openwrt", "class": BLETest},
-            {"name": "WiFi Test", "requires_input": False, "os":"openwrt", "class": WiFiTest},
-            {"name": "USB Test", "requires_input": False, "os":"openwrt", "class": USBTest},
-            {"name": "SIM Test", "requires_input": False, "os":"openwrt", "class": SIMTest},
-            # {"name": "Button Test", "requires_input": False, "class": ButtonTest},
-        ]
+        self.tests = [dict(t) for t in TESTS]
         
         # Dictionary to store button widgets (for UI updates)
         self.test_buttons = {}
@@ -81,12 +86,31 @@ class HardwareTestApp:
         self.help_window = None
         # single-instance popup reference
         self.mac_window = None
+        self.station_window = None
+        # Unattended "Run All" (worker thread reports through this queue)
+        self.run_all_scheduler = None
+        self.run_all_events = queue.Queue()
+        # Single test on its worker thread: (name, tester, requires_input) and its completion events
+        self.current_test = None
+        self.test_events = queue.Queue()
+        # OpenWRT boot tracker (worker thread reports milestones through this queue)
+        self.boot_tracker = None
+        self.boot_events = queue.Queue()
         # DuT connection status 
         self.connection_status = False
         self.terminal_state = "Disconnected"  # "Disconnected", "Uboot", "Linux"
         
         # Serial connection handle (used for GUI-based serial connection monitoring)
         self.serial_conn = None
+        # Console session owning the DUT's port (lent to each test) and the GUI's own cursor on it
+        self.session = None
+        self.console_cursor = None
+        self.console = None
+        # Follows the console stream and probes it, so a DUT already at the right prompt is not rebooted
+        self.terminal_monitor = None
+        # Probe on its worker thread: (monitor, state, then) comes back through this queue
+        self.terminal_probe_pending = False
+        self.terminal_events = queue.Queue()
         
         self.create_menu()
         self.create_widgets()
@@ -129,6 +153,9 @@ class HardwareTestApp:
         # MAC Generator menu
         menu_bar.add_command(label="MAC Generator", command=self.show_mac_generator_popup)
 
+        # Multi-DUT station
+        menu_bar.add_command(label="Test Station", command=self.show_station_popup)
+
         # Help Menu
         help_menu = Menu(menu_bar, tearoff=0)        
         help_menu.add_command(label="Help Center", command=self.show_help)
@@ -150,6 +177,14 @@ class HardwareTestApp:
         # Reconnect button for manual reconnecting to the serial port.
         self.reconnect_button = tk.Button(top_frame, text="Reconnect", command=self.manual_reconnect)
         self.reconnect_button.pack(side=tk.RIGHT, padx=5, pady=5)
+
+        # Run every selected automatic test with as few reboots as possible
+        self.run_all_button = tk.Button(top_frame, text="Run All", command=self.run_all)
+        self.run_all_button.pack(side=tk.RIGHT, padx=5, pady=5)
+
+        # Abort the single test running on the worker thread
+        self.abort_button = tk.Button(top_frame, text="Abort Test", state=tk.DISABLED, command=self.abort_test)
+        self.abort_button.pack(side=tk.RIGHT, padx=5, pady=5)
         
         # Canvas for a colored circle indicator (red = disconnected, green = connected).
         self.reconnect_indicator = tk.Canvas(top_frame, width=20, height=20)
@@ -208,6 +243,8 @@ class HardwareTestApp:
         # Create a Text widget for logging:
         self.log_text = tk.Text(self.right_frame, wrap=tk.WORD, height=10, state=tk.DISABLED)
         self.log_text.pack(fill=tk.BOTH, padx=5, pady=5, expand=True)
+        # Messages are queued and drawn in batches (collapsed repeats, bounded view)
+        self.log_sink = TkLogSink(self.root, self.log_text)
 
         # Frame for pass/fail buttons for tests requiring user input.
         self.input_frame = tk.Frame(self.right_frame)
@@ -234,22 +271,12 @@ class HardwareTestApp:
         self.fail_button.pack(side=tk.LEFT, padx=5)
 
     def log_message(self, msg):
-        """Append a message to the log text widget in the GUI."""
+        """Append a message to the log view (from any thread); the full text goes to the log file."""
         logger.info(msg)
-        try:
-            self.log_text.config(state=tk.NORMAL)
-            self.log_text.insert(tk.END, msg + "\n")
-            self.log_text.see(tk.END)
-            self.log_text.config(state=tk.DISABLED)
-            # Force GUI to update
-            self.root.update_idletasks()        
-        except Exception:
-            logger.warning("Could not update GUI log widget", exc_info=True)
+        self.log_sink.write(msg)
 
     def clear_log(self):
-        self.log_text.configure(state=tk.NORMAL)
-        self.log_text.delete("1.0", tk.END)
-        self.log_text.configure(state=tk.DISABLED)
+        self.log_sink.clear()
         
     def os_selection_popup(self, test_name, os_name):
         if self.serial_conn is None or os_name not in ["U-Boot", "OpenWRT"]:
@@ -260,6 +287,9 @@ class HardwareTestApp:
         response = messagebox.askyesno("Confirm", f"{test_name} requires the device to be in {os_name}. Proceed ?")
         if response:
             # User clicked Yes
+            # Only output produced after the reboot/boot may match the prompt checks
+            self.console_cursor.skip_to_end()
+            self.console.flush()
             if os_name == "U-Boot":
                 try:
                     self.status_text.config(text="Sending reboot command to device...")
@@ -273,6 +303,8 @@ class HardwareTestApp:
             elif os_name == "OpenWRT":
                 try:
                     self.status_text.config(text="Sending boot command to device...")
+                    # Created before "boot" is sent so the tracker sees the whole boot log
+                    tracker = BootTracker(self.session, on_event=lambda event, value: self.boot_events.put((event, value)))
                     self.serial_conn.write(b'boot\r\n')
                     self.serial_conn.flush()
                 
@@ -280,7 +312,7 @@ class HardwareTestApp:
                     messagebox.showerror("Serial Error", f"Failed to send boot command: {e}")
                     self.status_text.config(text="Failed to send boot command.")
                     return
-                self.check_openwrt_prompt()
+                self.track_openwrt_boot(tracker)
             else:
                 logger.error(f"Unknown OS name: {os_name}")
                 return
@@ -296,12 +328,20 @@ class HardwareTestApp:
         For tests requiring manual verification, enable the pass/fail buttons.
         """
         selected_test = next((t for t in self.tests if t["name"] == test_name), None)
-        if not selected_test:
+        if not selected_test or self.current_test is not None or self.terminal_probe_pending:
             return
         
         # Clear the log widget after the test completes.
         self.clear_log()
 
+        if self.terminal_state != TERMINAL_STATE[selected_test["os"]]:
+            self.refresh_terminal_state(lambda state: self._run_test_in_state(selected_test))
+        else:
+            self._run_test_in_state(selected_test)
+
+    def _run_test_in_state(self, selected_test):
+        """Rest of run_test, once terminal_state tells where the DUT is."""
+        test_name = selected_test["name"]
         if selected_test["os"] == "uboot" and self.terminal_state != "uboot":
             self.os_selection_popup(test_name, "U-Boot")
             return
@@ -311,33 +351,80 @@ class HardwareTestApp:
             return
 
         self.status_label.config(text=f"Running {test_name}...")
+        # Instantiate the test class passing the current serial port.
+        test_class = selected_test["class"]
+        self.disable_user_input()
         if selected_test["requires_input"]:
-            # For tests like LED test: Show manual input UI.
-            self.enable_user_input()
-            # Instantiate the test class passing the current serial port.
-            test_class = selected_test["class"]
-            self.status_label.config(text=f"{test_name} requires manual verification.\nClick Pass or Fail when ready.")
-            tester = test_class(port=self.serial_port, debug=True, log_callback=self.log_message)
-            tester.run()
+            # For tests like LED test: the pass/fail buttons are shown once the test has run
+            tester = test_class(port=self.serial_port, debug=True, log_callback=self.log_message, session=self.session)
         else:
-            self.disable_user_input()
-            # Instantiate the test class passing the current serial port.
-            test_class = selected_test["class"]
             if test_class is Eth0Test:
                 self.mac_addr = get_next_available_mac(False)  # Read the MAC address from the Excel file
                 if self.mac_addr is None:
                     messagebox.showerror("Error", "No available MAC address found! Please generate MAC file.")
                     return
-                tester = test_class(port=self.serial_port, slot=self.minipcie_slot, mac_addr=self.mac_addr,  server_ip=self.server_ip, debug=True, log_callback=self.log_message)
+                metrics.set_unit_mac(self.serial_port, self.mac_addr)
+                tester = test_class(port=self.serial_port, slot=self.minipcie_slot, mac_addr=self.mac_addr,  server_ip=self.server_ip, min_throughput=self.eth_min_mbps, tftp_port=self.tftp_port, dhcp_pool=self.dhcp_pool or None, dhcp_interface=self.dhcp_interface or None, debug=True, log_callback=self.log_message, session=self.session)
             elif test_class is WiFiTest:
-                tester = test_class(port=self.serial_port, wifi_ssid=self.wifi_ssid, wifi_password=self.wifi_password, wifi_security=self.wifi_security, debug=True, log_callback=self.log_message)
+                tester = test_class(port=self.serial_port, wifi_ssid=self.wifi_ssid, wifi_password=self.wifi_password, wifi_security=self.wifi_security, debug=True, log_callback=self.log_message, session=self.session)
             elif test_class is XbeeTest:
-                tester = test_class(port=self.serial_port, slot=self.minipcie_slot, debug=True, log_callback=self.log_message)
+                tester = test_class(port=self.serial_port, slot=self.minipcie_slot, debug=True, log_callback=self.log_message, session=self.session)
             else:
-                tester = test_class(port=self.serial_port, debug=True, log_callback=self.log_message)
-            # Running the test (this call is blocking—use caution if test duration is long)
-            success = tester.run()
-            self.complete_test(test_name, success)
+                tester = test_class(port=self.serial_port, debug=True, log_callback=self.log_message, session=self.session)
+        # The test runs on a worker thread; the window stays live and the result comes back through test_events
+        self.current_test = (test_name, tester, selected_test["requires_input"])
+        for btn in self.test_buttons.values():
+            btn.config(state=tk.DISABLED)
+        self.run_all_button.config(state=tk.DISABLED)
+        self.abort_button.config(state=tk.NORMAL)
+        threading.Thread(target=self._test_worker, args=(test_name, tester), name=f"Test {test_name}",
+                         daemon=True).start()
+        self.root.after(100, self._drain_test_events)
+
+    def _test_worker(self, test_name, tester):
+        try:
+            self.test_events.put(("done", tester.run()))
+        except TestAborted:
+            logger.info(f"{test_name} aborted")
+            self.test_events.put(("aborted", None))
+        except Exception as e:
+            logger.exception(f"{test_name} failed")
+            self.test_events.put(("error", str(e)))
+
+    def _drain_test_events(self):
+        # Tk widgets are only touched here, on the Tk thread
+        try:
+            event, value = self.test_events.get_nowait()
+        except queue.Empty:
+            self.root.after(100, self._drain_test_events)
+            return
+        test_name, tester, requires_input = self.current_test
+        self.current_test = None
+        self.abort_button.config(state=tk.DISABLED)
+        self.run_all_button.config(state=tk.NORMAL)
+        for btn in self.test_buttons.values():
+            btn.config(state=tk.NORMAL)
+        if event == "aborted":
+            if self.session:
+                self.session.write(b'\x03')   # stop whatever the DUT was still running
+            self.status_label.config(text=f"{test_name} aborted.")
+            self.log_message(f"{test_name} aborted")
+        elif event == "error":
+            messagebox.showerror(test_name, value)
+            self.complete_test(test_name, False)
+        elif requires_input:
+            self.enable_user_input()
+            self.status_label.config(text=f"{test_name} requires manual verification.\nClick Pass or Fail when ready.")
+        else:
+            self.complete_test(test_name, value)
+
+    def abort_test(self):
+        """Stop the test running on the worker thread (the DUT gets a Ctrl+C)."""
+        if self.current_test is None:
+            return
+        self.current_test[1].abort()
+        self.abort_button.config(state=tk.DISABLED)
+        self.status_label.config(text=f"Aborting {self.current_test[0]}...")
     
     def complete_test(self, test_name, passed):
         """Update UI elements once the test completes."""
@@ -346,12 +433,7 @@ class HardwareTestApp:
             self.status_label.config(text=f"{test_name} awaiting manual result.")
             return
         result_str = "PASS" if passed else "FAIL"
-        self.test_results[test_name] = result_str
-        
-        btn = self.test_buttons.get(test_name)
-        if btn:
-            btn.config(text=f"{test_name}: {result_str}",
-                       fg="green" if passed else "red")
+        self.show_result(test_name, result_str)
         
         self.status_label.config(text=f"{test_name} completed: {result_str}")
         self.log_message(f"{test_name} completed: {result_str}") #Show result in log also
@@ -370,6 +452,121 @@ class HardwareTestApp:
                 next_test = names[idx + 1]
                 self.root.after(200, lambda nt=next_test: self.run_test(nt))
     
+    def show_result(self, test_name, result_str):
+        """Record a test result and show it on the test's button."""
+        self.test_results[test_name] = result_str
+        btn = self.test_buttons.get(test_name)
+        if btn:
+            btn.config(text=f"{test_name}: {result_str}",
+                       fg="green" if result_str == "PASS" else "red")
+
+    def run_all(self):
+        """Ask which automatic tests to run, then run them unattended in U-Boot/OpenWRT phases."""
+        if self.run_all_scheduler is not None:
+            self.run_all_scheduler.cancel()
+            self.status_label.config(text="Stopping Run All after the current test...")
+            return
+        if not self.session or not self.connection_status:
+            messagebox.showerror("Error", "Serial connection not established.")
+            return
+
+        window = tk.Toplevel(self.root)
+        window.title("Run All")
+        window.transient(self.root)
+        tk.Label(window, text="Tests to run (manual tests are not included):").pack(anchor="w", padx=12, pady=(12, 4))
+        selected = {}
+        for test in self.tests:
+            if test["requires_input"]:
+                continue
+            var = tk.BooleanVar(value=self.test_results.get(test["name"]) != "PASS")
+            tk.Checkbutton(window, text=test["name"], variable=var).pack(anchor="w", padx=24)
+            selected[test["name"]] = var
+
+        def on_ok():
+            tests = [t for t in self.tests if t["name"] in selected and selected[t["name"]].get()]
+            window.destroy()
+            if tests:
+                self._start_run_all(tests)
+
+        tk.Button(window, text="Run", command=on_ok).pack(side=tk.RIGHT, padx=12, pady=12)
+        tk.Button(window, text="Cancel", command=window.destroy).pack(side=tk.RIGHT, pady=12)
+        window.grab_set()
+
+    def _start_run_all(self, tests):
+        if self.terminal_probe_pending:
+            return
+        if any(t["class"] is Eth0Test for t in tests):
+            self.mac_addr = get_next_available_mac(False)
+            if self.mac_addr is None:
+                messagebox.showerror("Error", "No available MAC address found! Please generate MAC file.")
+                return
+            metrics.set_unit_mac(self.serial_port, self.mac_addr)
+
+        events = self.run_all_events
+        settings = self._settings()
+
+        def _make(test):
+            return make_tester(test["class"], settings, self.serial_port, session=self.session,
+                               log_callback=lambda msg: events.put(("log", msg)), mac_addr=self.mac_addr)
+
+        self.refresh_terminal_state(lambda state: self._start_run_all_scheduler(tests, _make))
+
+    def _start_run_all_scheduler(self, tests, make):
+        events = self.run_all_events
+        start_os = {"uboot": "uboot", "linux": "openwrt"}.get(self.terminal_state)
+        self.run_all_scheduler = RunAllScheduler(self.session, tests, make, start_os=start_os,
+                                                 on_event=lambda event, value: events.put((event, value)))
+        self.clear_log()
+        self.disable_user_input()
+        for btn in self.test_buttons.values():
+            btn.config(state=tk.DISABLED)
+        self.run_all_button.config(text="Stop")
+        threading.Thread(target=self._run_all_worker, args=(self.run_all_scheduler,),
+                         name="RunAll", daemon=True).start()
+        self.root.after(100, self._drain_run_all_events)
+
+    def _run_all_worker(self, scheduler):
+        try:
+            scheduler.run()
+        except Exception as e:
+            logger.exception("Run All failed")
+            self.run_all_events.put(("error", str(e)))
+        finally:
+            self.run_all_events.put(("done", None))
+
+    def _drain_run_all_events(self):
+        # Tk widgets are only touched here, on the Tk thread
+        try:
+            while True:
+                event, value = self.run_all_events.get_nowait()
+                if event == "log":
+                    self.log_message(value)
+                elif event == "status":
+                    self.status_label.config(text=value)
+                elif event == "os":
+                    self.terminal_state = TERMINAL_STATE[value]
+                elif event == "result":
+                    name, result = value
+                    self.show_result(name, result)
+                    self.log_message(f"{name} completed: {result}")
+                elif event == "error":
+                    messagebox.showerror("Run All", value)
+                elif event == "summary":
+                    self.status_label.config(
+                        text=f"Run All finished in {value.elapsed:.0f} s: {value.reboots_avoided} reboot(s) avoided, "
+                             f"~{value.time_saved:.0f} s saved")
+                elif event == "done":
+                    self.run_all_scheduler = None
+                    self.run_all_button.config(text="Run All")
+                    for btn in self.test_buttons.values():
+                        btn.config(state=tk.NORMAL)
+                    if all(res in ["PASS", "FAIL"] for res in self.test_results.values()):
+                        self.prompt_save_results()
+                    return
+        except queue.Empty:
+            pass
+        self.root.after(100, self._drain_run_all_events)
+
     def user_pass(self):
         """User marks a manual test as passed."""
         current_text = self.status_label.cget("text")
@@ -560,6 +757,18 @@ class HardwareTestApp:
         security_entry = tk.Entry(window, width=30)
         security_entry.insert(0, self.wifi_security)
         security_entry.grid(row=7, column=1, padx=5, pady=5)
+
+        # --- Ethernet minimum throughput field ---
+        tk.Label(window, text="Eth Min MB/s:").grid(row=8, column=0, sticky="e", padx=5, pady=5)
+        eth_entry = tk.Entry(window, width=30)
+        eth_entry.insert(0, str(self.eth_min_mbps))
+        eth_entry.grid(row=8, column=1, padx=5, pady=5)
+
+        # --- Embedded DHCP responder pool field ---
+        tk.Label(window, text="DHCP Pool Start:").grid(row=9, column=0, sticky="e", padx=5, pady=5)
+        dhcp_entry = tk.Entry(window, width=30)
+        dhcp_entry.insert(0, self.dhcp_pool)  # Empty: use the LAN's DHCP server
+        dhcp_entry.grid(row=9, column=1, padx=5, pady=5)
         
         # --- OK Button to save changes ---
         def on_ok():
@@ -574,6 +783,18 @@ class HardwareTestApp:
             if self.wifi_security not in ["OPEN", "WEP", "WPA", "WPA2", "WPA-PSK"]:
                 messagebox.showerror("Invalid Security Type", "WiFi Security must be one of: OPEN, WEP, WPA, WPA2")
                 return
+            try:
+                self.eth_min_mbps = max(0.0, float(eth_entry.get()))
+            except ValueError:
+                messagebox.showerror("Invalid Throughput", "Eth Min MB/s must be a number (0 = DHCP check only)")
+                return
+            self.dhcp_pool = dhcp_entry.get().strip()
+            if self.dhcp_pool:
+                try:
+                    ipaddress.IPv4Address(self.dhcp_pool)
+                except ValueError:
+                    messagebox.showerror("Invalid DHCP Pool", "DHCP Pool Start must be an IPv4 address, or empty")
+                    return
             # Update the config file with new values
             self.save_config()  # Save current settings to disk
             # Optionally, you can show a message box or log the changes
@@ -585,7 +806,7 @@ class HardwareTestApp:
             #                     f"Model Number: {self.model_number}")
             window.destroy()
 
-        tk.Button(window, text="OK", command=on_ok).grid(row=8, column=0, columnspan=2, pady=10)
+        tk.Button(window, text="OK", command=on_ok).grid(row=10, column=0, columnspan=2, pady=10)
         
         # Update window to ensure its size is computed.
         window.update_idletasks()
@@ -614,6 +835,10 @@ class HardwareTestApp:
     def save_config(self):
         # Save the current settings to the config file
         cfg["network"]["sip"] = self.server_ip
+        cfg["network"]["eth_min_mbps"] = str(self.eth_min_mbps)
+        cfg["network"]["tftp_port"] = str(self.tftp_port)
+        cfg["network"]["dhcp_pool"] = self.dhcp_pool
+        cfg["network"]["dhcp_interface"] = self.dhcp_interface
         cfg["device"]["serial_port"] = self.serial_port
         cfg["device"]["minipcie_slot"] = self.minipcie_slot
         cfg["device"]["model_number"] = self.model_number
@@ -634,7 +859,8 @@ class HardwareTestApp:
         if os.path.exists(path):
             cfg.read(path)
         else:
-            cfg["network"] = {"sip": "192.168.0.1"}
+            cfg["network"] = {"sip": "192.168.0.1", "eth_min_mbps": "0", "tftp_port": "69", "dhcp_pool": "",
+                              "dhcp_interface": ""}
             cfg["device"] = {"serial_port": "/dev/ttyUSB0", "model_number": "IG4-1000", "minipcie_slot": "Slot 1",
                              "wifi_ssid": "SSID", "wifi_password": "Password", "wifi_security": "WPA-PSK"}
             cfg["ui"] = {"auto_advance": "True", "print_label": "True"}
@@ -643,6 +869,10 @@ class HardwareTestApp:
                 cfg.write(f)
 
         self.server_ip = cfg["network"]["sip"]
+        self.eth_min_mbps = cfg.getfloat("network", "eth_min_mbps", fallback=0.0)
+        self.tftp_port = cfg.getint("network", "tftp_port", fallback=69)
+        self.dhcp_pool = cfg.get("network", "dhcp_pool", fallback="")
+        self.dhcp_interface = cfg.get("network", "dhcp_interface", fallback="")
         self.serial_port = cfg["device"]["serial_port"]
         self.minipcie_slot = cfg["device"]["minipcie_slot"]
         self.model_number = cfg["device"]["model_number"]
@@ -695,6 +925,39 @@ class HardwareTestApp:
         window.grab_set()
         window.focus_force()
 
+    def _settings(self):
+        """Current test settings, as taken by station.make_tester."""
+        return {"minipcie_slot": self.minipcie_slot, "server_ip": self.server_ip,
+                "eth_min_mbps": self.eth_min_mbps, "tftp_port": self.tftp_port,
+                "dhcp_pool": self.dhcp_pool, "dhcp_interface": self.dhcp_interface,
+                "wifi_ssid": self.wifi_ssid, "wifi_password": self.wifi_password,
+                "wifi_security": self.wifi_security}
+
+    def show_station_popup(self):
+        """Open the Test Station window to test every connected DUT in parallel."""
+        if self.station_window is not None and self.station_window.winfo_exists():
+            if self.station_window.state() == "iconic":
+                self.station_window.deiconify()
+            self.station_window.lift()
+            self.station_window.focus_force()
+            return
+
+        window = tk.Toplevel(self.root)
+        self.station_window = window
+        window.title("Test Station")
+
+        station_frame = StationFrame(window, (MY_VID, MY_PID), self.tests, self._settings)
+        station_frame.pack(fill=tk.BOTH, expand=True, padx=12, pady=12)
+
+        def _on_close():
+            try:
+                station_frame.stop()
+                self.station_window = None
+            finally:
+                window.destroy()
+
+        window.protocol("WM_DELETE_WINDOW", _on_close)
+
     def show_help(self):
         """Display help information."""
         if self.help_window is not None and self.help_window.winfo_exists():
@@ -726,10 +989,8 @@ class HardwareTestApp:
     def connect_serial(self):
         """Attempt to open the serial port and wait for U-Boot prompt before showing device as connected."""
         try:
-            if self.serial_conn:
-                self.serial_conn.close()
-            import serial  # Import here since pyserial is needed for connecting
-            self.serial_conn = serial.Serial(self.serial_port, baudrate=115200, timeout=0.1)
+            self._close_session()
+            self._open_session(self.serial_port)
             self.status_text.config(text="Waiting for U-Boot prompt...")
             # Initially, do not mark as connected (use red indicator)
             self.update_reconnect_indicator(False)
@@ -739,72 +1000,140 @@ class HardwareTestApp:
             self.status_text.config(text="Disconnected")
             self.update_reconnect_indicator(False)
 
+    def _open_session(self, port):
+        """Open (or keep) the console session for the DUT on `port` and attach the GUI's cursor."""
+        if self.session and self.session.port == port and self.session.is_open:
+            return
+        self._close_session()
+        session = ConsoleSession(port, baudrate=115200, timeout=0.1)
+        session.open()
+        self.session = session
+        self.serial_conn = session.serial
+        # The GUI has its own cursor on the shared stream (no bytes are stolen from testers)
+        self.console_cursor = session.cursor()
+        self.console = SerialExpect(lambda: self.console_cursor.read(timeout=0))
+        self.terminal_monitor = TerminalStateMonitor(session)
+
+    def _close_session(self):
+        if self.current_test:
+            self.current_test[1].abort()
+        if self.boot_tracker:
+            self.boot_tracker.cancel()
+            self.boot_tracker = None
+        if self.terminal_monitor:
+            self.terminal_monitor.close()
+            self.terminal_monitor = None
+        if self.session:
+            self.session.close()
+        self.session = None
+        self.console = None
     
+    def refresh_terminal_state(self, then):
+        """
+        Where the DUT really is: the state its console last showed, or a probe (Enter) if
+        that is stale. The probe waits on a worker thread; then(state) is called on the Tk
+        thread once the state is known. Never reboots; updates terminal_state when a prompt
+        is recognised.
+        """
+        monitor = self.terminal_monitor
+        if not monitor:
+            then(None)
+            return
+        state = monitor.state_if_fresh(TERMINAL_STATE_MAX_AGE)
+        if state is not None:
+            then(self._set_terminal_state(state))
+            return
+        self.terminal_probe_pending = True
+        threading.Thread(target=lambda: self.terminal_events.put((monitor, monitor.probe(), then)),
+                         name="TerminalProbe", daemon=True).start()
+        self.root.after(50, self._drain_terminal_events)
+
+    def _drain_terminal_events(self):
+        # Tk widgets are only touched here, on the Tk thread
+        try:
+            monitor, state, then = self.terminal_events.get_nowait()
+        except queue.Empty:
+            self.root.after(50, self._drain_terminal_events)
+            return
+        self.terminal_probe_pending = False
+        if monitor is not self.terminal_monitor:
+            return          # the port was closed or reopened meanwhile
+        then(self._set_terminal_state(state))
+
+    def _set_terminal_state(self, state):
+        if state in ("uboot", "linux") and state != self.terminal_state:
+            logger.info(f"DUT console is at the {state} prompt (was {self.terminal_state}), no reboot needed")
+            self.terminal_state = state
+            self.connection_status = True
+            self.update_reconnect_indicator(True)
+            self.status_text.config(text=f"{'U-Boot' if state == 'uboot' else 'Openwrt'} detected; device connected")
+        return state
+
     def update_reconnect_indicator(self, connected):
         """Update the reconnect indicator (green if connected, red if not)."""
         color = "green" if connected else "red"
         self.reconnect_indicator.itemconfig(self.indicator_circle, fill=color)
     
-    def check_openwrt_prompt(self):
-        # print("Checking for OpenWRT prompt...")
-        p1, p2, p3 = '.', '..', '...'
-        global patter_state
-        patter_state = patter_state + 1 if patter_state < 3 else 0
-        # print("Device connected to OpenWRT.")
-        self.status_label.config(text=f"Checking for OpenWRT prompt{p1 if patter_state == 0 else p2 if patter_state == 1 else p3}")
-        color = "yellow" if patter_state == 0 else "orange" if patter_state == 1 else "red"
-        self.reconnect_indicator.itemconfig(self.indicator_circle, fill=color)
+    def track_openwrt_boot(self, tracker):
+        """Follow the boot on the tracker's thread; the GUI only drains its events."""
+        if self.boot_tracker:
+            self.boot_tracker.cancel()
+        while not self.boot_events.empty():
+            self.boot_events.get_nowait()
+        self.boot_tracker = tracker
+        self.status_label.config(text="Booting OpenWRT...")
+        self.reconnect_indicator.itemconfig(self.indicator_circle, fill="red")
+        tracker.start()
+        self.root.after(100, self._drain_boot_events)
 
-        if self.serial_conn:
-            try:
-                # found_prompt = False
-                # Read all available lines at once
-                line = self.serial_conn.readline().decode("utf-8", errors="ignore").strip()
-                print(f"debug:{line}")
-                while OPENWRT_PROMPT not in line:
-                    line = self.serial_conn.readline().decode("utf-8", errors="ignore").strip()
-                    if not line:
-                        print(".")
-                    else:
-                        print(f"debug:{line}")
-                    if OPENWRT_PROMPT in line:
-                        print("OpenWRT prompt detected, opening console.")
-                        self.serial_conn.write('\r\n'.encode())
-                        self.status_text.config(text="Openwrt detected; device connected")
-                        self.update_reconnect_indicator(True)
-                        self.connection_status = True
-                        self.terminal_state = "linux"
-                        self.status_label.config(text="Now you can run tests.")
-
-                        # Call bluetooth test
-                        time.sleep(1)  # wait for device to boot properly
-                        self.run_test("BLE Test")   # Automatically run BLE test after OpenWRT prompt detected
-                        return  # Exit after successful connection
-                # self.root.after(50, self.check_openwrt_prompt)
-            except Exception as e:
-                print("Error reading serial:", e)
-                self.root.after(100, self.check_openwrt_prompt)
-        else:
-            print("No serial connection available, retrying...")
-            self.root.after(100, self.check_openwrt_prompt)
+    def _drain_boot_events(self):
+        # Tk widgets are only touched here, on the Tk thread
+        try:
+            while True:
+                event, value = self.boot_events.get_nowait()
+                if event == "milestone":
+                    self.status_label.config(text=f"Booting OpenWRT: {value.milestone.label} "
+                                                  f"({value.seen}/{value.total}, {value.elapsed:.0f} s)")
+                    self.log_message(f"{value.milestone.label} after {value.elapsed:.1f} s")
+                    self.reconnect_indicator.itemconfig(self.indicator_circle,
+                                                        fill="orange" if value.seen < value.total else "yellow")
+                elif event == "ready":
+                    print("OpenWRT shell ready.")
+                    self.boot_tracker = None
+                    self.status_text.config(text="Openwrt detected; device connected")
+                    self.update_reconnect_indicator(True)
+                    self.connection_status = True
+                    self.terminal_state = "linux"
+                    self.status_label.config(text="Now you can run tests.")
+                    # The shell answered, no need to wait any longer before the BLE test
+                    self.run_test("BLE Test")
+                    return
+                elif event == "failed":
+                    self.boot_tracker = None
+                    self.status_text.config(text=f"OpenWRT did not boot: {value}")
+                    self.status_label.config(text="OpenWRT boot failed.")
+                    self.update_reconnect_indicator(False)
+                    return
+        except queue.Empty:
+            pass
+        if self.boot_tracker:
+            self.root.after(100, self._drain_boot_events)
 
-    
     def check_uboot_prompt(self):
         """
         Look for the "Hit any key to stop autoboot:" prompt.
         When found, send a key to interrupt autoboot and update the status to 'device connected'.
         """
         # print("Checking for U-Boot prompt...")
-        if self.serial_conn and self.serial_conn.in_waiting:
+        if self.serial_conn and self.console:
             
             # print("Device connected to U-Boot.")
             try:
-                line = self.serial_conn.readline().decode("utf-8", errors="ignore")
-                # print(f"debug:{line}")
-                if UBOOT_PROMPT in line:
+                index, _, _ = self.console.poll(re.escape(UBOOT_PROMPT))
+                if index == 0:
                 # if "Hit any key to stop autoboot" in line: # old prompt 
                     print("U-Boot prompt detected, sending interrupt command.")
-                    self.serial_conn.write(('ecsi25').encode())  # Send magic key to interrupt autoboot
+                    self.serial_conn.write(AUTOBOOT_STOP_KEY.encode())  # Send magic key to interrupt autoboot
                     # self.serial_conn.flush()
                     # self.serial_conn.writelines(('ecsi25').encode())  # Send magic key to interrupt autoboot
                     # self.serial_conn.write(b'\r\n')
@@ -903,13 +1232,23 @@ class HardwareTestApp:
         print("Serial connection callback invoked.")
         self.serial_conn = conn
         self.serial_port = conn.port
+        self._open_session(conn.port)
         self.status_text.config(text=f"Connected to {conn.port} @ {conn.baudrate}")
         self.update_reconnect_indicator(True)
         self.connection_status = True  # Mark as connected
         logger.info(f"Serial connection established on {conn.port} at {conn.baudrate}")
         
         print("terminal_state:", self.terminal_state)
-        if self.terminal_state == "Disconnected" or self.terminal_state == "uboot":
+        # A DUT that is already sitting at a prompt prints no banner: ask its console first
+        self.refresh_terminal_state(self._on_connected_state)
+
+    def _on_connected_state(self, state):
+        if state in ("uboot", "linux"):
+            for test in self.tests:
+                btn = self.test_buttons.get(test["name"])
+                if btn:
+                    btn.config(state=tk.NORMAL)
+        elif self.terminal_state == "Disconnected" or self.terminal_state == "uboot":
             print("Checking for U-Boot prompt...")            
             self.status_text.config(text="Waiting for U-Boot prompt...")
             self.reconnect_indicator.itemconfig(self.indicator_circle, fill="yellow")
@@ -925,6 +1264,7 @@ class HardwareTestApp:
     def serial_disconnection_callback(self):
         """Callback invoked when SerialAutoConnector loses the connection."""
         print("Serial disconnection callback invoked.")
+        self._close_session()
         self.serial_conn = None
         self.status_text.config(text="Disconnected")
         self.update_reconnect_indicator(False)
@@ -945,10 +1285,11 @@ class HardwareTestApp:
                 self.connector.stop()
         except Exception:
             logger.exception("Error stopping connector")
+        self._close_session()
         self.root.destroy()
 
 if __name__ == "__main__":
-    success = initialize_logging(clean_logs=True)
+    success = initialize_logging(new_session=True, queued=True)
     if not success:
         print("Warning: log setup failed, check stderr for details", file=sys.stderr)
     
@@ -0,0 +1,222 @@
+# async_uboot_tester.py
+"""
+asyncio counterpart of UBootTester.
+
+- The console is read by the event loop itself (loop.add_reader on the
+  serial fd), so waiting for output never blocks a thread or sleeps.
+- If the port is already shared through a PortReader (the GUI holds it),
+  chunks are pushed from the reader thread into the loop instead.
+- The test cases are the ones of UBootTester (ConsoleTestCases); this class
+  only carries out the console operations they yield.
+- One event loop can drive several consoles concurrently:
+
+    async def main():
+        testers = [AsyncUBootTester(port) for port in ports]
+        await asyncio.gather(*(t.connect() for t in testers))
+        results = await asyncio.gather(*(t.run_rtc_test_case("date", 3) for t in testers))
+"""
+
+import asyncio
+import time
+
+import serial
+
+from console_ops import Blocking, Expect, Flush, Guard, Write
+from log import logger
+from metrics import metrics
+from serial_expect import ExpectBuffer, compile_patterns
+from serial_reader import get_port_reader, acquire_port_reader, release_port_reader
+from uboot_tester import ConsoleTestCases, TFTP_PORT, POWER_FAIL_GPIO
+
+__all__ = ["AsyncUBootTester"]
+
+
+class AsyncUBootTester(ConsoleTestCases):
+    def __init__(self, port='/dev/ttyUSB0', baudrate=115200, debug=False, log_callback=None, command_timeout=2.0):
+        self.port = port
+        self.baudrate = baudrate
+        self.debug = debug
+        self.log_callback = log_callback
+        self.command_timeout = command_timeout
+        # Setup is always prompt-paced and coalesced (no fixed waits on the loop)
+        self.paced = True
+        self.coalesce = True
+        self.ser = None
+        self.reader = None            # set when the port is shared through a PortReader
+        self._loop = None
+        self._buf = ExpectBuffer()
+        self._data_event = None
+        self._in_span = False
+        self._rx_time = 0.0           # host timestamp of the last data received
+        self.power_fail_time = None
+
+    async def _guard(self, seconds):
+        with self._span("guard"):
+            await asyncio.sleep(seconds)
+
+    # ------- connection -------
+    async def connect(self):
+        with self._span("connect"):
+            self._loop = asyncio.get_running_loop()
+            self._data_event = asyncio.Event()
+            if get_port_reader(self.port) or not hasattr(self._loop, "add_reader"):
+                # Port already owned by a reader thread (or no fd readers on this platform)
+                self.reader = acquire_port_reader(self.port, self.baudrate)
+                self.ser = self.reader.serial
+                self.reader.add_listener(self._on_thread_data)
+            else:
+                self.ser = serial.Serial(self.port, self.baudrate, timeout=0)   # non-blocking reads
+                self.ser.reset_input_buffer()
+                self._loop.add_reader(self.ser.fileno(), self._on_readable)
+
+    async def disconnect(self):
+        with self._span("disconnect"):
+            if self.reader:
+                self.reader.remove_listener(self._on_thread_data)
+                release_port_reader(self.reader)
+                self.reader = None
+            elif self.ser and self.ser.is_open:
+                self._loop.remove_reader(self.ser.fileno())
+                self.ser.close()
+            self.ser = None
+        metrics.write_prometheus()
+
+    def _on_readable(self):
+        try:
+            data = self.ser.read(self.ser.in_waiting or 1)
+        except serial.SerialException as e:
+            logger.warning("Serial read failed on %s: %s", self.port, e)
+            self._loop.remove_reader(self.ser.fileno())
+            return
+        self._feed(data, time.monotonic())
+
+    def _on_thread_data(self, ts, data):
+        # Called on the reader thread
+        self._loop.call_soon_threadsafe(self._feed, data, ts)
+
+    def _feed(self, data, ts):
+        if not data:
+            return
+        self._rx_time = ts
+        text = self._buf.feed(data)
+        if self.debug and text:
+            logger.debug(f"{self.port} << {text!r}")
+        self._data_event.set()
+
+    def flush(self):
+        """Forget everything received so far."""
+        self._buf.clear()
+
+    # ------- primitives -------
+    async def send(self, command, end='\r\n'):
+        self._write((command + end).encode())
+
+    def _write(self, data):
+        if not self.ser or not self.ser.is_open:
+            raise Exception("Serial port not open")
+        self.ser.write(data)
+
+    async def expect(self, patterns, timeout=10):
+        """
+        Wait for any of `patterns` without blocking the loop.
+        Returns (index, match, text) like SerialExpect.expect; index is -1 on timeout.
+        """
+        with self._span("expect"):
+            return await self._expect(compile_patterns(patterns), timeout)
+
+    async def _expect(self, compiled, timeout):
+        end_time = time.monotonic() + timeout
+        while True:
+            found = self._buf.search(compiled)
+            if found:
+                idx, m = found
+                data = self._buf.consume(m.end())
+                m = compiled[idx].search(data, m.start())
+                return idx, m, data.decode("utf-8", errors="ignore")
+            remaining = end_time - time.monotonic()
+            if remaining <= 0:
+                return -1, None, self._buf.consume().decode("utf-8", errors="ignore")
+            self._data_event.clear()
+            try:
+                await asyncio.wait_for(self._data_event.wait(), remaining)
+            except asyncio.TimeoutError:
+                pass
+
+    async def _drive(self, steps):
+        """Carry out the console operations of a shared test case on the event loop; returns its result."""
+        send, value = steps.send, None
+        while True:
+            try:
+                op = send(value)
+            except StopIteration as done:
+                return done.value
+            try:
+                value, send = await self._do(op), steps.send
+            except BaseException as e:          # raised where the case yielded (cancellation too)
+                value, send = e, steps.throw
+
+    async def _do(self, op):
+        if isinstance(op, Expect):
+            return await self.expect(op.patterns, op.timeout)
+        if isinstance(op, Write):
+            return self._write(op.data)
+        if isinstance(op, Flush):
+            return self.flush()
+        if isinstance(op, Guard):
+            return await self._guard(op.seconds)
+        if isinstance(op, Blocking):
+            # The servers' bookkeeping is thread-based: wait for it off the loop
+            return await self._loop.run_in_executor(None, op.fn)
+        raise TypeError(f"Unknown console operation {op!r}")
+
+    # ------- commands and test cases, see ConsoleTestCases -------
+    async def send_setup_commands(self, setup_cmds):
+        return await self._drive(self._setup_steps(setup_cmds))
+
+    async def send_and_wait_for_output(self, command, expect, timeout=10):
+        return await self._drive(self._send_and_wait_steps(command, expect, timeout))
+
+    async def run_test_case(self, setup_cmds, test_cmd, expect, wait_time=10):
+        return await self._drive(self._test_case_steps(setup_cmds, test_cmd, expect, wait_time))
+
+    async def run_eth_qualification_test_case(self, setup_cmds, min_throughput, tftp_port=TFTP_PORT, timeout=20):
+        return await self._drive(self._eth_qualification_steps(setup_cmds, min_throughput, tftp_port, timeout))
+
+    async def run_rtc_test_case(self, test_cmd, wait_time=2):
+        return await self._drive(self._rtc_steps(test_cmd, wait_time))
+
+    async def run_rtc_drift_test_case(self, test_cmd, tolerance=0.05, max_time=6.0, edge_margin=0.1):
+        return await self._drive(self._rtc_drift_steps(test_cmd, tolerance, max_time, edge_margin))
+
+    async def run_xbee_test_case(self, setup_cmds, wait_time=2):
+        return await self._drive(self._xbee_steps(setup_cmds, wait_time))
+
+    async def read_register(self, address, count=1):
+        return await self._drive(self._read_register_steps(address, count))
+
+    async def run_xbee_api_test_case(self, setup_cmds, command='VR', timeout=1.0, resend=0.3):
+        return await self._drive(self._xbee_api_steps(setup_cmds, command, timeout, resend))
+
+    async def run_batt_test_case(self, setup_cmds, wait_time=2):
+        return await self._drive(self._batt_steps(setup_cmds, wait_time))
+
+    async def gpio_exit_status_usable(self, gpio=POWER_FAIL_GPIO):
+        return await self._drive(self._gpio_exit_status_steps(gpio))
+
+    async def run_batt_sampler_test_case(self, setup_cmds, wait_time=10, interval=0.02):
+        return await self._drive(self._batt_sampler_steps(setup_cmds, wait_time, interval))
+
+    async def run_sim_test_case(self):
+        return await self._drive(self._sim_steps())
+
+    async def wait_for_wlan0(self, timeout=60):
+        return await self._drive(self._wlan0_steps(timeout))
+
+    async def wait_for_wifi_events(self, seen='', timeout=120):
+        return await self._drive(self._wifi_events_steps(seen, timeout))
+
+    async def run_wifi_test_case(self, setup_cmds, test_cmd, expect, wait_time=10, timeout=120):
+        return await self._drive(self._wifi_steps(setup_cmds, test_cmd, expect, wait_time, timeout))
+
+    async def run_usb_test_case(self, setup_cmds, expect, timeout=20):
+        return await self._drive(self._usb_steps(setup_cmds, expect, timeout))
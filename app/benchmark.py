@@ -0,0 +1,229 @@
+# benchmark.py
+"""
+Cycle-time benchmark of the test sequence against simulated DUTs.
+
+- Runs every test class of test_definitions.TESTS on its own virtual DUT
+  (dut_simulator), then the complete station sequence (power on, U-Boot
+  tests, boot, OpenWRT tests) on one or more DUTs at once.
+- Reports per test: wall time, time spent sleeping (time.sleep and the
+  testers' guard waits), time spent waiting for console input, the rest
+  (CPU, writes), and bytes sent/received.
+  For station runs sleep and I/O wait are summed over the slots running in
+  parallel, so they can exceed the wall time.
+- Emits JSON; with --baseline, compares wall times against an earlier run
+  and exits with status 1 on a regression.
+
+Usage:
+    python benchmark.py --out bench.json
+    python benchmark.py --skip "WiFi Test" --baseline bench.json --tolerance 0.1
+"""
+
+from typing import Dict, List, Optional, Sequence
+import argparse
+import contextlib
+import datetime
+import json
+import sys
+import threading
+import time
+
+from _version import __version__
+from log import logger
+from console_session import ConsoleSession
+from dut_simulator import DUTProfile, VirtualDUT
+from serial_reader import ReaderCursor
+from station import TestStation, make_tester
+from test_definitions import TESTS
+from uboot_tester import UBootTester
+
+__all__ = ["run_test_benchmark", "run_station_benchmark", "compare", "main"]
+
+SETTINGS = {"minipcie_slot": "Slot 1", "server_ip": "192.168.0.1", "wifi_ssid": "bench",
+            "wifi_password": "bench-password", "wifi_security": "WPA-PSK"}
+BENCH_MAC = "020000000001"
+# Threads of the simulator and the port readers are not part of the cycle time
+IGNORED_THREADS = ("VirtualDUT", "PortReader")
+
+
+class _Accounting:
+    """Time the test threads spend sleeping (time.sleep, tester guard waits) and blocked on console input."""
+
+    def __init__(self):
+        self.sleep = 0.0
+        self.io_wait = 0.0
+        self._lock = threading.Lock()
+        self._saved = None
+
+    def reset(self):
+        with self._lock:
+            self.sleep = self.io_wait = 0.0
+
+    def _add(self, field: str, seconds: float):
+        if threading.current_thread().name.startswith(IGNORED_THREADS):
+            return
+        with self._lock:
+            setattr(self, field, getattr(self, field) + seconds)
+
+    def _timed(self, func, field):
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self._add(field, time.perf_counter() - start)
+        return wrapper
+
+    def install(self):
+        self._saved = (time.sleep, UBootTester._guard, ReaderCursor.read_chunks, ReaderCursor.wait)
+        time.sleep = self._timed(time.sleep, "sleep")
+        # Guard waits block on the tester's abort event, not in time.sleep
+        UBootTester._guard = self._timed(UBootTester._guard, "sleep")
+        ReaderCursor.read_chunks = self._timed(ReaderCursor.read_chunks, "io_wait")
+        ReaderCursor.wait = self._timed(ReaderCursor.wait, "io_wait")
+
+    def uninstall(self):
+        if self._saved:
+            time.sleep, UBootTester._guard, ReaderCursor.read_chunks, ReaderCursor.wait = self._saved
+            self._saved = None
+
+
+def _breakdown(wall: float, acct: _Accounting, dut_list: Sequence[VirtualDUT], rx0: int, tx0: int) -> Dict:
+    return {
+        "wall": round(wall, 3),
+        "sleep": round(acct.sleep, 3),
+        "io_wait": round(acct.io_wait, 3),
+        "other": round(max(0.0, wall - acct.sleep - acct.io_wait), 3),
+        "bytes_rx": sum(d.bytes_out for d in dut_list) - rx0,     # DUT -> host
+        "bytes_tx": sum(d.bytes_in for d in dut_list) - tx0,      # host -> DUT
+    }
+
+
+def run_test_benchmark(test: Dict, profile: DUTProfile, acct: _Accounting, repeat: int = 1) -> Dict:
+    """Run one test definition `repeat` times on a fresh virtual DUT already in the test's OS."""
+    dut = VirtualDUT(profile, start_state=test["os"])
+    port = dut.start()
+    session = ConsoleSession(port)
+    session.open()
+    runs = []
+    try:
+        for _ in range(repeat):
+            tester = make_tester(test["class"], SETTINGS, port, session=session, mac_addr=BENCH_MAC)
+            acct.reset()
+            rx0, tx0 = dut.bytes_out, dut.bytes_in
+            start = time.perf_counter()
+            passed = bool(tester.run())
+            result = _breakdown(time.perf_counter() - start, acct, [dut], rx0, tx0)
+            result["passed"] = passed
+            runs.append(result)
+    finally:
+        session.close()
+        dut.stop()
+    # The median run (by wall time) represents the test
+    median = sorted(runs, key=lambda r: r["wall"])[len(runs) // 2]
+    return dict(median, runs=[r["wall"] for r in runs])
+
+
+def run_station_benchmark(tests: Sequence[Dict], duts: int, profile: DUTProfile, acct: _Accounting,
+                          timeout: float = 600) -> Dict:
+    """The full automatic sequence of `tests` on `duts` virtual boards at once, from power-on."""
+    boards = [VirtualDUT(profile, start_state="uboot") for _ in range(duts)]
+    ports = [b.start() for b in boards]
+    station = TestStation(ports, tests, SETTINGS, on_event=None, boot_timeout=60, dry_run=True)
+    try:
+        acct.reset()
+        start = time.perf_counter()
+        station.start()
+        time.sleep(0.5)             # the station is listening; now "power on" the boards
+        for board in boards:
+            board.power_cycle()
+        station._thread.join(timeout)
+        wall = time.perf_counter() - start
+    finally:
+        station.stop()
+        for board in boards:
+            board.stop()
+    result = _breakdown(wall, acct, boards, 0, 0)
+    result["duts"] = duts
+    result["slots"] = [{"port": s.port, "status": s.status, "wall": round(s.finished - s.started, 3),
+                        "results": s.results} for s in station.slots]
+    return result
+
+
+def compare(current: Dict, baseline: Dict, tolerance: float = 0.1, slack: float = 0.05) -> List[str]:
+    """Wall-time regressions of `current` against `baseline` (relative tolerance plus absolute slack in s)."""
+    regressions = []
+    pairs = [(f"test {name}", r, baseline.get("tests", {}).get(name)) for name, r in current.get("tests", {}).items()]
+    pairs += [(f"station x{r['duts']}", r, b) for r in current.get("station", [])
+              for b in baseline.get("station", []) if b["duts"] == r["duts"]]
+    for label, now, before in pairs:
+        if before and now["wall"] > before["wall"] * (1 + tolerance) + slack:
+            regressions.append(f"{label}: {before['wall']:.2f} s -> {now['wall']:.2f} s")
+        if before and before.get("passed", True) and not now.get("passed", True):
+            regressions.append(f"{label}: passed before, fails now")
+    return regressions
+
+
+def _print_table(report: Dict):
+    rows = [(name, r) for name, r in report["tests"].items()]
+    rows += [(f"Station x{r['duts']}", r) for r in report["station"]]
+    print(f"{'':<16}{'wall':>9}{'sleep':>9}{'io wait':>9}{'other':>9}{'rx B':>9}{'tx B':>8}", file=sys.stderr)
+    for name, r in rows:
+        print(f"{name:<16}{r['wall']:>9.2f}{r['sleep']:>9.2f}{r['io_wait']:>9.2f}{r['other']:>9.2f}"
+              f"{r['bytes_rx']:>9}{r['bytes_tx']:>8}{'' if r.get('passed', True) else '  FAIL'}", file=sys.stderr)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cycle-time benchmark against simulated DUTs")
+    parser.add_argument("--out", help="write the JSON report here (default: stdout)")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per test (the median is reported)")
+    parser.add_argument("--skip", action="append", default=[], help="test name to leave out (repeatable)")
+    parser.add_argument("--duts", type=int, action="append", help="station run with this many DUTs (repeatable, default 1)")
+    parser.add_argument("--fast", action="store_true", help="short simulated boot and network times")
+    parser.add_argument("--baudrate", type=int, default=115200, help="simulated console rate (0 = unpaced)")
+    parser.add_argument("--baseline", help="earlier JSON report to compare against")
+    parser.add_argument("--tolerance", type=float, default=0.1, help="allowed relative wall-time increase")
+    args = parser.parse_args(argv)
+
+    profile = DUTProfile.fast() if args.fast else DUTProfile()
+    profile.baudrate = args.baudrate or None
+    report = {
+        "version": __version__,
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "profile": {k: sorted(v) if isinstance(v, set) else v for k, v in vars(profile).items()},
+        "tests": {},
+        "station": [],
+    }
+    tests = [t for t in TESTS if t["name"] not in args.skip]
+    acct = _Accounting()
+    acct.install()
+    try:
+        # The testers print the setup commands they send; keep stdout for the report
+        with contextlib.redirect_stdout(sys.stderr):
+            for test in tests:
+                logger.info(f"Benchmarking {test['name']}")
+                report["tests"][test["name"]] = run_test_benchmark(test, profile, acct, args.repeat)
+            for duts in args.duts or [1]:
+                logger.info(f"Benchmarking station sequence on {duts} DUT(s)")
+                report["station"].append(run_station_benchmark(tests, duts, profile, acct))
+    finally:
+        acct.uninstall()
+
+    _print_table(report)
+    text = json.dumps(report, indent=2)
+    if args.out:
+        with open(args.out, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(report, json.load(f), args.tolerance)
+        for line in regressions:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
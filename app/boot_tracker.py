@@ -0,0 +1,155 @@
+# boot_tracker.py
+"""
+OpenWRT boot tracker.
+
+- Follows the console while the DUT boots Linux and reports each boot
+  milestone as it appears: kernel start, root filesystem mounted, kernel
+  modules loaded, the ESP32-C5 capabilities line and eth0 up. Milestones
+  may come in any order (or not at all on some images); each is reported once.
+- Once the boot is far enough (the ESP32 line or the "Please press Enter"
+  banner), it presses Enter at short intervals until the shell prints its
+  prompt, i.e. until the console really accepts input. No fixed wait.
+- Runs on its own thread with its own cursor on the console session, so a
+  Tk caller only drains the events with after().
+
+Usage:
+    tracker = BootTracker(session, on_event=q.put)     # before sending "boot"
+    session.write(b"boot\\r\\n")
+    tracker.start()
+    ...  q.get() -> ("milestone", BootProgress), ("ready", seconds), ("failed", reason)
+"""
+
+from typing import Callable, List, NamedTuple, Optional
+import re
+import threading
+import time
+
+from log import logger
+from serial_expect import SerialExpect
+from uboot_tester import OPENWRT_PROMPT, OPENWRT_PROMPT_2, SHELL_PROMPT_RE
+
+__all__ = ["BootMilestone", "BootProgress", "BOOT_MILESTONES", "BootTracker"]
+
+
+class BootMilestone(NamedTuple):
+    name: str
+    label: str
+    pattern: str
+    ready: bool = False     # the shell can be probed from here on
+
+
+class BootProgress(NamedTuple):
+    milestone: BootMilestone
+    elapsed: float          # seconds since the tracker was created
+    seen: int               # milestones seen so far
+    total: int
+
+
+BOOT_MILESTONES = [
+    BootMilestone("kernel", "Kernel started", r"Starting kernel|Booting Linux on physical CPU"),
+    BootMilestone("rootfs", "Root filesystem mounted", r"VFS: Mounted root|mount_root: [^\r\n]*mounted"),
+    BootMilestone("modules", "Kernel modules loaded", r"kmodloader: done loading kernel modules"),
+    BootMilestone("esp32", "ESP32-C5 up", re.escape(OPENWRT_PROMPT), ready=True),
+    BootMilestone("eth0", "eth0 up", re.escape(OPENWRT_PROMPT_2)),
+]
+CONSOLE_BANNER_RE = r'Please press Enter to activate this console'
+BOOT_FAILED_RE = r'Kernel panic[^\r\n]*'
+# Enter is pressed this often until the shell prompt shows up
+PROBE_INTERVAL = 0.5
+# If no prompt answers the probes (e.g. a customised PS1), report ready this long after probing started
+READY_FALLBACK = 5.0
+
+
+class BootTracker:
+    def __init__(
+        self,
+        session,
+        on_event: Optional[Callable[[str, object], None]] = None,
+        timeout: float = 300,
+        milestones: Optional[List[BootMilestone]] = None,
+    ):
+        """
+        session:  open ConsoleSession of the DUT; output from now on is tracked
+        on_event: called with (event, value) from the tracker thread:
+                  ("milestone", BootProgress), ("ready", seconds), ("failed", reason)
+        """
+        self.session = session
+        self.on_event = on_event
+        self.timeout = timeout
+        self.milestones = list(BOOT_MILESTONES if milestones is None else milestones)
+        self.seen: List[str] = []
+        self.ready = False
+        self._cursor = session.cursor()
+        self._start = time.monotonic()
+        self._cancel = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    # ------- control -------
+    def start(self):
+        self._thread = threading.Thread(target=self.run, name="BootTracker", daemon=True)
+        self._thread.start()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def _emit(self, event: str, value):
+        if self.on_event:
+            self.on_event(event, value)
+
+    def _elapsed(self) -> float:
+        return time.monotonic() - self._start
+
+    # ------- tracking -------
+    def run(self) -> bool:
+        """Track the boot (blocking); True once the shell accepts input."""
+        console = SerialExpect(lambda: self._cursor.read(timeout=0.1))
+        pending = list(self.milestones)
+        probing_since: Optional[float] = None
+        last_probe = 0.0
+        deadline = self._start + self.timeout
+        while not self._cancel.is_set():
+            now = time.monotonic()
+            if now >= deadline:
+                return self._fail(f"no shell after {self.timeout:.0f} s")
+            if probing_since is not None:
+                if now - probing_since >= READY_FALLBACK:
+                    logger.warning("Boot tracker: shell prompt not seen, assuming the console is ready")
+                    return self._ready()
+                if now - last_probe >= PROBE_INTERVAL:
+                    self.session.write(b'\r\n')
+                    last_probe = now
+            patterns = [m.pattern for m in pending] + [CONSOLE_BANNER_RE, BOOT_FAILED_RE]
+            if probing_since is not None:
+                patterns.append(SHELL_PROMPT_RE)
+            wait = PROBE_INTERVAL if probing_since is not None else 1.0
+            index, match, _ = console.expect(patterns, timeout=min(wait, max(0, deadline - now)))
+            if index < 0:
+                continue
+            if index < len(pending):
+                milestone = pending.pop(index)
+                self.seen.append(milestone.name)
+                progress = BootProgress(milestone, self._elapsed(), len(self.seen), len(self.milestones))
+                logger.info(f"Boot milestone: {milestone.label} after {progress.elapsed:.1f} s")
+                self._emit("milestone", progress)
+                if milestone.ready and probing_since is None:
+                    probing_since = time.monotonic()
+            elif patterns[index] == CONSOLE_BANNER_RE:
+                if probing_since is None:
+                    probing_since = time.monotonic()
+            elif patterns[index] == BOOT_FAILED_RE:
+                return self._fail(match.group(0).decode(errors="ignore").strip())
+            else:
+                return self._ready()
+        return False
+
+    def _ready(self) -> bool:
+        self.ready = True
+        elapsed = self._elapsed()
+        logger.info(f"OpenWRT shell ready after {elapsed:.1f} s")
+        self._emit("ready", elapsed)
+        return True
+
+    def _fail(self, reason: str) -> bool:
+        logger.error(f"OpenWRT boot failed: {reason}")
+        self._emit("failed", reason)
+        return False
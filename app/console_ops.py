@@ -0,0 +1,46 @@
+# console_ops.py
+"""
+Console operations of the shared (sans-I/O) test steps.
+
+- A step is a generator that yields these operations and gets their results
+  back; it never touches the port itself. UBootTester carries them out with
+  blocking reads, AsyncUBootTester on the event loop (their _drive()).
+- Used by the test cases of ConsoleTestCases and by helpers with their own
+  console transactions (the modem's AT client), so each exists once.
+
+Usage:
+    def ping_steps(host):
+        yield Write(f"ping {host}\\r\\n".encode())
+        index, _, _ = yield Expect([r"is alive", r"not alive"], timeout=5)
+        return index == 0
+
+    alive = tester._drive(ping_steps("10.0.0.1"))
+"""
+
+from typing import Callable, NamedTuple
+
+__all__ = ["Write", "Expect", "Flush", "Guard", "Blocking"]
+
+
+class Write(NamedTuple):
+    data: bytes
+
+
+class Expect(NamedTuple):
+    """-> (index, match, text) like SerialExpect.expect; no patterns just listens for `timeout` s."""
+    patterns: object
+    timeout: float = 10
+    progress: bool = False      # log a "." per chunk received
+
+
+class Flush(NamedTuple):
+    """Forget everything received so far."""
+
+
+class Guard(NamedTuple):
+    seconds: float
+
+
+class Blocking(NamedTuple):
+    """Host-side call that may block (the station servers' bookkeeping); -> its result."""
+    fn: Callable
@@ -0,0 +1,80 @@
+# console_session.py
+"""
+Persistent console session for one DUT.
+
+- Opened once when the DUT's console shows up and closed when it goes away;
+  tests borrow it instead of opening/closing the port themselves, so there is
+  no open/close churn and no window in which console output is lost.
+- Built on the shared PortReader, so the GUI keeps its own cursor on the
+  same stream while a test runs.
+
+Usage:
+    session = ConsoleSession("/dev/ttyUSB0")
+    session.open()
+    tester = RTCTest(port=session.port, session=session)
+    tester.run()           # borrows the session for the duration of the test
+    ...
+    session.close()
+"""
+
+from typing import Optional
+import threading
+
+import serial
+
+from log import logger
+from serial_reader import PortReader, ReaderCursor, acquire_port_reader, release_port_reader
+
+__all__ = ["ConsoleSession"]
+
+
+class ConsoleSession:
+    def __init__(self, port: str, baudrate: int = 115200, timeout: float = 0.1):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.reader: Optional[PortReader] = None
+        self._lend_lock = threading.Lock()
+        self.borrower: Optional[str] = None
+
+    # ------- lifetime -------
+    def open(self):
+        if self.reader is None:
+            self.reader = acquire_port_reader(self.port, self.baudrate, self.timeout)
+            logger.info("Console session opened on %s", self.port)
+
+    def close(self):
+        if self.reader is not None:
+            release_port_reader(self.reader)
+            self.reader = None
+            logger.info("Console session on %s closed", self.port)
+
+    @property
+    def is_open(self) -> bool:
+        return self.reader is not None and self.reader.is_alive()
+
+    @property
+    def serial(self) -> Optional[serial.Serial]:
+        return self.reader.serial if self.reader else None
+
+    def cursor(self) -> ReaderCursor:
+        if self.reader is None:
+            raise Exception("Console session is not open")
+        return self.reader.cursor()
+
+    def write(self, data: bytes) -> int:
+        return self.reader.write(data)
+
+    # ------- lending to tests -------
+    def borrow(self, borrower: str):
+        """Lend the console to one test at a time."""
+        if not self.is_open:
+            raise Exception(f"Console session on {self.port} is not open")
+        if not self._lend_lock.acquire(blocking=False):
+            raise Exception(f"Console session on {self.port} is already lent to {self.borrower}")
+        self.borrower = borrower
+
+    def give_back(self):
+        if self.borrower is not None:
+            self.borrower = None
+            self._lend_lock.release()
@@ -0,0 +1,337 @@
+# dhcp_server.py
+"""
+Fast-lease DHCP responder (RFC 2131) for the Ethernet test.
+
+- Answers DISCOVER and REQUEST at once from a small address pool, so the
+  lease no longer depends on the lab's DHCP server and its load.
+- A unit keeps the address it was given (leases are sticky per MAC) until
+  it releases it or the pool has to reuse the oldest lease.
+- Every lease is timed (DISCOVER received to ACK sent) and kept per MAC, so
+  the test can log and record the lease latency of each unit.
+- request_lease() is the matching minimal client: it checks the responder
+  on loopback or a veth pair, and lets the simulated DUT lease for real.
+
+Usage:
+    server = acquire_dhcp_server("192.168.0.1", "192.168.0.100", interface="eth1")
+    ...DUT runs `dhcp`...
+    lease = server.wait_lease("02:00:00:00:00:01", timeout=2)
+    print(lease.ip, lease.latency)
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import ipaddress
+import random
+import socket
+import struct
+import threading
+import time
+
+from log import logger
+
+__all__ = ["DHCP_SERVER_PORT", "DHCP_CLIENT_PORT", "Lease", "DhcpServer", "acquire_dhcp_server",
+           "request_lease"]
+
+DHCP_SERVER_PORT = 67
+DHCP_CLIENT_PORT = 68
+BOOTREQUEST, BOOTREPLY = 1, 2
+DISCOVER, OFFER, REQUEST, DECLINE, ACK, NAK, RELEASE, INFORM = range(1, 9)
+MAGIC_COOKIE = 0x63825363
+# op htype hlen hops xid secs flags ciaddr yiaddr siaddr giaddr chaddr sname file
+HEADER = struct.Struct("!BBBBIHH4s4s4s4s16s64s128s")
+OPT_SUBNET_MASK, OPT_ROUTER, OPT_REQUESTED_IP, OPT_LEASE_TIME = 1, 3, 50, 51
+OPT_MESSAGE_TYPE, OPT_SERVER_ID, OPT_END, OPT_PAD = 53, 54, 255, 0
+FLAG_BROADCAST = 0x8000
+ZERO_IP = b"\0\0\0\0"
+
+
+class Lease(NamedTuple):
+    mac: str                   # "02:00:00:00:00:01"
+    ip: str
+    discovered: float          # monotonic: DISCOVER (or the REQUEST of a renewal) received
+    acked: float               # ... ACK sent
+
+    @property
+    def latency(self) -> float:
+        return self.acked - self.discovered
+
+
+class _Packet(NamedTuple):
+    op: int
+    xid: int
+    flags: int
+    ciaddr: bytes
+    yiaddr: bytes
+    giaddr: bytes
+    chaddr: bytes
+    options: Dict[int, bytes]
+
+    @property
+    def mac(self) -> str:
+        return ":".join(f"{b:02x}" for b in self.chaddr[:6])
+
+    @property
+    def message_type(self) -> int:
+        return self.options.get(OPT_MESSAGE_TYPE, b"\0")[0]
+
+
+def _parse(data: bytes) -> _Packet:
+    if len(data) < HEADER.size + 4:
+        raise ValueError("truncated packet")
+    op, _, hlen, _, xid, _, flags, ciaddr, yiaddr, _, giaddr, chaddr, _, _ = HEADER.unpack_from(data)
+    if struct.unpack_from("!I", data, HEADER.size)[0] != MAGIC_COOKIE:
+        raise ValueError("not a DHCP packet")
+    options = {}
+    i = HEADER.size + 4
+    while i < len(data):
+        code = data[i]
+        if code == OPT_END:
+            break
+        if code == OPT_PAD:
+            i += 1
+            continue
+        if i + 1 >= len(data):
+            break
+        length = data[i + 1]
+        options[code] = data[i + 2:i + 2 + length]
+        i += 2 + length
+    chaddr = chaddr[:max(6, min(16, hlen))].ljust(16, b"\0")
+    return _Packet(op, xid, flags, ciaddr, yiaddr, giaddr, chaddr, options)
+
+
+def _build(op: int, xid: int, flags: int, ciaddr: bytes, yiaddr: bytes, siaddr: bytes, giaddr: bytes,
+           chaddr: bytes, options: List[Tuple[int, bytes]]) -> bytes:
+    body = b"".join(bytes([code, len(value)]) + value for code, value in options)
+    return (HEADER.pack(op, 1, 6, 0, xid, 0, flags, ciaddr, yiaddr, siaddr, giaddr, chaddr, b"", b"")
+            + struct.pack("!I", MAGIC_COOKIE) + body + bytes([OPT_END]))
+
+
+class DhcpServer:
+    def __init__(
+        self,
+        server_ip: str,
+        pool_start: str,
+        pool_size: int = 32,
+        netmask: str = "255.255.255.0",
+        lease_time: int = 3600,
+        router: Optional[str] = None,
+        host: str = "0.0.0.0",
+        port: int = DHCP_SERVER_PORT,
+        interface: Optional[str] = None,
+    ):
+        """
+        server_ip:  address of the station on the test NIC (also the DHCP server identifier)
+        interface:  test NIC to answer on (Linux SO_BINDTODEVICE, needs root); None = all
+        host/port:  bind address; the defaults are what real DHCP clients reach
+        """
+        self.server_ip = server_ip
+        first = ipaddress.IPv4Address(pool_start)
+        self.pool = [str(first + i) for i in range(pool_size)]
+        self.netmask = netmask
+        self.lease_time = lease_time
+        self.router = router
+        self.host = host
+        self.port = port
+        self.interface = interface
+        self.leases: Dict[str, Lease] = {}          # MAC -> last ACKed lease
+        self._bound: Dict[str, str] = {}            # MAC -> address offered or leased
+        self._discovered: Dict[str, float] = {}     # MAC -> DISCOVER time of the lease in progress
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+
+    # ------- lifetime -------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+        self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        if self.interface:
+            self._sock.setsockopt(socket.SOL_SOCKET, socket.SO_BINDTODEVICE, self.interface.encode())
+        self._sock.bind((self.host, self.port))
+        self._sock.settimeout(0.5)
+        self.port = self._sock.getsockname()[1]      # port 0: the OS picked one
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, name=f"DhcpServer({self.port})", daemon=True)
+        self._thread.start()
+        logger.info(f"DHCP responder on {self.interface or self.host}:{self.port}, "
+                    f"pool {self.pool[0]} - {self.pool[-1]}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+    # ------- results -------
+    def wait_lease(self, mac: str, since: float = 0.0, timeout: float = 10.0) -> Optional[Lease]:
+        """Lease ACKed to `mac` after `since` (monotonic); None on timeout."""
+        mac = mac.lower()
+
+        def find():
+            lease = self.leases.get(mac)
+            return lease if lease is not None and lease.acked >= since else None
+
+        with self._cond:
+            self._cond.wait_for(find, timeout)
+            return find()
+
+    # ------- pool -------
+    def _allocate(self, mac: str, requested: Optional[str]) -> Optional[str]:
+        if mac in self._bound:
+            return self._bound[mac]
+        taken = set(self._bound.values())
+        if requested in self.pool and requested not in taken:
+            address = requested
+        else:
+            address = next((ip for ip in self.pool if ip not in taken), None)
+        if address is None and self.leases:
+            # Pool exhausted: reuse the address of the oldest lease
+            oldest = min(self.leases.values(), key=lambda lease: lease.acked)
+            self._release(oldest.mac)
+            address = oldest.ip
+        if address is not None:
+            self._bound[mac] = address
+        return address
+
+    def _release(self, mac: str):
+        self._bound.pop(mac, None)
+        self._discovered.pop(mac, None)
+        with self._cond:
+            self.leases.pop(mac, None)
+
+    # ------- protocol -------
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                data, source = self._sock.recvfrom(2048)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            received = time.monotonic()
+            try:
+                packet = _parse(data)
+                if packet.op == BOOTREQUEST:
+                    self._handle(packet, source, received)
+            except ValueError:
+                continue
+            except Exception:
+                logger.exception("DHCP responder: bad request")
+
+    def _handle(self, packet: _Packet, source: Tuple[str, int], received: float):
+        mac = packet.mac
+        kind = packet.message_type
+        requested = packet.options.get(OPT_REQUESTED_IP)
+        requested = socket.inet_ntoa(requested) if requested and len(requested) == 4 else None
+        if kind == DISCOVER:
+            self._discovered[mac] = received
+            address = self._allocate(mac, requested)
+            if address is None:
+                logger.warning(f"DHCP pool exhausted, no offer for {mac}")
+                return
+            self._reply(packet, source, OFFER, address)
+        elif kind == REQUEST:
+            server_id = packet.options.get(OPT_SERVER_ID)
+            if server_id and socket.inet_ntoa(server_id) != self.server_ip:
+                self._release(mac)          # the unit took another server's offer
+                return
+            wanted = requested or (socket.inet_ntoa(packet.ciaddr) if packet.ciaddr != ZERO_IP else None)
+            address = self._allocate(mac, wanted)
+            if address is None or address != wanted:
+                self._reply(packet, source, NAK, None)
+                self._release(mac)
+                return
+            self._reply(packet, source, ACK, address)
+            lease = Lease(mac, address, self._discovered.pop(mac, received), time.monotonic())
+            with self._cond:
+                self.leases[mac] = lease
+                self._cond.notify_all()
+            logger.info(f"DHCP lease {address} -> {mac} in {lease.latency * 1000:.1f} ms")
+        elif kind in (RELEASE, DECLINE):
+            self._release(mac)
+
+    def _reply(self, packet: _Packet, source: Tuple[str, int], kind: int, address: Optional[str]):
+        options = [(OPT_MESSAGE_TYPE, bytes([kind])), (OPT_SERVER_ID, socket.inet_aton(self.server_ip))]
+        if kind != NAK:
+            options += [(OPT_LEASE_TIME, struct.pack("!I", self.lease_time)),
+                        (OPT_SUBNET_MASK, socket.inet_aton(self.netmask))]
+            if self.router:
+                options.append((OPT_ROUTER, socket.inet_aton(self.router)))
+        yiaddr = socket.inet_aton(address) if address else ZERO_IP
+        reply = _build(BOOTREPLY, packet.xid, packet.flags, ZERO_IP, yiaddr, socket.inet_aton(self.server_ip),
+                       packet.giaddr, packet.chaddr, options)
+        if packet.giaddr != ZERO_IP:
+            destination = (socket.inet_ntoa(packet.giaddr), DHCP_SERVER_PORT)
+        elif source[0] != "0.0.0.0":
+            destination = source        # renewing client (or a test client on loopback)
+        else:
+            # No ARP entry can be made for an unconfigured client from user space
+            destination = ("255.255.255.255", DHCP_CLIENT_PORT)
+        self._sock.sendto(reply, destination)
+
+
+def request_lease(mac: str, server: Tuple[str, int] = ("255.255.255.255", DHCP_SERVER_PORT),
+                  bind: Tuple[str, int] = ("", DHCP_CLIENT_PORT), timeout: float = 4.0,
+                  retries: int = 3) -> Optional[Tuple[str, float]]:
+    """
+    Minimal DHCP client (DISCOVER, OFFER, REQUEST, ACK) for `mac`.
+    Returns (leased address, seconds taken) or None. Use bind=("", 0) and the
+    server's own address to talk to a responder on loopback.
+    """
+    chaddr = bytes.fromhex(mac.replace(":", "").replace("-", "")).ljust(16, b"\0")
+    xid = random.getrandbits(32)
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    start = time.monotonic()
+    try:
+        sock.setsockopt(socket.SOL_SOCKET, socket.SO_BROADCAST, 1)
+        sock.bind(bind)
+
+        def exchange(kind, options, expect):
+            packet = _build(BOOTREQUEST, xid, FLAG_BROADCAST, ZERO_IP, ZERO_IP, ZERO_IP, ZERO_IP, chaddr,
+                            [(OPT_MESSAGE_TYPE, bytes([kind]))] + options)
+            for _ in range(retries):
+                sock.sendto(packet, server)
+                deadline = time.monotonic() + timeout / retries
+                while time.monotonic() < deadline:
+                    sock.settimeout(max(0.01, deadline - time.monotonic()))
+                    try:
+                        reply = _parse(sock.recvfrom(2048)[0])
+                    except socket.timeout:
+                        break
+                    except ValueError:
+                        continue
+                    if reply.op == BOOTREPLY and reply.xid == xid and reply.message_type in expect:
+                        return reply
+            return None
+
+        offer = exchange(DISCOVER, [], (OFFER,))
+        if offer is None:
+            return None
+        ack = exchange(REQUEST, [(OPT_REQUESTED_IP, offer.yiaddr),
+                                 (OPT_SERVER_ID, offer.options.get(OPT_SERVER_ID, ZERO_IP))], (ACK, NAK))
+        if ack is None or ack.message_type != ACK:
+            return None
+        return socket.inet_ntoa(ack.yiaddr), time.monotonic() - start
+    finally:
+        sock.close()
+
+
+# ------- shared servers -------
+_servers: Dict[Tuple[Optional[str], int], DhcpServer] = {}
+_servers_lock = threading.Lock()
+
+
+def acquire_dhcp_server(server_ip: str, pool_start: str, interface: Optional[str] = None,
+                        port: int = DHCP_SERVER_PORT, **kwargs) -> DhcpServer:
+    """The running responder on `interface`/`port` (started on first use, kept for the life of the app)."""
+    with _servers_lock:
+        server = _servers.get((interface, port))
+        if server is None:
+            server = DhcpServer(server_ip, pool_start, port=port, interface=interface, **kwargs)
+            server.start()
+            _servers[(interface, port)] = server
+        return server
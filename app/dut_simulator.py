@@ -0,0 +1,1034 @@
+# dut_simulator.py
+"""
+Virtual IGv4 DUT on a pseudo-terminal (Linux, including the Raspberry Pi, and macOS; not Windows).
+
+- Emulates the console of a board: power-on banner and autoboot window,
+  the U-Boot prompt with the commands the tests use (setenv/printenv/saveenv,
+  dhcp, tftp (a real UDP client), crc32, date, gpio, md/mw, setexpr, itest, echo with $?, sleep, boot, reset,
+  ';' lists and hush if/while/until/||/&&),
+  the XBee of XbeeTest (console bridge with "+++" command mode, or API
+  frames through the UART2 registers), the OpenWRT boot log and the shell commands of
+  WiFiTest, USBTest and SIMTest (ifconfig, iw, iw event, ubus listen, wifi,
+  lsusb, /dev/ttyUSB2 AT commands, heredocs, pipes into grep, background
+  jobs with $! and kill, cksum) and the results of the on-device test agent.
+- Timings and failures are set with a DUTProfile, so tests and the GUI can
+  be developed and timed without a board.
+
+Usage:
+    dut = VirtualDUT(DUTProfile(dhcp_time=2.0, failures={"wifi"}), start_state="uboot")
+    port = dut.start()                     # e.g. /dev/pts/5
+    RTCTest(port=port).run()
+    dut.stop()
+
+From a shell (then enter the printed port under Configure > Serial Port):
+    python dut_simulator.py --state off --link /tmp/ttyIGv4 --fail usb
+"""
+
+from typing import Dict, List, Optional, Tuple
+from collections import deque
+import argparse
+import datetime
+import json
+import os
+import re
+import select
+import shlex
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from log import logger
+from dhcp_server import request_lease
+from linux_agent import AGENT_PATH, posix_cksum
+from uboot_tester import UBOOT_PROMPT, OPENWRT_PROMPT, OPENWRT_PROMPT_2, AUTOBOOT_STOP_KEY
+
+__all__ = ["DUTProfile", "VirtualDUT", "FAILURES"]
+
+# Failures a profile can inject
+FAILURES = ("boot", "dhcp", "rtc", "xbee", "battery", "wifi", "usb", "sim")
+
+SHELL_PROMPT = "root@OpenWrt:/# "
+UBOOT_CMD_PROMPT = "=> "
+# Memory-mapped registers the tests touch
+PB_PULLUP_REG = 0xb0004030
+POWER_FAIL_GPIO = 45
+XBEE_RESET_GPIO = 65
+UART2_DAT = 0xb0072000
+UART2_FIFOSTS = 0xb0072018
+UART_FIFO_SIZE = 16
+XBEE_VERSION = b"\x20\x0a"      # ATVR
+# hush compound commands: keyword -> separators, the last one closes the block
+HUSH_BLOCKS = {"while": ("do", "done"), "until": ("do", "done"), "if": ("then", "else", "fi")}
+HUSH_MAX_ITERATIONS = 100000
+# U-Boot's TFTP client: requested block size, retries, one '#' per this many bytes
+TFTP_BLKSIZE = 1468
+TFTP_RETRIES = 5
+TFTP_RETRY_TIMEOUT = 1.0
+TFTP_HASH_BYTES = 16 * 1024
+
+DEFAULT_USB_DEVICES = [
+    ("1e0e:9001", "SimTech, Incorp."),
+    ("2e8a:000a", "Raspberry Pi RP2040"),
+    ("2fe3:0100", "ZEPHYR ECS_USB"),
+]
+
+
+class DUTProfile:
+    """Timings (seconds) and behaviour of the simulated board."""
+
+    def __init__(self, **overrides):
+        self.uboot_boot_time = 0.5      # power on -> autoboot banner
+        self.autoboot_window = 1.0      # "Autoboot in 1 seconds"
+        self.linux_boot_time = 4.0      # boot -> OpenWRT milestone
+        self.command_latency = 0.005    # before each command's output
+        self.saveenv_time = 0.3
+        self.dhcp_time = 0.5
+        self.dhcp_address: Optional[str] = None   # leased address (None = the ipaddr set before dhcp)
+        self.dhcp_server: Optional[Tuple[str, int]] = None   # lease for real from this DHCP server (e.g. on loopback)
+        self.eth_throughput: Optional[float] = None   # TFTP download rate in bytes/s (None = as fast as possible)
+        self.wlan_up_time = 2.0         # after Linux is up until wlan0 exists
+        self.modem_enumerate_time = 3.0  # after Linux is up until the SimTech modem is on the USB bus
+        self.wifi_connect_time = 3.0    # after "wifi up" until associated
+        self.power_fail_after = 3.0     # PF pin drops this long after its pull-up is enabled; None = never
+        self.xbee_api = True            # the XBee runs in API mode (AP=1): frames only, no "+++"
+        self.rtc_drift = 0.0            # the RTC runs (1 + rtc_drift) times as fast as the wall clock
+        self.baudrate: Optional[int] = None   # pace output like a UART at this rate (None = as fast as possible)
+        self.failures = set()
+        self.usb_devices = list(DEFAULT_USB_DEVICES)
+        self.ccid = "89914509001234567890"
+        for name, value in overrides.items():
+            if not hasattr(self, name):
+                raise ValueError(f"Unknown DUTProfile setting: {name}")
+            setattr(self, name, value)
+        unknown = set(self.failures) - set(FAILURES)
+        if unknown:
+            raise ValueError(f"Unknown failures: {', '.join(sorted(unknown))}")
+
+    @classmethod
+    def fast(cls, **overrides):
+        """Short boot/network times for development."""
+        settings = dict(uboot_boot_time=0.1, linux_boot_time=0.5, saveenv_time=0.05, dhcp_time=0.1,
+                        wlan_up_time=0.2, modem_enumerate_time=0.3, wifi_connect_time=0.5, power_fail_after=1.0)
+        settings.update(overrides)
+        return cls(**settings)
+
+
+def _split_list(line: str, sep: str) -> List[str]:
+    """Split on `sep` outside quotes."""
+    parts, current, quote = [], "", None
+    for ch in line:
+        if quote:
+            quote = None if ch == quote else quote
+        elif ch in "'\"":
+            quote = ch
+        elif ch == sep:
+            parts.append(current)
+            current = ""
+            continue
+        current += ch
+    parts.append(current)
+    return [p.strip() for p in parts]
+
+
+def _tokens(cmd: str) -> List[str]:
+    try:
+        return shlex.split(cmd)
+    except ValueError:
+        return cmd.split()
+
+
+class VirtualDUT:
+    def __init__(self, profile: Optional[DUTProfile] = None, start_state: str = "off"):
+        """start_state: "off" (power on when started), "uboot" or "openwrt" (already at the prompt)."""
+        if start_state not in ("off", "uboot", "openwrt"):
+            raise ValueError(f"Unknown start state: {start_state}")
+        self.profile = profile or DUTProfile()
+        self.start_state = start_state
+        self.state = "off"              # "off", "booting", "uboot", "openwrt"
+        self.port: Optional[str] = None
+        self._master: Optional[int] = None
+        self._slave: Optional[int] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._power_cycle = threading.Event()
+        self.bytes_in = 0
+        self.bytes_out = 0
+        self._reset_board()
+
+    # ------- lifetime -------
+    def start(self) -> str:
+        import pty
+        import tty
+        self._master, self._slave = pty.openpty()
+        tty.setraw(self._slave)         # no echo/translation: the simulator is the line discipline
+        self.port = os.ttyname(self._slave)
+        self._thread = threading.Thread(target=self._run, name=f"VirtualDUT {self.port}", daemon=True)
+        self._thread.start()
+        logger.info("Virtual DUT on %s (%s)", self.port, self.start_state)
+        return self.port
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(2)
+        for fd in (self._master, self._slave):
+            if fd is not None:
+                os.close(fd)
+        self._master = self._slave = None
+
+    def power_cycle(self):
+        """Pull the plug and power the board on again."""
+        self._power_cycle.set()
+
+    def _reset_board(self):
+        self.env: Dict[str, str] = {"bootdelay": "1", "baudrate": "115200", "stdin": "nuc980_serial0",
+                                    "stdout": "nuc980_serial0"}
+        self.memory: Dict[int, int] = {}
+        self.ram: Dict[int, bytes] = {}          # blobs loaded by tftp, by load address
+        self.gpio: Dict[int, int] = {POWER_FAIL_GPIO: 1}
+        self.status = 0
+        self._line = ""
+        self._last_char = ""
+        self._last_input = time.monotonic()
+        self._pullup_time: Optional[float] = None
+        self._xbee_plus_count = 0
+        self._xbee_plus_time: Optional[float] = None
+        self._xbee_command_until = 0.0
+        self._xbee_at = ""
+        self._typeahead = b""                    # input read while checking for Ctrl+C
+        self._xbee_frame = bytearray()          # API frame being received from UART2
+        self._uart2_started = False
+        self._uart2_rx = deque(maxlen=UART_FIFO_SIZE)   # XBee -> UART2 RX FIFO (overflow drops the oldest)
+        self._rtc_base = datetime.datetime(2025, 1, 1, 12, 0, 0)
+        self._rtc_start = time.monotonic()
+        # OpenWRT
+        self.files: Dict[str, str] = {}
+        self._shell_active = False
+        self._heredoc: Optional[dict] = None
+        self._linux_up = 0.0
+        self._wifi_up: Optional[float] = None
+        self._modem_reader = False
+        self._shell_vars: Dict[str, str] = {}
+        self._jobs: Dict[int, str] = {}         # pid -> command of the background jobs
+        self._next_pid = 1234
+        self._reported = set()                  # pids of listeners that printed the WiFi events
+
+    # ------- I/O -------
+    def _write(self, text: str):
+        data = text.encode()
+        self.bytes_out += len(data)
+        baud = self.profile.baudrate
+        if not baud:
+            os.write(self._master, data)
+            return
+        for i in range(0, len(data), 64):
+            chunk = data[i:i + 64]
+            os.write(self._master, chunk)
+            time.sleep(len(chunk) * 10 / baud)
+
+    def _read(self, timeout: float) -> bytes:
+        ready, _, _ = select.select([self._master], [], [], timeout)
+        if not ready:
+            return b""
+        try:
+            data = os.read(self._master, 1024)
+        except OSError:
+            return b""
+        self.bytes_in += len(data)
+        return data
+
+    def _ctrlc(self) -> bool:
+        """U-Boot's ctrlc(): True if Ctrl+C was typed; other input stays queued."""
+        data = self._read(0)
+        if b"\x03" in data:
+            self._typeahead += data[data.index(b"\x03") + 1:]
+            return True
+        self._typeahead += data
+        return False
+
+    def _sleep(self, seconds: float) -> bool:
+        """Busy board: input stays queued in the pty. False if stopped or power-cycled meanwhile."""
+        end = time.monotonic() + seconds
+        while time.monotonic() < end:
+            if self._stop.is_set() or self._power_cycle.is_set():
+                return False
+            time.sleep(min(0.05, max(0, end - time.monotonic())))
+        return True
+
+    # ------- main loop -------
+    def _run(self):
+        try:
+            if self.start_state == "off":
+                self._power_on()
+            elif self.start_state == "uboot":
+                self.state = "uboot"
+            else:
+                self.state = "openwrt"
+                self._linux_up = time.monotonic() - self.profile.wlan_up_time
+                self._shell_active = True
+            while not self._stop.is_set():
+                if self._power_cycle.is_set():
+                    self._power_on()
+                    continue
+                data, self._typeahead = self._typeahead or self._read(0.1), b""
+                for ch in data.decode("utf-8", errors="ignore"):
+                    self._on_char(ch)
+                if data:
+                    self._last_input = time.monotonic()
+                self._emit_events()
+        except Exception:
+            logger.exception("Virtual DUT on %s crashed", self.port)
+
+    def _power_on(self):
+        self._power_cycle.clear()
+        self._reset_board()
+        self.state = "booting"
+        if not self._sleep(self.profile.uboot_boot_time):
+            return
+        self._write("\r\n\r\nU-Boot 2016.05 (IGv4 simulator)\r\n\r\nDRAM:  64 MiB\r\nSF: Detected w25q128 with page size 256 Bytes\r\n"
+                    "In:    serial\r\nOut:   serial\r\nErr:   serial\r\nNet:   emac\r\n")
+        self._write(f"{UBOOT_PROMPT}\r\n")
+        typed = ""
+        end = time.monotonic() + self.profile.autoboot_window
+        while time.monotonic() < end and not self._stop.is_set():
+            typed += self._read(max(0, end - time.monotonic())).decode("utf-8", errors="ignore")
+            if AUTOBOOT_STOP_KEY in typed:
+                self.state = "uboot"
+                self._write(f"\r\n{UBOOT_CMD_PROMPT}")
+                return
+        self._boot_linux()
+
+    def _boot_linux(self):
+        self.state = "booting"
+        self._write("## Booting kernel from Legacy Image at 00007fc0 ...\r\n   Verifying Checksum ... OK\r\n"
+                    "   Loading Kernel Image ... OK\r\n\r\nStarting kernel ...\r\n\r\n")
+        if "boot" in self.profile.failures:
+            self._sleep(self.profile.linux_boot_time)
+            self._write("Kernel panic - not syncing: VFS: Unable to mount root fs on unknown-block(0,0)\r\n")
+            return      # hangs until power-cycled
+        boot_log = [
+            "Booting Linux on physical CPU 0x0",
+            "Linux version 5.10.0 (builder@igv4) #1 PREEMPT",
+            "CPU: ARM926EJ-S [41069265] revision 5 (ARMv5TEJ), cr=0005317f",
+            "VFS: Mounted root (squashfs filesystem) readonly on device 31:3.",
+            "kmodloader: done loading kernel modules from /etc/modules.d/*",
+            f"{OPENWRT_PROMPT_2} up - 100Mbps/Full - flow control off",
+            "usb 1-1: new high-speed USB device number 2 using ehci-platform",
+            f"{OPENWRT_PROMPT} (simulated ESP32-C5 over SDIO)",
+            "procd: - init complete -",
+        ]
+        step = self.profile.linux_boot_time / len(boot_log)
+        stamp = 0.0
+        for line in boot_log:
+            if not self._sleep(step):
+                return
+            stamp += step
+            self._write(f"[{stamp:12.6f}] {line}\r\n")
+        self._write("\r\nPlease press Enter to activate this console.\r\n")
+        self.state = "openwrt"
+        self._shell_active = False
+        self._linux_up = time.monotonic()
+
+    # ------- line discipline -------
+    def _on_char(self, ch: str):
+        if self.state == "uboot" and self._xbee_input(ch):
+            return
+        prev, self._last_char = self._last_char, ch
+        if self.state not in ("uboot", "openwrt"):
+            return      # nobody is reading the console while booting
+        if ch == "\n" and prev == "\r":
+            return      # CR LF is one Enter
+        if ch in "\r\n":
+            line, self._line = self._line, ""
+            self._write("\r\n")
+            if self.state == "uboot":
+                self._run_uboot_line(line)
+                if self.state == "uboot":
+                    self._write(UBOOT_CMD_PROMPT)
+            else:
+                self._run_shell_input(line)
+        elif ch == "\x03":
+            self._line = ""
+            if self.state == "uboot":
+                self._write(f"<INTERRUPT>\r\n{UBOOT_CMD_PROMPT}")
+            elif self._shell_active:
+                self._heredoc = None
+                self._write(f"^C\r\n{SHELL_PROMPT}")
+        elif ch in "\x08\x7f":
+            if self._line:
+                self._line = self._line[:-1]
+                self._write("\b \b")
+        elif ch.isprintable() or ch == "\t":
+            self._line += ch
+            if self.state == "uboot" or self._shell_active:
+                self._write(ch)
+
+    # ------- XBee bridge (XbeeTest) -------
+    def _xbee_input(self, ch: str) -> bool:
+        """Input consumed by the XBee while its UART is bridged onto the console."""
+        if ("nuc980_serial2" not in self.env.get("stdin", "") or self.gpio.get(XBEE_RESET_GPIO) != 1
+                or self.profile.xbee_api):
+            self._xbee_plus_count = 0
+            self._xbee_plus_time = None
+            return False
+        now = time.monotonic()
+        if self._xbee_plus_time is not None:
+            # "+++" needs a second of silence after it as well
+            if now - self._xbee_plus_time >= 1.0 and "xbee" not in self.profile.failures:
+                self._xbee_command_until = now + 10      # CT: command mode times out after 10 s
+            self._xbee_plus_time = None
+        if ch == "+" and (self._xbee_plus_count or now - self._last_input >= 1.0):
+            self._xbee_plus_count += 1
+            if self._xbee_plus_count == 3:
+                self._xbee_plus_count = 0
+                self._xbee_plus_time = now
+            return True
+        self._xbee_plus_count = 0
+        if now < self._xbee_command_until and (self._xbee_at or ch == "A"):
+            if ch == "\r":
+                self._xbee_at = ""
+                self._xbee_command_until = now + 10
+                self._write("OK\r")
+            else:
+                self._xbee_at += ch
+            return True
+        return False
+
+    @staticmethod
+    def _api_frame(data: bytes) -> bytes:
+        return b"\x7e" + len(data).to_bytes(2, "big") + data + bytes([0xFF - (sum(data) & 0xFF)])
+
+    def _xbee_reset(self):
+        """The XBee leaves reset; in API mode it announces itself with a modem status frame."""
+        self._xbee_frame.clear()
+        if self.profile.xbee_api and self._uart2_started and "xbee" not in self.profile.failures:
+            self._uart2_rx.extend(self._api_frame(b"\x8a\x00"))      # hardware reset
+
+    def _xbee_api_input(self, byte: int):
+        """A byte transmitted on UART2 (mw to its data register)."""
+        if (not self.profile.xbee_api or not self._uart2_started or "xbee" in self.profile.failures
+                or self.gpio.get(XBEE_RESET_GPIO) != 1):
+            return
+        frame = self._xbee_frame
+        if not frame and byte != 0x7E:
+            return
+        frame.append(byte)
+        if len(frame) < 3 or len(frame) < int.from_bytes(frame[1:3], "big") + 4:
+            return
+        data, check = bytes(frame[3:-1]), frame[-1]
+        frame.clear()
+        if 0xFF - (sum(data) & 0xFF) != check or len(data) < 4 or data[0] != 0x08:
+            return              # the module drops bad frames silently
+        frame_id, command = data[1], data[2:4]
+        if command == b"VR":
+            reply = b"\x00" + XBEE_VERSION
+        elif command.isalpha() and command.isupper():
+            reply = b"\x00"
+        else:
+            reply = b"\x02"     # invalid command
+        if frame_id:
+            self._uart2_rx.extend(self._api_frame(b"\x88" + bytes([frame_id]) + command + reply))
+
+    # ------- U-Boot -------
+    def _expand(self, text: str) -> str:
+        text = text.replace("$?", str(self.status))
+        return re.sub(r"\$\{(\w+)\}|\$(\w+)", lambda m: self.env.get(m.group(1) or m.group(2), ""), text)
+
+    def _run_uboot_line(self, line: str):
+        try:
+            self._run_statements([cmd for cmd in _split_list(line, ";") if cmd])
+        except ValueError as e:
+            self._write(f"{e}\r\n")
+            self.status = 1
+
+    def _run_statements(self, statements: List[str]) -> bool:
+        """
+        hush subset: commands, `a || b`, `a && b`, while/until ... do ... done and if ... then ... else ... fi.
+        False once the board stops running commands (boot, reset, power cycle).
+        """
+        pos = 0
+        while pos < len(statements):
+            if statements[pos].split(None, 1)[0] in HUSH_BLOCKS:
+                kind, parts, pos = self._parse_block(statements, pos)
+                if not self._run_block(kind, parts):
+                    return False
+            else:
+                if not self._run_and_or(statements[pos]):
+                    return False
+                pos += 1
+        return True
+
+    @staticmethod
+    def _parse_block(statements: List[str], pos: int):
+        """(kind, [condition, body, else-body], next position) of the block starting at `pos`."""
+        kind, _, first = statements[pos].partition(" ")
+        separators = HUSH_BLOCKS[kind]
+        parts: List[List[str]] = [[first.strip()] if first.strip() else []]
+        depth = 1 if first.split(None, 1)[:1] and first.split()[0] in HUSH_BLOCKS else 0
+        for i in range(pos + 1, len(statements)):
+            word, _, rest = statements[i].partition(" ")
+            if depth == 0 and word in separators:
+                if word == separators[-1]:
+                    return kind, parts, i + 1
+                parts.append([rest.strip()] if rest.strip() else [])
+                word = rest.split(None, 1)[0] if rest.strip() else ""
+            else:
+                parts[-1].append(statements[i])
+            if word in HUSH_BLOCKS:
+                depth += 1
+            elif word in ("done", "fi"):
+                depth -= 1
+        raise ValueError(f"syntax error: missing '{separators[-1]}'")
+
+    def _run_block(self, kind: str, parts: List[List[str]]) -> bool:
+        if kind == "if":
+            if not self._run_statements(parts[0]):
+                return False
+            return self._run_statements(parts[1] if self.status == 0 else parts[2] if len(parts) > 2 else [])
+        for _ in range(HUSH_MAX_ITERATIONS):
+            if not self._run_statements(parts[0]):
+                return False
+            if (self.status == 0) != (kind == "while"):
+                break
+            if len(parts) > 1 and not self._run_statements(parts[1]):
+                return False
+        self.status = 0
+        return True
+
+    def _run_and_or(self, statement: str) -> bool:
+        pieces = re.split(r"\s*(\|\||&&)\s*", statement)
+        for i in range(0, len(pieces), 2):
+            operator = pieces[i - 1] if i else None
+            if (operator == "||" and self.status == 0) or (operator == "&&" and self.status != 0):
+                continue
+            if not self._sleep(self.profile.command_latency):
+                return False
+            self.status = self._uboot_command(_tokens(self._expand(pieces[i])))
+            if self.state != "uboot":
+                return False
+        return True
+
+    def _uboot_command(self, args: List[str]) -> int:
+        name, args = args[0], args[1:]
+        if name == "echo":
+            self._write(" ".join(args) + "\r\n")
+        elif name == "setenv":
+            if not args:
+                self._write("Usage:\r\nsetenv - set environment variables\r\n")
+                return 1
+            if len(args) == 1:
+                self.env.pop(args[0], None)
+            else:
+                self.env[args[0]] = " ".join(args[1:])
+                if args[0] in ("stdin", "stdout") and "nuc980_serial2" in self.env[args[0]]:
+                    self._uart2_started = True
+        elif name == "printenv":
+            names = args or sorted(self.env)
+            for n in names:
+                if n not in self.env:
+                    self._write(f"## Error: \"{n}\" not defined\r\n")
+                    return 1
+                self._write(f"{n}={self.env[n]}\r\n")
+        elif name == "saveenv":
+            self._write("Saving Environment to SPI Flash...\r\nErasing SPI flash...")
+            self._sleep(self.profile.saveenv_time)
+            self._write("Writing to SPI flash...done\r\nOK\r\n")
+        elif name == "dhcp":
+            self._write("BOOTP broadcast 1\r\n")
+            if not self._sleep(self.profile.dhcp_time):
+                return 1
+            if "dhcp" in self.profile.failures:
+                self._write("BOOTP broadcast 2\r\nBOOTP broadcast 3\r\n\r\nRetry time exceeded\r\n")
+                return 1
+            elapsed = self.profile.dhcp_time
+            if self.profile.dhcp_server:
+                lease = request_lease(self.env.get("ethaddr", "02:00:00:00:00:00"), server=self.profile.dhcp_server,
+                                      bind=("", 0), timeout=2.0)
+                if lease is None:
+                    self._write("BOOTP broadcast 2\r\nBOOTP broadcast 3\r\n\r\nRetry time exceeded\r\n")
+                    return 1
+                self.env["ipaddr"], seconds = lease
+                elapsed += seconds
+            else:
+                self.env["ipaddr"] = self.profile.dhcp_address or self.env.get("ipaddr", "192.168.0.218")
+            self._write(f"DHCP client bound to address {self.env['ipaddr']} ({int(elapsed * 1000)} ms)\r\n")
+        elif name == "tftp":
+            return self._tftp(args)
+        elif name == "crc32":
+            if len(args) < 2:
+                self._write("Usage:\r\ncrc32 - checksum calculation\r\n")
+                return 1
+            addr, length = int(args[0], 16), int(args[1], 16)
+            crc = zlib.crc32(self._ram_read(addr, length)) & 0xFFFFFFFF
+            self._write(f"crc32 for {addr:08x} ... {addr + length - 1:08x} ==> {crc:08x}\r\n")
+        elif name == "date":
+            if "rtc" in self.profile.failures:
+                self._write("## Get date failed\r\n")
+                return 1
+            elapsed = (time.monotonic() - self._rtc_start) * (1 + self.profile.rtc_drift)
+            now = self._rtc_base + datetime.timedelta(seconds=elapsed)
+            self._write(f"Date: {now:%Y-%m-%d} ({now:%A})    Time: {now:%H:%M:%S}\r\n")
+        elif name == "gpio":
+            return self._gpio(args)
+        elif name in ("md", "md.l"):
+            if not args:
+                self._write("Usage:\r\nmd - memory display\r\n")
+                return 1
+            addr, count = int(args[0], 16) & ~3, int(args[1], 16) if len(args) > 1 else 64
+            for row in range(0, count, 4):
+                words = [self._read_word(addr + 4 * (row + i)) for i in range(min(4, count - row))]
+                self._write(f"{addr + 4 * row:08x}: " + " ".join(f"{w:08x}" for w in words) + "\r\n")
+        elif name in ("mw", "mw.l"):
+            if len(args) < 2:
+                self._write("Usage:\r\nmw - memory write (fill)\r\n")
+                return 1
+            addr, value = int(args[0], 16) & ~3, int(args[1], 16)
+            for i in range(int(args[2], 16) if len(args) > 2 else 1):
+                self.memory[addr + 4 * i] = value
+                if addr + 4 * i == UART2_DAT:
+                    self._xbee_api_input(value & 0xFF)
+            if addr == PB_PULLUP_REG and value & (1 << 26):
+                self._pullup_time = time.monotonic()
+        elif name == "setexpr":
+            if len(args) not in (2, 4):
+                self._write("Usage:\r\nsetexpr [.b, .w, .l] name [*]value1 <op> [*]value2\r\n")
+                return 1
+            value = self._hex_value(args[1])
+            if len(args) == 4:
+                other = self._hex_value(args[3])
+                ops = {"+": lambda a, b: a + b, "-": lambda a, b: a - b, "*": lambda a, b: a * b,
+                       "/": lambda a, b: a // b if b else 0, "%": lambda a, b: a % b if b else 0,
+                       "&": lambda a, b: a & b, "|": lambda a, b: a | b, "^": lambda a, b: a ^ b}
+                if args[2] not in ops:
+                    self._write(f"invalid op {args[2]}\r\n")
+                    return 1
+                value = ops[args[2]](value, other)
+            self.env[args[0]] = f"{value & 0xFFFFFFFF:x}"
+        elif name in ("itest", "itest.l"):
+            if len(args) != 3:
+                self._write("Usage:\r\nitest [.b, .w, .l, .s] [*]value1 <op> [*]value2\r\n")
+                return 1
+            a, b = self._hex_value(args[0]), self._hex_value(args[2])
+            ops = {"-lt": a < b, "<": a < b, "-le": a <= b, "<=": a <= b, "-gt": a > b, ">": a > b,
+                   "-ge": a >= b, ">=": a >= b, "-eq": a == b, "==": a == b, "-ne": a != b, "!=": a != b}
+            if args[1] not in ops:
+                self._write(f"Unknown operator '{args[1]}'\r\n")
+                return 1
+            return 0 if ops[args[1]] else 1
+        elif name == "sleep":
+            end = time.monotonic() + (float(args[0]) if args else 0)
+            while time.monotonic() < end:
+                if self._ctrlc() or not self._sleep(min(0.01, max(0, end - time.monotonic()))):
+                    return 1
+        elif name in ("boot", "bootm"):
+            self._boot_linux()
+        elif name == "reset":
+            self._write("resetting ...\r\n")
+            self._power_cycle.set()
+            self.state = "off"
+        else:
+            self._write(f"Unknown command '{name}' - try 'help'\r\n")
+            return 1
+        return 0
+
+    def _ram_read(self, addr: int, length: int) -> bytes:
+        data = bytearray(length)
+        for start, blob in self.ram.items():
+            lo, hi = max(addr, start), min(addr + length, start + len(blob))
+            if lo < hi:
+                data[lo - addr:hi - addr] = blob[lo - start:hi - start]
+        return bytes(data)
+
+    def _tftp(self, args: List[str]) -> int:
+        """U-Boot `tftp [addr] file`: a real TFTP download from $serverip (port $tftpdstp)."""
+        addr = int(args[0], 16) if len(args) > 1 else int(self.env.get("loadaddr", "1000000"), 16)
+        filename = args[-1] if args else self.env.get("bootfile", "")
+        server = (self.env.get("serverip", ""), int(self.env.get("tftpdstp", "69")))
+        self._write(f"Using nuc980-emac0 device\r\nTFTP from server {server[0]}; "
+                    f"our IP address is {self.env.get('ipaddr', '')}\r\n"
+                    f"Filename '{filename}'.\r\nLoad address: 0x{addr:x}\r\nLoading: ")
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            try:
+                sock.bind((self.env.get("ipaddr", ""), 0))     # so the server sees the leased address
+            except OSError:
+                sock.bind(("", 0))
+            sock.settimeout(TFTP_RETRY_TIMEOUT)
+            blksize = 512
+            options = [filename, "octet", "blksize", str(TFTP_BLKSIZE), "tsize", "0"]
+            request = struct.pack("!H", 1) + "".join(f"{field}\0" for field in options).encode()
+            packet, destination = request, server
+            data = bytearray()
+            block, peer, retries = 1, None, 0
+            started = time.monotonic()
+            sock.sendto(packet, destination)
+            while True:
+                if self._ctrlc():
+                    self._write("\r\nAbort\r\n")
+                    return 1
+                try:
+                    reply, address = sock.recvfrom(65536)
+                except socket.timeout:
+                    retries += 1
+                    if retries > TFTP_RETRIES:
+                        self._write("\r\nRetry count exceeded; starting again\r\n")
+                        return 1
+                    self._write("T ")
+                    sock.sendto(packet, destination)
+                    continue
+                except OSError as e:       # e.g. ICMP port unreachable
+                    self._write(f"\r\nTFTP error: '{e.strerror}'\r\nNot retrying...\r\n")
+                    return 1
+                if peer is None:
+                    peer = destination = address
+                if address != peer or len(reply) < 4:
+                    continue
+                opcode, number = struct.unpack("!HH", reply[:4])
+                if opcode == 5:
+                    message = reply[4:].split(b"\0")[0].decode(errors="replace")
+                    self._write(f"\r\nTFTP error: '{message}' ({number})\r\nNot retrying...\r\n")
+                    return 1
+                if opcode == 6:
+                    fields = reply[2:].split(b"\0")
+                    options = dict(zip(fields[0::2], fields[1::2]))
+                    blksize = int(options.get(b"blksize", blksize))
+                    packet = struct.pack("!HH", 4, 0)
+                elif opcode == 3:
+                    payload = reply[4:]
+                    if number == block & 0xFFFF:
+                        before = len(data) // TFTP_HASH_BYTES
+                        data += payload
+                        self._write("#" * (len(data) // TFTP_HASH_BYTES - before))
+                        block += 1
+                    if self.profile.eth_throughput:
+                        # Slow PHY: hold the ACK until the data "arrived" at the configured rate
+                        lag = started + len(data) / self.profile.eth_throughput - time.monotonic()
+                        if lag > 0 and not self._sleep(lag):
+                            return 1
+                    packet = struct.pack("!HH", 4, number)
+                    if len(payload) < blksize:
+                        sock.sendto(packet, destination)
+                        break
+                retries = 0
+                sock.sendto(packet, destination)
+        finally:
+            sock.close()
+        elapsed = time.monotonic() - started
+        self.ram[addr] = bytes(data)
+        self.env["filesize"] = f"{len(data):x}"
+        self._write(f"\r\n\t {len(data) / max(elapsed, 1e-3) / (1 << 20):.1f} MiB/s\r\ndone\r\n"
+                    f"Bytes transferred = {len(data)} ({len(data):x} hex)\r\n")
+        return 0
+
+    def _hex_value(self, text: str) -> int:
+        """A setexpr/itest operand: hex number or *address."""
+        if text.startswith("*"):
+            return self._read_word(int(text[1:], 16) & ~3)
+        try:
+            return int(text, 16)
+        except ValueError:
+            return 0
+
+    def _read_word(self, addr: int) -> int:
+        if addr == UART2_FIFOSTS:
+            return (len(self._uart2_rx) << 8) if self._uart2_rx else 1 << 14    # RXPTR / RXEMPTY
+        if addr == UART2_DAT:
+            return self._uart2_rx.popleft() if self._uart2_rx else 0
+        return self.memory.get(addr, 0)
+
+    def _gpio(self, args: List[str]) -> int:
+        if len(args) != 2 or args[0] not in ("input", "set", "clear", "toggle") or not args[1].isdigit():
+            self._write("Usage:\r\ngpio <input|set|clear|toggle> <pin>\r\n")
+            return 1
+        action, pin = args[0], int(args[1])
+        if action == "input":
+            value = self.gpio.get(pin, 0)
+            if pin == POWER_FAIL_GPIO:
+                value = self._power_fail_pin()
+        else:
+            value = {"set": 1, "clear": 0}.get(action, 1 - self.gpio.get(pin, 0))
+            if pin == XBEE_RESET_GPIO and value and not self.gpio.get(pin):
+                self._xbee_reset()
+            self.gpio[pin] = value
+        self._write(f"gpio: pin {pin} (gpio {pin}) value is {value}\r\n")
+        return value if action == "input" else 0     # U-Boot 2016: `gpio input` exits with the pin value
+
+    def _power_fail_pin(self) -> int:
+        if self._pullup_time is None:
+            return 0            # floating input without the pull-up
+        if "battery" in self.profile.failures or self.profile.power_fail_after is None:
+            return 1
+        return 0 if time.monotonic() - self._pullup_time >= self.profile.power_fail_after else 1
+
+    # ------- OpenWRT shell -------
+    def _run_shell_input(self, line: str):
+        if not self._shell_active:
+            self._shell_active = True
+            self._write("\r\n\r\nBusyBox v1.33.2 (2025-01-01) built-in shell (ash)\r\n\r\n" + SHELL_PROMPT)
+            return
+        if self._heredoc is not None:
+            if line.strip() == self._heredoc["end"]:
+                self.files[self._heredoc["path"]] = "".join(self._heredoc["lines"])
+                self._heredoc = None
+                self._write(SHELL_PROMPT)
+            else:
+                self._heredoc["lines"].append(line + "\n")
+                self._write("> ")
+            return
+        m = re.match(r"cat\s*>\s*(\S+)\s*<<\s*'?(\w+)'?\s*$", line.strip())
+        if m:
+            self._heredoc = {"path": m.group(1), "end": m.group(2), "lines": []}
+            self._write("> ")
+            return
+        if line.strip():
+            self._sleep(self.profile.command_latency)
+            self.status = self._shell_command(line.strip())
+        if self.state == "openwrt":
+            self._write(SHELL_PROMPT)
+
+    def _shell_command(self, line: str) -> int:
+        line = line.replace("2>/dev/null", "").replace("|| true", "").strip()
+        status = 0
+        for command in _split_list(line, ";"):
+            # "a & b": a runs in the background
+            parts = [p.strip() for p in re.split(r"(?<!&)&(?!&)", command)]
+            for index, part in enumerate(parts):
+                if part:
+                    status = self._shell_pipeline(part, background=index < len(parts) - 1)
+        return status
+
+    def _shell_pipeline(self, line: str, background: bool) -> int:
+        redirect = None
+        m = re.match(r"(.*?)\s*>\s*(/\S+)$", line)
+        if m:
+            line, redirect = m.group(1), m.group(2)
+        stages = _split_list(line, "|")
+        status, output = self._shell_run(_tokens(self._expand_shell(stages[0])), background)
+        for stage in stages[1:]:
+            args = _tokens(stage)
+            if args[:1] == ["grep"] and len(args) > 1:
+                lines = [l for l in output.splitlines(True) if args[-1] in l]
+                output = "".join(lines)
+                status = 0 if lines else 1
+        if redirect == "/dev/ttyUSB2":
+            self._modem_write(output)
+        elif redirect:
+            self.files[redirect] = output.replace("\r\n", "\n")
+        else:
+            self._write(output)
+        return status
+
+    def _expand_shell(self, text: str) -> str:
+        text = text.replace("$?", str(self.status)).replace("$!", str(self._next_pid - 1))
+        text = re.sub(r"\$\(cat (\S+)\)", lambda m: self.files.get(m.group(1), "").strip(), text)
+        return re.sub(r"\$\{(\w+)\}|\$(\w+)", lambda m: self._shell_vars.get(m.group(1) or m.group(2), ""), text)
+
+    def _start_job(self, command: str) -> str:
+        pid = self._next_pid
+        self._next_pid += 1
+        self._jobs[pid] = command
+        return f"[{len(self._jobs)}] {pid}\r\n"
+
+    def _emit_events(self):
+        """Output of the `iw event` / `ubus listen` jobs once the WiFi is connected."""
+        if self.state != "openwrt" or not self._wifi_connected():
+            return
+        for pid, command in sorted(self._jobs.items(), key=lambda job: not job[1].startswith("iw")):
+            if pid in self._reported:
+                continue
+            if command.startswith("iw event"):
+                self._write("wlan0 (phy #0): connected to 9c:53:22:aa:bb:cc\r\n")
+            elif command.startswith("ubus listen"):
+                self._write('{ "network.interface": {"action":"ifup","interface":"wwan"} }\r\n')
+            self._reported.add(pid)
+
+    def _wifi_connected(self) -> bool:
+        return (self._wifi_up is not None and "wifi" not in self.profile.failures
+                and time.monotonic() - self._wifi_up >= self.profile.wifi_connect_time)
+
+    def _shell_run(self, args: List[str], background: bool):
+        """Run one command; returns (status, output)."""
+        if not args:
+            return 0, ""
+        name, args = args[0], args[1:]
+        now = time.monotonic()
+        if re.match(r"\w+=", name) and not args:
+            key, value = name.split("=", 1)
+            self._shell_vars[key] = value
+            return 0, ""
+        if name == "echo":
+            text = " ".join(a for a in args if a not in ("-e", "-n"))
+            if "-e" in args:
+                text = text.replace("\\r", "\r").replace("\\n", "\n")
+            return 0, text + ("" if "-n" in args else "\r\n")
+        if name == "ifconfig":
+            names = [a for a in args if not a.startswith("-")]
+            wlan_exists = now - self._linux_up >= self.profile.wlan_up_time
+            blocks = {"eth0": self._iface("eth0", "00:1A:2B:3C:4D:5E", "192.168.0.218", 5321, 1234),
+                      "lo": self._iface("lo", None, "127.0.0.1", 0, 0)}
+            if wlan_exists:
+                up = self._wifi_connected()
+                blocks["wlan0"] = self._iface("wlan0", "24:0A:C4:00:00:01", "192.168.1.50" if up else None,
+                                              48213 if up else 0, 9120 if up else 0)
+            if names:
+                if names[0] not in blocks:
+                    return 1, f"ifconfig: {names[0]}: error fetching interface information: Device not found\r\n"
+                return 0, blocks[names[0]]
+            return 0, "".join(blocks.values())
+        if name == "iw":
+            if args[:1] == ["event"]:
+                return 0, self._start_job("iw event") if background else ""
+            if self._wifi_connected():
+                ssid = re.search(r"option ssid '([^']*)'", self.files.get("/etc/config/wireless", ""))
+                return 0, (f"Connected to 9c:53:22:aa:bb:cc (on wlan0)\r\n\tSSID: {ssid.group(1) if ssid else 'SSID'}\r\n"
+                           "\tfreq: 2462\r\n\tsignal: -48 dBm\r\n\ttx bitrate: 72.2 MBit/s\r\n")
+            return 0, "Not connected.\r\n"
+        if name == "wifi":
+            if not args or args[0] in ("up", "reload"):
+                self._wifi_up = now
+            elif args[0] == "down":
+                self._wifi_up = None
+            return 0, ""
+        if name == "ubus":
+            if args[:1] == ["listen"] and background:
+                return 0, self._start_job("ubus " + " ".join(args))
+            return 0, ""
+        if name == "kill":
+            for pid in args:
+                if pid.isdigit():
+                    self._jobs.pop(int(pid), None)
+            self._modem_reader = "cat /dev/ttyUSB2" in self._jobs.values()
+            return 0, ""
+        if name == "rm":
+            for path in args:
+                self.files.pop(path, None)
+            return 0, ""
+        if name in ("ifdown", "ifup"):
+            if args and args[0] in ("wlan0", "wwan"):
+                self._wifi_up = now if name == "ifup" else None
+            return 0, ""
+        if name == "lsusb":
+            lines = ["Bus 001 Device 001: ID 1d6b:0002 Linux Foundation 2.0 root hub"]
+            if "usb" not in self.profile.failures:
+                modem_up = now - self._linux_up >= self.profile.modem_enumerate_time
+                lines += [f"Bus 001 Device {i:03d}: ID {vid_pid} {desc}"
+                          for i, (vid_pid, desc) in enumerate(self.profile.usb_devices, start=2)
+                          if modem_up or not vid_pid.startswith("1e0e:")]
+            return 0, "\r\n".join(lines) + "\r\n"
+        if name == "cat":
+            if args == ["/dev/ttyUSB2"] and background:
+                self._modem_reader = True
+                return 0, self._start_job("cat /dev/ttyUSB2")
+            if args and args[0] in self.files:
+                return 0, self.files[args[0]].replace("\n", "\r\n")
+            return 1, f"cat: can't open '{args[0] if args else ''}': No such file or directory\r\n"
+        if name == "date":
+            return 0, datetime.datetime.now().strftime("%a %b %d %H:%M:%S UTC %Y") + "\r\n"
+        if name == "reboot":
+            self._write("The system is going down NOW!\r\nSent SIGTERM to all processes\r\nRequesting system reboot\r\n")
+            self._power_cycle.set()
+            self.state = "off"
+            return 0, ""
+        if name == "cksum":
+            if args and args[0] in self.files:
+                data = self.files[args[0]].encode()
+                return 0, f"{posix_cksum(data)} {len(data)} {args[0]}\r\n"
+            return 1, f"cksum: {args[0] if args else '-'}: No such file or directory\r\n"
+        if name == "sh" and args[:1] == [AGENT_PATH] and AGENT_PATH in self.files:
+            return 0, self._run_agent(*(int(a) for a in args[1:4]))
+        if name in ("true", "false"):
+            return int(name == "false"), ""
+        return 127, f"-ash: {name}: not found\r\n"
+
+    def _run_agent(self, wifi_timeout: int = 60, usb_timeout: int = 20, usb_count: int = 0) -> str:
+        """The test agent's checks run in parallel: it takes as long as the slowest one."""
+        now = time.monotonic()
+        wifi_start = max(now, self._linux_up + self.profile.wlan_up_time)
+        wifi_ok = "wifi" not in self.profile.failures and wifi_start - now <= wifi_timeout
+        wifi_end = wifi_start + self.profile.wifi_connect_time if wifi_ok else now + wifi_timeout
+        modem_up = self._linux_up + self.profile.modem_enumerate_time
+        usb_ok = "usb" not in self.profile.failures and modem_up - now <= usb_timeout
+        usb_end = max(now, modem_up) if usb_ok else now + usb_timeout
+        if not self._sleep(max(wifi_end, usb_end) - now):
+            return ""
+        self._wifi_up = wifi_start if wifi_start - now <= wifi_timeout else None
+        _, listing = self._shell_run(["lsusb"], False)
+        usb = [f"{m.group(1)} {m.group(2)}" for m in re.finditer(r"ID (\S+) ([^\r\n]*)", listing)
+               if not m.group(1).startswith("1d6b:")]
+        wifi = {"bssid": "", "ip": "", "rx_bytes": 0, "tx_bytes": 0}
+        if self._wifi_connected():
+            wifi = {"bssid": "9c:53:22:aa:bb:cc", "ip": "192.168.1.50", "rx_bytes": 48213, "tx_bytes": 9120}
+        modem = usb_ok and "sim" not in self.profile.failures
+        block = json.dumps({"wifi": wifi, "usb": usb, "sim": {"ccid": self.profile.ccid if modem else ""}},
+                           separators=(",", ":"))
+        return f"~AGENT:BEGIN\r\n{block}\r\n~AGENT:END {posix_cksum(block.encode())} {len(block)}\r\n"
+
+    @staticmethod
+    def _iface(name: str, hwaddr: Optional[str], inet: Optional[str], rx: int, tx: int) -> str:
+        encap = f"Ethernet  HWaddr {hwaddr}" if hwaddr else "Local Loopback"
+        lines = [f"{name:<10}Link encap:{encap}"]
+        if inet:
+            lines.append(f"          inet addr:{inet}  Mask:255.255.255.0")
+        lines += ["          UP BROADCAST RUNNING MULTICAST  MTU:1500  Metric:1",
+                  f"          RX packets:{rx // 100} errors:0 dropped:0 overruns:0 frame:0",
+                  f"          TX packets:{tx // 100} errors:0 dropped:0 overruns:0 carrier:0",
+                  f"          RX bytes:{rx} ({rx / 1024:.1f} KiB)  TX bytes:{tx} ({tx / 1024:.1f} KiB)", ""]
+        return "\r\n".join(lines) + "\r\n"
+
+    def _modem_write(self, data: str):
+        """AT command written to the modem; its answer shows up through `cat /dev/ttyUSB2 &`."""
+        if not self._modem_reader:
+            return
+        command = data.strip()
+        if command.upper() == "AT+CCID":
+            if "sim" in self.profile.failures:
+                reply = "+CME ERROR: 10"
+            else:
+                reply = f"+CCID: {self.profile.ccid}\r\n\r\nOK"
+        elif command.upper() == "AT+CSQ":
+            reply = "+CSQ: 99,99\r\n\r\nOK" if "sim" in self.profile.failures else "+CSQ: 21,99\r\n\r\nOK"
+        elif command.upper() == "AT+CREG?":
+            reply = f"+CREG: 0,{2 if 'sim' in self.profile.failures else 1}\r\n\r\nOK"
+        else:
+            reply = "OK"
+        self._write(f"{command}\r\r\n{reply}\r\n")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Virtual IGv4 DUT on a pseudo-terminal")
+    parser.add_argument("--state", choices=("off", "uboot", "openwrt"), default="off",
+                        help="state at start (off = power on and show the autoboot banner)")
+    parser.add_argument("--fail", default="", help=f"comma-separated failures: {', '.join(FAILURES)}")
+    parser.add_argument("--fast", action="store_true", help="short boot and network times")
+    parser.add_argument("--baudrate", type=int, default=None, help="pace output like a UART at this rate")
+    parser.add_argument("--link", help="also expose the port under this path (symlink)")
+    parser.add_argument("--xbee-transparent", action="store_true", help="XBee in transparent mode (AP=0)")
+    args = parser.parse_args()
+
+    failures = {f for f in args.fail.split(",") if f}
+    profile = DUTProfile.fast(failures=failures) if args.fast else DUTProfile(failures=failures)
+    profile.baudrate = args.baudrate
+    profile.xbee_api = not args.xbee_transparent
+    dut = VirtualDUT(profile, start_state=args.state)
+    port = dut.start()
+    if args.link:
+        if os.path.islink(args.link):
+            os.remove(args.link)
+        os.symlink(port, args.link)
+    print(f"Virtual DUT on {args.link or port} (Enter: power-cycle, Ctrl+C: stop)")
+    try:
+        while True:
+            input()
+            dut.power_cycle()
+    except (KeyboardInterrupt, EOFError):
+        pass
+    finally:
+        dut.stop()
+        if args.link and os.path.islink(args.link):
+            os.remove(args.link)
+
+
+if __name__ == "__main__":
+    main()
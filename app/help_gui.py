@@ -57,6 +57,8 @@ class HelpCenter(tk.Toplevel):
                 ("body", (
                     "When the application starts, it waits for u-boot prompt to be received through serial.\n"
                     "Once detected the status symbol changes to green. You can start testing at this point.\n\n"
+                    "When a test needs OpenWRT, the status line follows the boot (kernel, root filesystem, "
+                    "kernel modules, ESP32, eth0) and the symbol turns green as soon as the shell answers.\n\n"
                 )),
                 ("subheading", "No Adapters Found\n"),
                 ("body", "If no interfaces are detected, you’ll see:\n"),
@@ -111,6 +113,8 @@ class HelpCenter(tk.Toplevel):
                     f"  {bullet} runtime.log\n"
                     f"  {bullet} error.log\n"
                     f"  {bullet} crash.log\n"
+                    f"  {bullet} metrics.jsonl (time spent in each test phase)\n"
+                    f"  {bullet} metrics.prom (the same timings for Prometheus)\n"
                     "Refer to these files when diagnosing bugs or unexpected crashes.\n"
                 )),
             ],
@@ -132,14 +136,23 @@ class HelpCenter(tk.Toplevel):
             "simulating": [
                 ("heading", "Simulating Test\n"),
                 ("body", (
-                    "Use **Simulation Mode** to run tests without connecting to actual hardware. "
-                    "The application generates logs and progress feedback, but no real network connections are made.\n"
+                    "The **DUT simulator** emulates an IGv4 console on a pseudo-terminal, so tests can be run "
+                    "without a board (Linux, including the Raspberry Pi, and macOS; not Windows). It answers the U-Boot and OpenWRT commands "
+                    "used by the tests, with configurable timings and failures.\n"
                 )),
-                ("warning", "Warning: Simulation Mode does not change or report real adapter status.\n"),
-                ("subheading", "When to Use Simulation Mode\n"),
+                ("subheading", "Starting the Simulator\n"),
+                ("body", (
+                    f"{bullet} Run **python dut_simulator.py --link /tmp/ttyIGv4** in a terminal.\n"
+                    f"{bullet} Enter **/tmp/ttyIGv4** as the Serial Port under **Configure**.\n"
+                    f"{bullet} Add **--fail usb,sim** (any of boot, dhcp, rtc, xbee, battery, wifi, usb, sim) to inject failures.\n"
+                    f"{bullet} Add **--fast** for short boot times, **--state uboot** to start at the U-Boot prompt.\n"
+                    f"{bullet} Add **--xbee-transparent** for an XBee without API mode (the test then uses **+++**).\n"
+                )),
+                ("warning", "Warning: Results of a simulated run are not hardware results; do not save or print labels for them.\n"),
+                ("subheading", "When to Use the Simulator\n"),
                 ("body", (
                     "- Safe debugging of test sequences without risking hardware.  \n"
-                    "- Demonstrations and training sessions where real adapters aren’t required.\n"
+                    "- Timing test changes and demonstrations where real adapters aren’t required.\n"
                 )),
             ]
         }
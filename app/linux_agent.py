@@ -0,0 +1,264 @@
+# linux_agent.py
+"""
+On-device test agent for the OpenWRT phase.
+
+- A small POSIX shell script, copied to /tmp on the DUT once per boot (it is
+  only re-sent when its checksum on the DUT differs), runs the WiFi, USB and
+  modem checks as parallel background jobs on the board itself.
+- It prints one compact JSON result block, framed by ~AGENT markers and
+  followed by the POSIX `cksum` (CRC and length) of the JSON, so a block that
+  was garbled on the console is rejected instead of misread.
+- The host maps the block back onto the pass/fail results of WiFiTest,
+  USBTest and SIMTest: the phase takes as long as its slowest check.
+
+Usage:
+    results = run_agent_checks({"wifi": wifi_tester, "usb": usb_tester, "sim": sim_tester})
+    # {"wifi": True, "usb": True, "sim": False}; {} if the agent could not run
+"""
+
+from typing import Dict, List, NamedTuple, Optional
+import json
+import re
+import time
+
+from log import logger
+from usb_devices import USBDevice, match_devices
+
+__all__ = ["AGENT_PATH", "AGENT_SCRIPT", "AgentError", "AgentReport", "posix_cksum", "parse_agent_output",
+           "LinuxAgent", "run_agent_checks"]
+
+AGENT_PATH = "/tmp/igv4_agent.sh"
+# Result block: the markers are waited for one by one, the JSON line between them can be long
+AGENT_BEGIN_RE = r'~AGENT:BEGIN\r?\n'
+AGENT_END_RE = r'~AGENT:END (\d+) (\d+)\r?\n'
+AGENT_RESULT_RE = r'~AGENT:BEGIN\r?\n([^\r\n]*)\r?\n~AGENT:END (\d+) (\d+)\r?\n'
+SHELL_PROMPT_RE = r'root@[^\r\n]*[#$] '     # uboot_tester.SHELL_PROMPT_RE
+
+# Spaces only: a tab typed into the interactive shell would trigger completion
+AGENT_SCRIPT = r'''#!/bin/sh
+# igv4 test agent 1: WiFi, USB and modem checks in parallel, one JSON block
+WIFI_TIMEOUT=${1:-60}
+USB_TIMEOUT=${2:-20}
+USB_COUNT=${3:-0}
+MODEM=/dev/ttyUSB2
+W=/tmp/igv4_agent.d
+rm -rf $W; mkdir -p $W
+str() { printf '"%s"' "$(printf '%s' "$1" | tr -d '"\\' | tr '\r\n\t' '   ')"; }
+
+check_wifi() {
+  i=0
+  while [ ! -d /sys/class/net/wlan0 ] && [ $i -lt $((WIFI_TIMEOUT * 5)) ]; do sleep 0.2; i=$((i+1)); done
+  wifi reload; wifi up
+  i=0; link=""; ip=""
+  while [ $i -lt $((WIFI_TIMEOUT * 5)) ]; do
+    link=$(iw dev wlan0 link 2>/dev/null)
+    ip=$(ifconfig wlan0 2>/dev/null | sed -n 's/.*inet addr:\([0-9.]*\).*/\1/p')
+    case "$link" in *"Connected to"*) [ -n "$ip" ] && break;; esac
+    sleep 0.2; i=$((i+1))
+  done
+  bssid=$(echo "$link" | sed -n 's/.*Connected to \([0-9a-fA-F:]*\).*/\1/p')
+  rx=$(cat /sys/class/net/wlan0/statistics/rx_bytes 2>/dev/null || echo 0)
+  tx=$(cat /sys/class/net/wlan0/statistics/tx_bytes 2>/dev/null || echo 0)
+  printf '{"bssid":%s,"ip":%s,"rx_bytes":%s,"tx_bytes":%s}' "$(str "$bssid")" "$(str "$ip")" "$rx" "$tx" > $W/wifi
+}
+
+check_usb() {
+  i=0
+  while :; do
+    lsusb | grep -v ' 1d6b:' > $W/lsusb
+    [ $(wc -l < $W/lsusb) -ge $USB_COUNT ] || [ $i -ge $((USB_TIMEOUT * 4)) ] && break
+    sleep 0.25; i=$((i+1))
+  done
+  sep=""; printf '[' > $W/usb.tmp
+  while read -r bus b dev d id vidpid desc; do
+    printf '%s%s' "$sep" "$(str "$vidpid $desc")" >> $W/usb.tmp; sep=","
+  done < $W/lsusb
+  printf ']' >> $W/usb.tmp; mv $W/usb.tmp $W/usb
+}
+
+check_sim() {
+  i=0
+  while [ ! -c $MODEM ] && [ $i -lt $((USB_TIMEOUT * 5)) ]; do sleep 0.2; i=$((i+1)); done
+  [ -c $MODEM ] || { printf '{"ccid":""}' > $W/sim; return; }
+  cat $MODEM > $W/modem & reader=$!
+  i=0
+  while [ $i -lt 15 ]; do
+    [ $((i % 5)) -eq 0 ] && printf 'AT+CCID\r' > $MODEM
+    grep -qE '^(OK|ERROR|\+CME ERROR)' $W/modem && break
+    sleep 0.2; i=$((i+1))
+  done
+  kill $reader 2>/dev/null
+  ccid=$(sed -n 's/.*+CCID: *"\{0,1\}\([0-9A-Fa-f]*\).*/\1/p' $W/modem | head -n 1)
+  printf '{"ccid":%s}' "$(str "$ccid")" > $W/sim
+}
+
+check_wifi & check_usb & check_sim & wait
+json=$(printf '{"wifi":%s,"usb":%s,"sim":%s}' "$(cat $W/wifi 2>/dev/null || echo null)" \
+  "$(cat $W/usb 2>/dev/null || echo null)" "$(cat $W/sim 2>/dev/null || echo null)")
+echo "~AGENT:BEGIN"
+printf '%s\n' "$json"
+echo "~AGENT:END $(printf '%s' "$json" | cksum)"
+'''
+
+
+def _crc_table() -> List[int]:
+    table = []
+    for i in range(256):
+        crc = i << 24
+        for _ in range(8):
+            crc = ((crc << 1) ^ 0x04C11DB7) if crc & 0x80000000 else crc << 1
+        table.append(crc & 0xFFFFFFFF)
+    return table
+
+
+_CRC_TABLE = _crc_table()
+
+
+def posix_cksum(data: bytes) -> int:
+    """CRC printed by POSIX `cksum` (BusyBox and coreutils) for `data`."""
+    crc = 0
+    for byte in data:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[(crc >> 24) ^ byte]
+    length = len(data)
+    while length:
+        crc = ((crc << 8) & 0xFFFFFFFF) ^ _CRC_TABLE[(crc >> 24) ^ (length & 0xFF)]
+        length >>= 8
+    return ~crc & 0xFFFFFFFF
+
+
+def _script_cksum() -> str:
+    data = AGENT_SCRIPT.encode()
+    return f"{posix_cksum(data)} {len(data)}"
+
+
+class AgentError(Exception):
+    pass
+
+
+class AgentReport(NamedTuple):
+    wifi: Optional[dict]            # bssid, ip, rx_bytes, tx_bytes
+    usb: Optional[List[str]]        # "vid:pid description" per device (root hubs left out)
+    sim: Optional[dict]             # ccid
+
+    @property
+    def wifi_ok(self) -> bool:
+        w = self.wifi or {}
+        return bool(w.get("bssid") and w.get("ip") and w.get("rx_bytes", 0) > 0 and w.get("tx_bytes", 0) > 0)
+
+    @property
+    def usb_devices(self) -> List[USBDevice]:
+        devices = []
+        for index, entry in enumerate(self.usb or [], start=2):
+            vid_pid, _, description = entry.partition(" ")
+            vid, _, pid = vid_pid.partition(":")
+            devices.append(USBDevice(1, index, vid.lower(), pid.lower(), description.strip()))
+        return devices
+
+    @property
+    def ccid(self) -> Optional[str]:
+        return (self.sim or {}).get("ccid") or None
+
+
+def parse_agent_output(text: str) -> AgentReport:
+    """The agent's result block in `text`; AgentError if it is missing or fails its checksum."""
+    m = re.search(AGENT_RESULT_RE, text)
+    if not m:
+        raise AgentError("no agent result block")
+    block = m.group(1).encode()
+    crc, length = int(m.group(2)), int(m.group(3))
+    if len(block) != length or posix_cksum(block) != crc:
+        raise AgentError(f"checksum mismatch ({len(block)} bytes received, {length} sent)")
+    try:
+        data = json.loads(block)
+    except ValueError as e:
+        raise AgentError(f"bad JSON: {e}")
+    return AgentReport(data.get("wifi"), data.get("usb"), data.get("sim"))
+
+
+class LinuxAgent:
+    def __init__(self, tester, timeout: float = 2.0):
+        """tester: connected UBootTester whose console is at the OpenWRT shell."""
+        self.tester = tester
+        self.timeout = timeout
+
+    def _shell(self, line: str, pattern: str = SHELL_PROMPT_RE, timeout: Optional[float] = None):
+        self.tester._flush_input()
+        self.tester.ser.write((line + '\r\n').encode())
+        return self.tester.wait_for(pattern, timeout=self.timeout if timeout is None else timeout)
+
+    def install(self) -> bool:
+        """Copy the script to the DUT unless the same version is already there."""
+        if self._installed_cksum() == _script_cksum():
+            return True
+        logger.info(f"Copying the test agent to {AGENT_PATH}")
+        self._shell(f"cat > {AGENT_PATH} <<'AGENT_EOF'\n{AGENT_SCRIPT}AGENT_EOF", timeout=10)
+        return self._installed_cksum() == _script_cksum()
+
+    def _installed_cksum(self) -> Optional[str]:
+        # The digits only appear in cksum's output, never in the echo of the command
+        _, _, text = self._shell(f"cksum {AGENT_PATH} 2>/dev/null; echo ~agent:$?", r'~agent:\d+')
+        m = re.search(r'(\d+ \d+) ' + re.escape(AGENT_PATH), text)
+        return m.group(1) if m else None
+
+    def run(self, wifi_timeout: float = 60, usb_timeout: float = 20, usb_count: int = 0) -> AgentReport:
+        """Run all checks on the DUT; AgentError if no valid result block came back."""
+        self.tester._flush_input()
+        self.tester.ser.write(f"sh {AGENT_PATH} {int(wifi_timeout)} {int(usb_timeout)} {usb_count}\r\n".encode())
+        # The checks wait for wlan0/the modem first, then for their own timeout
+        index, _, head = self.tester.wait_for(AGENT_BEGIN_RE, timeout=wifi_timeout * 2 + 10)
+        if index < 0:
+            raise AgentError("agent did not finish")
+        index, _, text = self.tester.wait_for(AGENT_END_RE, timeout=self.timeout)
+        if index < 0:
+            raise AgentError("agent result block cut short")
+        return parse_agent_output(head + text)
+
+
+def run_agent_checks(testers: Dict[str, object], wifi_timeout: float = 60) -> Dict[str, bool]:
+    """
+    Run the agent on the console of the given testers ("wifi": WiFiTest, "usb": USBTest,
+    "sim": SIMTest; any subset) and return their pass/fail results. {} when the agent
+    could not run, so the caller can fall back to the tests themselves.
+    """
+    if not testers:
+        return {}
+    console = next(iter(testers.values()))
+    usb = testers.get("usb")
+    wifi = testers.get("wifi")
+    start = time.monotonic()
+    try:
+        console.connect()
+        agent = LinuxAgent(console)
+        if not agent.install():
+            console._log(">>> Could not copy the test agent to the DUT\n")
+            return {}
+        if wifi:
+            # The agent brings the radio up; the host only writes the configuration files
+            for cmd in wifi.config_cmds:
+                agent._shell(cmd, timeout=5)
+        console._log(f">>> Running {', '.join(testers)} checks on the DUT...\n")
+        report = agent.run(wifi_timeout=wifi_timeout, usb_count=len(usb.expect) if usb else 0)
+    except AgentError as e:
+        logger.warning(f"Test agent failed: {e}")
+        console._log(f">>> Test agent failed: {e}\n")
+        return {}
+    except Exception:
+        logger.exception("Test agent raised")
+        return {}
+    finally:
+        console.disconnect()
+
+    results = {}
+    if "wifi" in testers:
+        results["wifi"] = report.wifi_ok
+        console._log(f"[{'✔' if report.wifi_ok else '✘'}]WiFi {report.wifi}\n")
+    if usb:
+        found, missing = match_devices(report.usb_devices, usb.expect)
+        results["usb"] = not missing
+        for pattern in usb.expect:
+            console._log(f"[✔]{found[pattern]}\n" if pattern in found else f"[✘]{pattern}\n")
+    if "sim" in testers:
+        results["sim"] = report.ccid is not None
+        console._log(f"[{'✔' if report.ccid else '✘'}]SIM CCID {report.ccid}\n")
+    logger.info(f"Test agent: {results} in {time.monotonic() - start:.1f} s")
+    return results
@@ -2,8 +2,12 @@
 
 import os
 import sys
+import copy
+import json
+import queue
+import atexit
 import logging
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
 
 # === Directory setup ===
 LOG_DIR = os.path.join(os.path.dirname(__file__), "logs")
@@ -17,62 +21,107 @@ logger.propagate = False  # don’t bubble up to root
 # Internal flag to ensure handlers are only added once
 _handlers_initialized = False
 
-def delete_old_logs():
-    """Remove any .log files in LOG_DIR before starting fresh."""
-    for fname in os.listdir(LOG_DIR):
-        if fname.endswith(".log"):
-            try:
-                os.remove(os.path.join(LOG_DIR, fname))
-            except OSError:
-                # If deletion fails, we’ll catch it downstream
-                pass
-
-def setup_log_handlers():
+
+class JsonLinesFormatter(logging.Formatter):
+    """One compact JSON object per record: ts, level, thread, msg (and exc)."""
+
+    def format(self, record):
+        entry = {"ts": round(record.created, 3), "level": record.levelname, "thread": record.threadName,
+                 "msg": record.getMessage()}
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        elif record.exc_text:
+            entry["exc"] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False, separators=(",", ":"))
+
+
+class _DeferredQueueHandler(QueueHandler):
+    """Enqueue the record as is: formatting is left to the listener thread."""
+
+    def prepare(self, record):
+        record = copy.copy(record)
+        record.msg = record.getMessage()    # the arguments may change once the caller goes on
+        record.args = None
+        return record
+
+
+# Listener of the queued mode (None when the handlers are attached directly)
+_listener = None
+
+
+def _build_handlers(json_lines=False):
+    # Rotating handlers, append mode, UTF-8
+    handlers = [
+        RotatingFileHandler(
+            os.path.join(LOG_DIR, "runtime.log"),
+            maxBytes=10 * 1024 * 1024,
+            backupCount=5,
+            encoding="utf-8"
+        ),
+        RotatingFileHandler(
+            os.path.join(LOG_DIR, "errors.log"),
+            maxBytes=5 * 1024 * 1024,
+            backupCount=3,
+            encoding="utf-8"
+        ),
+        RotatingFileHandler(
+            os.path.join(LOG_DIR, "crash.log"),
+            maxBytes=2 * 1024 * 1024,
+            backupCount=2,
+            encoding="utf-8"
+        ),
+        logging.StreamHandler(sys.stderr),  # console fallback
+    ]
+
+    # Levels: INFO+ → runtime, WARNING+ → errors, ERROR+ → crash, DEBUG+ → console
+    handlers[0].setLevel(logging.INFO)
+    handlers[1].setLevel(logging.WARNING)
+    handlers[2].setLevel(logging.ERROR)
+    handlers[3].setLevel(logging.DEBUG)
+
+    fmt = logging.Formatter(
+        "%(asctime)s %(name)s [%(levelname)s] %(message)s",
+        datefmt="%Y-%m-%d %H:%M:%S"
+    )
+    file_fmt = JsonLinesFormatter() if json_lines else fmt
+    for h in handlers[:3]:
+        h.setFormatter(file_fmt)
+    handlers[3].setFormatter(fmt)
+    return handlers
+
+
+def start_new_session_logs():
+    """Roll the log files over, so this run starts fresh files and the previous ones are kept as .1."""
+    handlers = _listener.handlers if _listener else logger.handlers
+    for h in handlers:
+        if isinstance(h, RotatingFileHandler):
+            with h.lock:                    # the listener thread may be writing
+                if h.stream and h.stream.tell() > 0:
+                    h.doRollover()
+
+
+def setup_log_handlers(queued=False, json_lines=False):
     """
     Install file and console handlers exactly once.
+    queued:     the logger only enqueues records; a listener thread formats them, rotates
+                the files and writes them (nothing slow on the caller's thread)
+    json_lines: write the files as compact JSON lines instead of text
     Returns True on success, False on failure.
     """
-    global _handlers_initialized
+    global _handlers_initialized, _listener
     if _handlers_initialized:
         return True
 
     try:
-        # Rotating handlers, append mode, UTF-8
-        handlers = [
-            RotatingFileHandler(
-                os.path.join(LOG_DIR, "runtime.log"),
-                maxBytes=10 * 1024 * 1024,
-                backupCount=5,
-                encoding="utf-8"
-            ),
-            RotatingFileHandler(
-                os.path.join(LOG_DIR, "errors.log"),
-                maxBytes=5 * 1024 * 1024,
-                backupCount=3,
-                encoding="utf-8"
-            ),
-            RotatingFileHandler(
-                os.path.join(LOG_DIR, "crash.log"),
-                maxBytes=2 * 1024 * 1024,
-                backupCount=2,
-                encoding="utf-8"
-            ),
-            logging.StreamHandler(sys.stderr),  # console fallback
-        ]
-
-        # Levels: INFO+ → runtime, WARNING+ → errors, ERROR+ → crash, DEBUG+ → console
-        handlers[0].setLevel(logging.INFO)
-        handlers[1].setLevel(logging.WARNING)
-        handlers[2].setLevel(logging.ERROR)
-        handlers[3].setLevel(logging.DEBUG)
-
-        fmt = logging.Formatter(
-            "%(asctime)s %(name)s [%(levelname)s] %(message)s",
-            datefmt="%Y-%m-%d %H:%M:%S"
-        )
-        for h in handlers:
-            h.setFormatter(fmt)
-            logger.addHandler(h)
+        handlers = _build_handlers(json_lines)
+        if queued:
+            _listener = QueueListener(queue.SimpleQueue(), *handlers, respect_handler_level=True)
+            _listener.start()
+            logger.addHandler(_DeferredQueueHandler(_listener.queue))
+            atexit.register(stop_logging)
+        else:
+            for h in handlers:
+                logger.addHandler(h)
 
         _handlers_initialized = True
         return True
@@ -87,6 +136,16 @@ def setup_log_handlers():
         logger.error("Failed to initialize file handlers for logging", exc_info=True)
         return False
 
+
+def stop_logging():
+    """Write out the records still queued and stop the listener (queued mode; also run at exit)."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        for h in _listener.handlers:
+            h.close()
+        _listener = None
+
 # === Uncaught exception hook ===
 def _handle_exception(exc_type, exc_value, exc_tb):
     if issubclass(exc_type, KeyboardInterrupt):
@@ -98,16 +157,20 @@ def _handle_exception(exc_type, exc_value, exc_tb):
 sys.excepthook = _handle_exception
 
 # === Initialization ===
-def initialize_logging(clean_logs: bool = True) -> bool:
+def initialize_logging(new_session: bool = True, queued: bool = True, json_lines: bool = False) -> bool:
     """
     Call this once at program start.
     
     Args:
-        clean_logs: if True, deletes old .log files before setup.
+        new_session: if True, this run starts with fresh log files; the previous
+                     session's logs are rotated to .1.
+        queued:      log through a queue and a listener thread (see setup_log_handlers).
+        json_lines:  write the log files as compact JSON lines.
     
     Returns:
         True if handlers are in place; False otherwise.
     """
-    if clean_logs:
-        delete_old_logs()
-    return setup_log_handlers()
+    ok = setup_log_handlers(queued=queued, json_lines=json_lines)
+    if ok and new_session:
+        start_new_session_logs()
+    return ok
@@ -0,0 +1,121 @@
+# log_sink.py
+"""
+Batched log view for the GUI.
+
+- write() only queues the message (any thread, no Tk call), so a tester
+  logging one "." per received chunk no longer redraws the window each time.
+- The Tk thread flushes the queue at a fixed rate: one insert per frame,
+  whatever the number of messages.
+- Consecutive identical lines ("Waiting for wlan0 status...", progress dots)
+  are shown once with a repeat count.
+- The view keeps the last `max_lines` lines; the full text goes to the log
+  file through the logger, as before.
+
+Usage:
+    sink = TkLogSink(root, text_widget, max_lines=2000)
+    sink.write("Running test...")      # from any thread
+    sink.clear()
+"""
+
+from typing import List, Optional, Tuple
+import queue
+import tkinter as tk
+
+__all__ = ["LogBatcher", "TkLogSink", "FLUSH_INTERVAL_MS", "MAX_VIEW_LINES"]
+
+FLUSH_INTERVAL_MS = 100     # 10 frames/s is plenty for a log and cheap on a Raspberry Pi
+MAX_VIEW_LINES = 2000
+_CLEAR = object()
+
+
+class LogBatcher:
+    """Collapses repeated lines across batches (no Tk, so it can be reused and checked alone)."""
+
+    def __init__(self):
+        self._last: Optional[str] = None
+        self._count = 0
+
+    def reset(self):
+        self._last, self._count = None, 0
+
+    def feed(self, lines: List[str]) -> Tuple[Optional[str], List[str]]:
+        """
+        -> (new text for the line already shown last, or None; lines to append).
+        A repeat of the last line shown rewrites it with its count instead of adding a line.
+        """
+        replace = None
+        out: List[str] = []
+        for line in lines:
+            if line and line == self._last:
+                self._count += 1
+                shown = f"{line}  (x{self._count})"
+                if out:
+                    out[-1] = shown
+                else:
+                    replace = shown
+            else:
+                self._last, self._count = line, 1
+                out.append(line)
+        return replace, out
+
+
+class TkLogSink:
+    def __init__(self, root, widget: tk.Text, max_lines: int = MAX_VIEW_LINES,
+                 interval_ms: int = FLUSH_INTERVAL_MS):
+        """widget: read-only (DISABLED) Text widget; it is only touched on the Tk thread."""
+        self.root = root
+        self.widget = widget
+        self.max_lines = max_lines
+        self.interval_ms = interval_ms
+        self._queue: "queue.Queue" = queue.Queue()
+        self._batcher = LogBatcher()
+        self.root.after(self.interval_ms, self._flush)
+
+    def write(self, msg: str):
+        """Queue `msg` as one or more lines (thread-safe)."""
+        self._queue.put(msg)
+
+    def clear(self):
+        """Empty the view once the messages queued so far are handled (keeps their order)."""
+        self._queue.put(_CLEAR)
+
+    def _flush(self):
+        try:
+            self._flush_pending()
+        finally:
+            self.root.after(self.interval_ms, self._flush)
+
+    def _flush_pending(self):
+        chunks: List[str] = []
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _CLEAR:
+                chunks.clear()
+                self._batcher.reset()
+                self.widget.config(state=tk.NORMAL)
+                self.widget.delete("1.0", tk.END)
+                self.widget.config(state=tk.DISABLED)
+            else:
+                # A message ends its last line; most already end in "\n" (no empty line after them)
+                chunks.append(item if item.endswith("\n") else item + "\n")
+        if not chunks:
+            return
+        replace, lines = self._batcher.feed("".join(chunks).replace("\r", "").split("\n")[:-1])
+
+        follow = self.widget.yview()[1] >= 0.999      # don't scroll away from what the user is reading
+        self.widget.config(state=tk.NORMAL)
+        if replace is not None:
+            last = self.widget.index("end-2l linestart")
+            self.widget.delete(last, f"{last} lineend")
+            self.widget.insert(last, replace)
+        if lines:
+            self.widget.insert(tk.END, "\n".join(lines) + "\n")
+        shown = int(self.widget.index("end-1c").split(".")[0]) - 1
+        if shown > self.max_lines:
+            self.widget.delete("1.0", f"{shown - self.max_lines + 1}.0")
+        self.widget.config(state=tk.DISABLED)
+        if follow:
+            self.widget.see(tk.END)
@@ -0,0 +1,171 @@
+# metrics.py
+"""
+Per-phase timing of the testers.
+
+- Every tester phase (connect, setup, guard, expect, parse, disconnect) is
+  timed as a span carrying the test name, the unit's MAC and the port.
+- Spans are buffered and appended to logs/metrics.jsonl (one JSON object per
+  line) after each test, or every FLUSH_EVERY spans; logs/metrics.prom is
+  rewritten after each test in the Prometheus text format (node_exporter
+  textfile collector), with totals per phase/test/port and the last duration
+  per phase/test/port/MAC.
+- Like the log files, each session starts a new metrics.jsonl and keeps the
+  previous session's as metrics.jsonl.1.
+
+Usage:
+    from metrics import metrics
+    metrics.set_unit_mac("/dev/ttyUSB0", "001A2B3C4D5E")    # MAC of the unit on this port
+    with metrics.span("setup", test="Eth0Test", port="/dev/ttyUSB0"):
+        ...
+    metrics.write_prometheus()
+"""
+
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+import atexit
+import json
+import os
+import threading
+import time
+
+from log import logger, LOG_DIR
+
+__all__ = ["Metrics", "metrics", "PHASES"]
+
+PHASES = ("connect", "setup", "guard", "expect", "parse", "disconnect")
+FLUSH_EVERY = 256       # spans kept in memory before they are appended to metrics.jsonl
+
+
+class Metrics:
+    def __init__(self, directory: str = LOG_DIR, prefix: str = "igv4_tester"):
+        self.jsonl_path = os.path.join(directory, "metrics.jsonl")
+        self.prom_path = os.path.join(directory, "metrics.prom")
+        self.prefix = prefix
+        self.enabled = True
+        self._lock = threading.Lock()
+        self._jsonl = None
+        self._pending: List[str] = []
+        self._unit_macs: Dict[str, str] = {}
+        # (phase, test, port) -> [count, sum, max]
+        self._totals: Dict[Tuple[str, str, str], list] = {}
+        # (phase, test, port) -> (mac, seconds)
+        self._last: Dict[Tuple[str, str, str], Tuple[str, float]] = {}
+
+    # ------- labels -------
+    def set_unit_mac(self, port: str, mac: Optional[str]):
+        """Label spans on `port` with the MAC of the unit under test."""
+        with self._lock:
+            if mac:
+                self._unit_macs[port] = mac
+            else:
+                self._unit_macs.pop(port, None)
+
+    # ------- recording -------
+    @contextmanager
+    def span(self, phase: str, test: str, port: str, mac: Optional[str] = None):
+        start_wall = time.time()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(phase, test, port, time.perf_counter() - start, mac=mac, start=start_wall)
+
+    def record(self, phase: str, test: str, port: str, seconds: float, mac: Optional[str] = None,
+               start: Optional[float] = None):
+        if not self.enabled:
+            return
+        key = (phase, test, port)
+        with self._lock:
+            mac = mac or self._unit_macs.get(port, "")
+            totals = self._totals.setdefault(key, [0, 0.0, 0.0])
+            totals[0] += 1
+            totals[1] += seconds
+            totals[2] = max(totals[2], seconds)
+            self._last[key] = (mac, seconds)
+            line = json.dumps({"ts": round(start if start is not None else time.time() - seconds, 6),
+                               "phase": phase, "test": test, "mac": mac, "port": port,
+                               "seconds": round(seconds, 6)})
+            self._pending.append(line)
+            if len(self._pending) >= FLUSH_EVERY:
+                self._flush_locked()
+
+    def flush(self):
+        """Append the buffered spans to metrics.jsonl."""
+        with self._lock:
+            self._flush_locked()
+
+    def _flush_locked(self):
+        if not self._pending:
+            return
+        try:
+            if self._jsonl is None:
+                self._jsonl = self._open_session_file()
+            self._jsonl.write("\n".join(self._pending) + "\n")
+            self._jsonl.flush()
+        except OSError:
+            logger.warning("Could not write %s; metrics export disabled", self.jsonl_path, exc_info=True)
+            self.enabled = False
+        self._pending.clear()
+
+    def _open_session_file(self):
+        """This session's metrics.jsonl; the previous session's is kept as metrics.jsonl.1."""
+        os.makedirs(os.path.dirname(self.jsonl_path), exist_ok=True)
+        if os.path.exists(self.jsonl_path) and os.path.getsize(self.jsonl_path) > 0:
+            os.replace(self.jsonl_path, self.jsonl_path + ".1")
+        return open(self.jsonl_path, "w", encoding="utf-8")
+
+    # ------- export -------
+    @staticmethod
+    def _labels(**labels) -> str:
+        def esc(value):
+            return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+        return "{" + ",".join(f'{k}="{esc(v)}"' for k, v in labels.items()) + "}"
+
+    def prometheus_text(self) -> str:
+        p = self.prefix
+        lines = [
+            f"# HELP {p}_phase_seconds Time spent in each tester phase.",
+            f"# TYPE {p}_phase_seconds summary",
+        ]
+        with self._lock:
+            totals = sorted(self._totals.items())
+            last = sorted(self._last.items())
+        for (phase, test, port), (count, total, _) in totals:
+            labels = self._labels(phase=phase, test=test, port=port)
+            lines.append(f"{p}_phase_seconds_sum{labels} {total:.6f}")
+            lines.append(f"{p}_phase_seconds_count{labels} {count}")
+        lines += [f"# HELP {p}_phase_max_seconds Longest single span of each tester phase.",
+                  f"# TYPE {p}_phase_max_seconds gauge"]
+        for (phase, test, port), (_, _, longest) in totals:
+            lines.append(f"{p}_phase_max_seconds{self._labels(phase=phase, test=test, port=port)} {longest:.6f}")
+        lines += [f"# HELP {p}_phase_last_seconds Last span of each tester phase, with the unit's MAC.",
+                  f"# TYPE {p}_phase_last_seconds gauge"]
+        for (phase, test, port), (mac, seconds) in last:
+            lines.append(f"{p}_phase_last_seconds{self._labels(phase=phase, test=test, port=port, mac=mac)} "
+                         f"{seconds:.6f}")
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self):
+        """Flush the spans and rewrite the .prom file atomically (the collector never sees half a file)."""
+        self.flush()
+        if not self.enabled:
+            return
+        tmp = self.prom_path + ".tmp"
+        try:
+            with open(tmp, "w", encoding="utf-8") as f:
+                f.write(self.prometheus_text())
+            os.replace(tmp, self.prom_path)
+        except OSError:
+            logger.warning("Could not write %s", self.prom_path, exc_info=True)
+
+    def close(self):
+        with self._lock:
+            self._flush_locked()
+            if self._jsonl:
+                self._jsonl.close()
+                self._jsonl = None
+
+
+# Shared instance used by the testers
+metrics = Metrics()
+atexit.register(metrics.close)
@@ -0,0 +1,146 @@
+# modem_at.py
+"""
+AT command client for the cellular modem of the IGv4 (/dev/ttyUSB2 under OpenWRT).
+
+- One background `cat /dev/ttyUSB2` per client relays the modem's answers to
+  the console. Its PID is kept in a file on the DUT, so a reader left
+  behind by an interrupted run is killed before a new one starts, and
+  close_steps() removes it again.
+- Every command is a transaction: it is written with `echo -e`, and the
+  client returns as soon as the final result code (OK, ERROR, +CME ERROR,
+  ...) is on the console. The lines in between are the response.
+- The transactions are console steps (see console_ops), so the blocking and
+  the asyncio tester run the same client.
+
+Usage (in a test case of ConsoleTestCases, at the OpenWRT shell):
+    modem = ModemClient()
+    yield from modem.open_steps()
+    try:
+        reply = yield from modem.command_steps("AT+CCID")
+        if reply.ok:
+            ccid = reply.value("+CCID:")
+    finally:
+        yield from modem.close_steps()
+"""
+
+from typing import List, NamedTuple, Optional
+import re
+
+from console_ops import Expect, Flush, Write
+from log import logger
+
+__all__ = ["MODEM_DEVICE", "FINAL_RESULT_RE", "ATResult", "at_command_line", "parse_at_transaction",
+           "ModemClient"]
+
+MODEM_DEVICE = "/dev/ttyUSB2"
+PID_FILE = "/tmp/modem_at.pid"
+# Final result codes end a transaction (also right after a shell prompt printed in between)
+FINAL_RESULT_RE = r'(?:^|[\r\n]|[#$] )(OK|ERROR|\+CME ERROR:[^\r\n]*|\+CMS ERROR:[^\r\n]*|NO CARRIER)\r?\n'
+# OpenWRT shell prompts printed in the middle of a transaction
+SHELL_PROMPT_TEXT_RE = re.compile(r'root@[^\r\n]*?[#$] ')
+# Printed after each reader start/stop command; the digits only appear once the shell ran it
+SHELL_DONE_RE = r'~modem:(\d+)'
+
+
+class ATResult(NamedTuple):
+    command: str
+    result: Optional[str]      # final result code, None on timeout
+    lines: List[str]           # response lines between the command and the result code
+
+    @property
+    def ok(self) -> bool:
+        return self.result == "OK"
+
+    def value(self, prefix: str) -> Optional[str]:
+        """Text after `prefix` in the first response line starting with it (e.g. "+CSQ:")."""
+        for line in self.lines:
+            if line.startswith(prefix):
+                return line[len(prefix):].strip()
+        return None
+
+
+def at_command_line(command: str, device: str = MODEM_DEVICE) -> str:
+    """Shell line writing an AT command to the modem."""
+    return f'echo -e "{command}\\r" > {device}'
+
+
+def parse_at_transaction(command: str, text: str, result: Optional[str]) -> ATResult:
+    """Response lines of one transaction; drops shell prompts, the shell echo and the modem's echo."""
+    text = SHELL_PROMPT_TEXT_RE.sub("\n", text)
+    lines = []
+    for line in re.split(r'[\r\n]+', text):
+        line = line.strip()
+        if not line or line == command or "echo -e" in line or line == result:
+            continue
+        lines.append(line)
+    return ATResult(command, result, lines)
+
+
+class ModemClient:
+    """
+    AT transactions as console steps (see console_ops): every method ending in _steps is a
+    generator for a tester's _drive(), so UBootTester and AsyncUBootTester share this client.
+    """
+
+    def __init__(self, device: str = MODEM_DEVICE, timeout: float = 2.0):
+        self.device = device
+        self.timeout = timeout
+        self.is_open = False
+
+    def _shell_steps(self, line: str):
+        yield Flush()
+        yield Write((line + '; echo ~modem:$?\r\n').encode())
+        yield Expect(SHELL_DONE_RE, timeout=self.timeout)
+
+    def open_steps(self):
+        """Start the reader (after killing one an earlier run left behind)."""
+        yield from self._shell_steps(f"kill $(cat {PID_FILE}) 2>/dev/null")
+        yield from self._shell_steps(f"cat {self.device} & echo $! > {PID_FILE}")
+        self.is_open = True
+
+    def close_steps(self):
+        if self.is_open:
+            yield from self._shell_steps(f"kill $(cat {PID_FILE}) 2>/dev/null; rm -f {PID_FILE}")
+            self.is_open = False
+
+    def command_steps(self, command: str, timeout: Optional[float] = None):
+        """Run one AT command; -> ATResult once its final result code arrives (result None on timeout)."""
+        if not self.is_open:
+            raise RuntimeError("Modem client is not open")
+        timeout = self.timeout if timeout is None else timeout
+        yield Flush()
+        yield Write((at_command_line(command, self.device) + '\r\n').encode())
+        index, match, text = yield Expect(FINAL_RESULT_RE, timeout=timeout)
+        result = match.group(1).decode(errors="ignore").strip() if index == 0 else None
+        reply = parse_at_transaction(command, text, result)
+        if result is None:
+            logger.warning(f"{command}: no final result code within {timeout} s")
+        else:
+            logger.debug(f"{command} -> {result} {reply.lines}")
+        return reply
+
+    def sync_steps(self, attempts: int = 3, timeout: float = 0.5):
+        """Plain AT until the modem answers OK (the reader may still be opening the port); -> bool."""
+        for _ in range(attempts):
+            if (yield from self.command_steps("AT", timeout=timeout)).ok:
+                return True
+        return False
+
+    # ------- queries -------
+    def ccid_steps(self):
+        """-> SIM CCID from AT+CCID, or None."""
+        reply = yield from self.command_steps("AT+CCID")
+        value = reply.value("+CCID:") if reply.ok else None
+        return value.strip('"') if value else None
+
+    def signal_quality_steps(self):
+        """-> (rssi 0-31 or 99, ber) from AT+CSQ, or None."""
+        reply = yield from self.command_steps("AT+CSQ")
+        m = re.match(r'(\d+),(\d+)', reply.value("+CSQ:") or "") if reply.ok else None
+        return (int(m.group(1)), int(m.group(2))) if m else None
+
+    def registration_steps(self):
+        """-> network registration status from AT+CREG? (1 = home, 5 = roaming), or None."""
+        reply = yield from self.command_steps("AT+CREG?")
+        m = re.match(r'\d+,(\d+)', reply.value("+CREG:") or "") if reply.ok else None
+        return int(m.group(1)) if m else None
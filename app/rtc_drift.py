@@ -0,0 +1,118 @@
+# rtc_drift.py
+"""
+RTC drift estimation from repeated `date` readings.
+
+- U-Boot's `date` only prints whole seconds, so a single reading says little.
+  Polling it and watching the seconds roll over pins each RTC second edge
+  between two host timestamps: after the previous reading was requested and
+  before the next one was received.
+- The RTC seconds between the first and the last edge are exact; the host
+  time between them is known to within the two brackets. That gives the
+  drift (RTC rate / host rate - 1) with a hard lower and upper bound that
+  tightens with every further edge.
+- Host times are time.monotonic() values: when the command was written and
+  the timestamp of the received chunk (serial_reader) carrying the reply.
+
+Usage:
+    estimator = DriftEstimator()
+    estimate = estimator.add(RTCSample(sent, received, parse_rtc_time(text)))
+    if estimate and estimate.within(0.05):
+        ...
+"""
+
+from typing import NamedTuple, Optional, Tuple
+import re
+
+__all__ = ["RTC_TIME_RE", "RTCSample", "DriftEstimate", "DriftEstimator", "parse_rtc_time"]
+
+# "Date: 2025-01-01 (Wednesday)    Time: 12:00:03" (U-Boot `date`)
+RTC_TIME_RE = r'Time:\s*(\d+):(\d+):(\d+)'
+DAY = 24 * 3600
+
+
+class RTCSample(NamedTuple):
+    sent: float        # host time the command was written
+    received: float    # host time the reply arrived
+    rtc: int           # RTC time of day in seconds
+
+
+class DriftEstimate(NamedTuple):
+    drift: float           # RTC rate / host rate - 1 (0.01 = RTC 1 % fast)
+    low: float             # the drift is certainly within [low, high]
+    high: float
+    rtc_seconds: int       # RTC seconds the estimate spans
+    host_seconds: float    # ... and the host time they took (midpoint)
+
+    @property
+    def half_width(self) -> float:
+        return (self.high - self.low) / 2
+
+    def within(self, tolerance: float) -> bool:
+        """The whole bound lies within +/- tolerance."""
+        return -tolerance <= self.low and self.high <= tolerance
+
+    def outside(self, tolerance: float) -> bool:
+        """The whole bound lies beyond +/- tolerance."""
+        return self.high < -tolerance or self.low > tolerance
+
+    def __str__(self):
+        return (f"drift {self.drift * 100:+.2f} % (bound {self.low * 100:+.2f} .. {self.high * 100:+.2f} %) "
+                f"over {self.rtc_seconds} RTC s / {self.host_seconds:.3f} host s")
+
+
+def parse_rtc_time(text: str) -> Optional[int]:
+    """Time of day (s) of the last `date` reply in `text`, None if there is none."""
+    matches = re.findall(RTC_TIME_RE, text)
+    if not matches:
+        return None
+    h, m, s = map(int, matches[-1])
+    return h * 3600 + m * 60 + s
+
+
+class DriftEstimator:
+    def __init__(self):
+        self.samples = 0
+        self._first: Optional[RTCSample] = None
+        self._last: Optional[RTCSample] = None
+        self._rtc = 0                                  # RTC seconds since the first sample (unwrapped)
+        self._first_edge: Optional[Tuple[int, float, float]] = None    # (rtc, after, before)
+        self._last_edge: Optional[Tuple[int, float, float]] = None
+
+    @property
+    def last_edge(self) -> Optional[float]:
+        """Midpoint host time of the latest second edge seen."""
+        if self._last_edge is None:
+            return None
+        return (self._last_edge[1] + self._last_edge[2]) / 2
+
+    def add(self, sample: RTCSample) -> Optional[DriftEstimate]:
+        """Add a reading; returns the current estimate once there is one."""
+        self.samples += 1
+        if self._first is None:
+            self._first = self._last = sample
+            return None
+        step = (sample.rtc - self._last.rtc) % DAY       # midnight wraps
+        if step:
+            self._rtc += step
+            # The RTC reached this value after the previous reading and before this one
+            edge = (self._rtc, self._last.sent, sample.received)
+            if self._first_edge is None:
+                self._first_edge = edge
+            self._last_edge = edge
+        self._last = sample
+        return self.estimate()
+
+    def estimate(self) -> Optional[DriftEstimate]:
+        if self._first_edge is None or self._first_edge is self._last_edge:
+            # Not two edges yet: a stopped (or very slow) RTC still shows up as an upper bound
+            host_min = self._last.sent - self._first.received
+            if self._first_edge is None and host_min > 1:
+                return DriftEstimate(-1.0, -1.0, 1 / host_min - 1, 0, host_min)
+            return None
+        rtc = self._last_edge[0] - self._first_edge[0]
+        host_min = self._last_edge[1] - self._first_edge[2]
+        host_max = self._last_edge[2] - self._first_edge[1]
+        host = (host_min + host_max) / 2
+        low = rtc / host_max - 1
+        high = rtc / host_min - 1 if host_min > 0 else float("inf")
+        return DriftEstimate(rtc / host - 1, low, high, rtc, host)
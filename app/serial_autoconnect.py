@@ -2,11 +2,13 @@
 """
 Serial auto-connector using pyserial.
 - Matches device by VID/PID (you provide these).
-- No threading: uses a Tkinter-style root.after polling loop.
+- No threading of its own: uses a Tkinter-style root.after polling loop.
+  The port itself is owned by a shared PortReader (see serial_reader.py),
+  so the GUI and the testers read the same stream through their own cursors.
 - Minimal, easy-to-read API for importing into main code.
 """
 
-from typing import Optional, Tuple, Callable, Sequence
+from typing import List, Optional, Tuple, Callable, Sequence
 import re
 import time
 import logging
@@ -14,12 +16,25 @@ import logging
 import serial
 import serial.tools.list_ports
 
-__all__ = ["SerialAutoConnector"]
+from serial_reader import PortReader, ReaderCursor, acquire_port_reader, release_port_reader
+
+__all__ = ["SerialAutoConnector", "find_ports_for_vidpid"]
 
 logger = logging.getLogger("SerialAutoConnector")
 logger.addHandler(logging.NullHandler())
 
 
+def find_ports_for_vidpid(vid_pid: Tuple[int, int]) -> List[str]:
+    """Return every device path matching VID/PID, sorted (one per test fixture)."""
+    vid, pid = vid_pid
+    found = []
+    for p in serial.tools.list_ports.comports():
+        # Some platforms report vid/pid as ints, some as None.
+        if getattr(p, "vid", None) == vid and getattr(p, "pid", None) == pid:
+            found.append(p.device)
+    return sorted(found)
+
+
 class SerialAutoConnector:
     """
     Simple auto connector for a USB-serial device identified by VID/PID.
@@ -64,6 +79,8 @@ class SerialAutoConnector:
         self.prompt_re = re.compile("|".join(f"(?:{p})" for p in prompt_patterns), re.IGNORECASE)
 
         self.serial_conn: Optional[serial.Serial] = None
+        self.reader: Optional[PortReader] = None
+        self._cursor: Optional[ReaderCursor] = None
         self._running = False
         self._seen_prompt = False
         self._last_port: Optional[str] = None
@@ -71,13 +88,10 @@ class SerialAutoConnector:
     # ------- device discovery -------
     def _find_port_for_vidpid(self) -> Optional[str]:
         """Return device path (eg /dev/ttyUSB0 or COM3) matching the configured VID/PID."""
-        vid, pid = self.vid_pid
-        ports = serial.tools.list_ports.comports()
-        for p in ports:
-            # Some platforms report vid/pid as ints, some as None.
-            if getattr(p, "vid", None) == vid and getattr(p, "pid", None) == pid:
-                logger.info("Found device %s (vid:pid=%04x:%04x)", p.device, vid, pid)
-                return p.device
+        ports = find_ports_for_vidpid(self.vid_pid)
+        if ports:
+            logger.info("Found device %s (vid:pid=%04x:%04x)", ports[0], *self.vid_pid)
+            return ports[0]
         return None
 
     # ------- connect / disconnect -------
@@ -97,14 +111,12 @@ class SerialAutoConnector:
 
         try:
             logger.info("Opening %s @ %d", port, self.baudrate)
-            conn = serial.Serial(port=port, baudrate=self.baudrate, timeout=self.timeout)
+            reader = acquire_port_reader(port, self.baudrate, self.timeout)
+            conn = reader.serial
             # small delay so device can stabilize
             time.sleep(0.05)
-            # flush any existing data
-            try:
-                conn.reset_input_buffer()
-            except Exception:
-                pass
+            self.reader = reader
+            self._cursor = reader.cursor()
             self.serial_conn = conn
             self._last_port = port
             self._seen_prompt = False
@@ -117,11 +129,13 @@ class SerialAutoConnector:
 
     def close(self):
         """Close open serial connection, if any."""
-        if self.serial_conn:
+        if self.reader:
             try:
-                self.serial_conn.close()
+                release_port_reader(self.reader)
             except Exception:
                 pass
+        self.reader = None
+        self._cursor = None
         self.serial_conn = None
         self._seen_prompt = False
         self._last_port = None
@@ -129,11 +143,11 @@ class SerialAutoConnector:
     # ------- prompt detection -------
     def _check_for_prompt(self):
         """Read available data and look for prompt patterns. Call on_connected once."""
-        if not self.serial_conn:
+        if not self.serial_conn or not self._cursor:
             return
 
         try:
-            data = self.serial_conn.read(1024)
+            data = self._cursor.read(timeout=0)
             if not data:
                 return
             try:
@@ -185,7 +199,11 @@ class SerialAutoConnector:
         # connected: check prompt and basic health
         #self._check_for_prompt()
 
-        # simple health probe: access in_waiting to detect sudden removal on some platforms
+        # simple health probe: the reader thread stops when the device is removed
+        if self.reader and self.reader.error is not None:
+            logger.info("Serial port probably removed: %s", self.reader.error)
+            self._handle_disconnect()
+            return
         try:
             _ = self.serial_conn.in_waiting
         except Exception as e:
@@ -0,0 +1,195 @@
+# serial_expect.py
+"""
+Streaming expect engine for serial consoles.
+
+- ExpectBuffer keeps received bytes in a bytearray and matches compiled
+  regexes incrementally: every search starts at the beginning of the line
+  that was still incomplete at the previous search, so a match may straddle
+  any number of chunks but is never tried on the tail of a line only.
+  Patterns that can span several lines are tried on the whole buffer.
+- SerialExpect drives an ExpectBuffer from a blocking `read_fn` and returns
+  as soon as a pattern matches, instead of sleeping between polls.
+
+Usage:
+    exp = SerialExpect(lambda: ser.read(ser.in_waiting or 1))
+    index, match, text = exp.expect([r"=>", r"Unknown command"], timeout=5)
+"""
+
+from functools import lru_cache
+from typing import Callable, List, Optional, Sequence, Tuple
+import codecs
+import re
+import time
+
+__all__ = ["ExpectBuffer", "SerialExpect", "compile_patterns", "spans_lines"]
+
+
+def compile_patterns(patterns) -> List["re.Pattern"]:
+    """Compile a pattern or a sequence of patterns into bytes regexes."""
+    if isinstance(patterns, (str, bytes, re.Pattern)):
+        patterns = [patterns]
+    compiled = []
+    for p in patterns:
+        if isinstance(p, re.Pattern):
+            if isinstance(p.pattern, str):
+                p = re.compile(p.pattern.encode(), p.flags & ~re.UNICODE)
+            compiled.append(p)
+        elif isinstance(p, str):
+            compiled.append(re.compile(p.encode()))
+        else:
+            compiled.append(re.compile(p))
+    return compiled
+
+
+# A leading "line start" anchor ([\r\n], (?:^|[\r\n])) does not make a pattern multi-line
+_LINE_ANCHOR_RE = re.compile(rb'^(?:\(\?:\^\|\[\\r\\n\]\)|\[\\r\\n\]|\[\\n\\r\])')
+# ... nor a trailing line end (\r?\n, \r\n, \n)
+_LINE_END_RE = re.compile(rb'(?:\\r\??)?\\n$')
+# ... nor a negated class that excludes line breaks ([^\r\n]*)
+_NO_NEWLINE_CLASS_RE = re.compile(rb'\[\^[^\]]*\\[rn][^\]]*\]')
+_NEWLINE_RE = re.compile(rb'\\[rns]|[\r\n]')
+
+
+@lru_cache(maxsize=256)
+def spans_lines(pattern: "re.Pattern") -> bool:
+    """True if `pattern` (compiled bytes regex) can match across a line break."""
+    source = _LINE_END_RE.sub(b"", _LINE_ANCHOR_RE.sub(b"", pattern.pattern, count=1))
+    source = _NO_NEWLINE_CLASS_RE.sub(b"", source)
+    return bool(_NEWLINE_RE.search(source)) or bool(pattern.flags & re.DOTALL and b"." in source)
+
+
+class ExpectBuffer:
+    """
+    Byte buffer with incremental regex search.
+
+    Bytes before the end of the last match are consumed; everything after it
+    stays in the buffer for the next expect call.
+    """
+
+    def __init__(self, max_size: int = 1024 * 1024):
+        self.max_size = max_size      # hard cap, oldest bytes are dropped
+        self.buffer = bytearray()
+        self._scanned = 0             # buffer offset up to which every pattern was tried
+        self._decoder = codecs.getincrementaldecoder("utf-8")(errors="ignore")
+
+    def feed(self, data: bytes) -> str:
+        """Append received bytes; return the newly decodable text (for logging)."""
+        self.buffer += data
+        if len(self.buffer) > self.max_size:
+            drop = len(self.buffer) - self.max_size
+            del self.buffer[:drop]
+            self._scanned = max(0, self._scanned - drop)
+        return self._decoder.decode(data)
+
+    def search(self, patterns: Sequence["re.Pattern"]) -> Optional[Tuple[int, "re.Match"]]:
+        """
+        Search the buffer from the last line break before the part already scanned
+        (the whole buffer for multi-line patterns).
+        Returns (pattern_index, match) for the earliest match, or None.
+        """
+        # The line break itself is kept: patterns may be anchored on it
+        line_start = max(0, self.buffer.rfind(b"\n", 0, self._scanned))
+        best = None
+        for idx, pat in enumerate(patterns):
+            m = pat.search(self.buffer, 0 if spans_lines(pat) else line_start)
+            if m and (best is None or m.start() < best[1].start()):
+                best = (idx, m)
+        if best is None:
+            self._scanned = len(self.buffer)
+        return best
+
+    def consume(self, end: Optional[int] = None) -> bytes:
+        """Remove and return buffer[:end] (the whole buffer when end is None)."""
+        if end is None:
+            end = len(self.buffer)
+        data = bytes(self.buffer[:end])
+        del self.buffer[:end]
+        self._scanned = 0
+        return data
+
+    def clear(self):
+        self.buffer.clear()
+        self._scanned = 0
+        self._decoder.reset()
+
+
+class SerialExpect:
+    """
+    Blocking expect loop over a `read_fn` that returns whatever bytes are
+    available (waiting at most its own short timeout when there are none).
+
+    on_data(text) is called for every received chunk with the incrementally
+    decoded text, so multi-byte UTF-8 characters split across reads are kept.
+    """
+
+    def __init__(
+        self,
+        read_fn: Callable[[], bytes],
+        on_data: Optional[Callable[[str], None]] = None,
+    ):
+        self.read_fn = read_fn
+        self.on_data = on_data
+        self.buf = ExpectBuffer()
+        self.bytes_received = 0
+
+    def _read_once(self, on_chunk=None) -> bool:
+        data = self.read_fn()
+        if not data:
+            return False
+        self.bytes_received += len(data)
+        text = self.buf.feed(data)
+        if self.on_data and text:
+            self.on_data(text)
+        if on_chunk:
+            on_chunk(text)
+        return True
+
+    def expect(self, patterns, timeout: float = 10, on_chunk=None) -> Tuple[int, Optional["re.Match"], str]:
+        """
+        Wait until one of `patterns` matches the incoming stream.
+
+        Returns (index, match, text) where text is everything received up to
+        and including the match. On timeout index is -1, match is None and
+        text holds everything received so far (which is consumed).
+        on_chunk(text), if given, is called for each chunk read by this call.
+        """
+        compiled = compile_patterns(patterns)
+        end_time = time.monotonic() + timeout
+        while True:
+            found = self.buf.search(compiled)
+            if found:
+                idx, m = found
+                data = self.buf.consume(m.end())
+                # re-match on the immutable copy, the bytearray has just been trimmed
+                m = compiled[idx].search(data, m.start())
+                return idx, m, data.decode("utf-8", errors="ignore")
+            if time.monotonic() >= end_time:
+                return -1, None, self.buf.consume().decode("utf-8", errors="ignore")
+            self._read_once(on_chunk)
+
+    def poll(self, patterns) -> Tuple[int, Optional["re.Match"], str]:
+        """
+        Non-blocking expect for callers driven by a timer (e.g. Tk after()).
+        `read_fn` must not block. Unmatched data stays buffered for the next call.
+        """
+        compiled = compile_patterns(patterns)
+        while self._read_once():
+            pass
+        found = self.buf.search(compiled)
+        if not found:
+            return -1, None, ""
+        idx, m = found
+        data = self.buf.consume(m.end())
+        m = compiled[idx].search(data, m.start())
+        return idx, m, data.decode("utf-8", errors="ignore")
+
+    def read_for(self, duration: float, on_chunk=None) -> str:
+        """Collect everything received during `duration` seconds."""
+        end_time = time.monotonic() + duration
+        while time.monotonic() < end_time:
+            self._read_once(on_chunk)
+        return self.buf.consume().decode("utf-8", errors="ignore")
+
+    def flush(self):
+        """Drop buffered bytes (the counterpart of reset_input_buffer)."""
+        self.buf.clear()
@@ -0,0 +1,202 @@
+# serial_reader.py
+"""
+Background reader thread with a per-port ring buffer.
+
+- One PortReader per serial port owns the pyserial handle and is the only
+  code that ever calls read() on it.
+- Received data is stored as timestamped chunks in a bounded ring buffer.
+- Every consumer (testers, auto-connector, GUI prompt checks) gets its own
+  ReaderCursor, so consumers never steal bytes from each other and never
+  poll `in_waiting`: cursor.read() blocks on a condition variable.
+
+Usage:
+    reader = acquire_port_reader("/dev/ttyUSB0", 115200)
+    cursor = reader.cursor()
+    reader.write(b"version\\r\\n")
+    data = cursor.read(timeout=1.0)
+    ...
+    release_port_reader(reader)
+"""
+
+from typing import Callable, Dict, List, Optional, Tuple
+import collections
+import threading
+import time
+
+import serial
+
+from log import logger
+
+__all__ = [
+    "PortReader",
+    "ReaderCursor",
+    "acquire_port_reader",
+    "release_port_reader",
+    "get_port_reader",
+]
+
+
+class PortReader(threading.Thread):
+    """Reader thread filling a ring buffer of (seq, timestamp, bytes) chunks."""
+
+    def __init__(self, ser: serial.Serial, max_chunks: int = 4096):
+        super().__init__(name=f"PortReader({ser.port})", daemon=True)
+        self.serial = ser
+        self.port = ser.port
+        self._chunks = collections.deque(maxlen=max_chunks)
+        self._next_seq = 0            # sequence number of the next chunk
+        self._cond = threading.Condition()
+        self._stop_event = threading.Event()
+        self._listeners: List[Callable[[float, bytes], None]] = []
+        self.closed = False
+        self.error: Optional[Exception] = None
+
+    # ------- thread body -------
+    def run(self):
+        while not self._stop_event.is_set():
+            try:
+                # blocks for at most the port timeout when nothing is pending
+                data = self.serial.read(self.serial.in_waiting or 1)
+            except (serial.SerialException, OSError, TypeError, AttributeError) as e:
+                # TypeError/AttributeError: port closed under us
+                if not self._stop_event.is_set():
+                    logger.warning("Reader on %s stopped: %s", self.port, e)
+                    self.error = e
+                break
+            if data:
+                ts = time.monotonic()
+                with self._cond:
+                    self._chunks.append((self._next_seq, ts, data))
+                    self._next_seq += 1
+                    self._cond.notify_all()
+                    listeners = list(self._listeners)
+                for callback in listeners:
+                    try:
+                        callback(ts, data)
+                    except Exception:
+                        logger.exception("Reader listener on %s raised", self.port)
+        with self._cond:
+            self.closed = True
+            self._cond.notify_all()
+
+    def stop(self):
+        """Stop the thread and close the port."""
+        self._stop_event.set()
+        try:
+            self.serial.close()
+        except Exception:
+            pass
+        if self.is_alive() and threading.current_thread() is not self:
+            self.join(timeout=1.0)
+
+    # ------- consumer API -------
+    def cursor(self, from_start: bool = False) -> "ReaderCursor":
+        """New cursor at the live end of the stream (or the oldest buffered chunk)."""
+        with self._cond:
+            if from_start and self._chunks:
+                seq = self._chunks[0][0]
+            else:
+                seq = self._next_seq
+        return ReaderCursor(self, seq)
+
+    def add_listener(self, callback: Callable[[float, bytes], None]):
+        """Push mode: callback(timestamp, data) is called from the reader thread for every chunk."""
+        with self._cond:
+            self._listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[float, bytes], None]):
+        with self._cond:
+            if callback in self._listeners:
+                self._listeners.remove(callback)
+
+    def write(self, data: bytes) -> int:
+        return self.serial.write(data)
+
+    def _collect(self, seq: int) -> Tuple[int, List[Tuple[float, bytes]]]:
+        """Chunks from `seq` on; caller holds the lock. Returns (new_seq, chunks)."""
+        if not self._chunks or seq >= self._next_seq:
+            return seq, []
+        oldest = self._chunks[0][0]
+        if seq < oldest:
+            logger.warning("Cursor on %s overrun, %d chunks dropped", self.port, oldest - seq)
+            seq = oldest
+        chunks = [(ts, data) for _, ts, data in list(self._chunks)[seq - oldest:]]
+        return self._next_seq, chunks
+
+
+class ReaderCursor:
+    """A consumer's position in a PortReader's stream."""
+
+    def __init__(self, reader: PortReader, seq: int):
+        self.reader = reader
+        self.seq = seq
+
+    def _ready(self) -> bool:
+        return self.seq < self.reader._next_seq or self.reader.closed
+
+    def read_chunks(self, timeout: Optional[float] = None) -> List[Tuple[float, bytes]]:
+        """
+        Return [(monotonic_timestamp, bytes), ...] received since the last call.
+        Waits up to `timeout` seconds for new data (forever if None, not at all if 0).
+        """
+        cond = self.reader._cond
+        with cond:
+            if timeout != 0:
+                cond.wait_for(self._ready, timeout)
+            self.seq, chunks = self.reader._collect(self.seq)
+        return chunks
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until unread data is available (without consuming it)."""
+        with self.reader._cond:
+            return self.reader._cond.wait_for(self._ready, timeout)
+
+    def read(self, timeout: Optional[float] = None) -> bytes:
+        """Like read_chunks() but returns the joined bytes."""
+        return b"".join(data for _, data in self.read_chunks(timeout))
+
+    def skip_to_end(self):
+        """Discard everything received so far (reset_input_buffer for this cursor)."""
+        with self.reader._cond:
+            self.seq = self.reader._next_seq
+
+
+# ------- per-port registry -------
+_registry: Dict[str, List] = {}       # port -> [PortReader, refcount]
+_registry_lock = threading.Lock()
+
+
+def acquire_port_reader(port: str, baudrate: int = 115200, timeout: float = 0.1) -> PortReader:
+    """Open `port` (or reuse the already running reader for it) and take a reference."""
+    with _registry_lock:
+        entry = _registry.get(port)
+        if entry and entry[0].is_alive():
+            entry[1] += 1
+            return entry[0]
+        ser = serial.Serial(port=port, baudrate=baudrate, timeout=timeout)
+        reader = PortReader(ser)
+        reader.start()
+        _registry[port] = [reader, 1]
+        logger.info("Started reader thread on %s @ %d", port, baudrate)
+        return reader
+
+
+def release_port_reader(reader: Optional[PortReader]):
+    """Drop a reference; the port is closed when the last consumer releases it."""
+    if reader is None:
+        return
+    with _registry_lock:
+        entry = _registry.get(reader.port)
+        if entry and entry[0] is reader:
+            entry[1] -= 1
+            if entry[1] > 0:
+                return
+            del _registry[reader.port]
+    reader.stop()
+
+
+def get_port_reader(port: str) -> Optional[PortReader]:
+    """Return the running reader for `port`, if any (no reference is taken)."""
+    with _registry_lock:
+        entry = _registry.get(port)
+        return entry[0] if entry else None
@@ -0,0 +1,265 @@
+# station.py
+"""
+Multi-DUT test station.
+
+- Finds every console adapter matching the fixture VID/PID (one per slot).
+- Runs the full automatic test sequence for each DUT as its own asyncio task
+  on a station event loop (a background thread, so Tk stays responsive):
+  wait for the autoboot banner, U-Boot tests, boot, wait for OpenWRT,
+  Linux tests, save results.
+- The blocking test classes run in the loop's executor; waiting for U-Boot
+  is done with AsyncUBootTester on the slot's shared console and the OpenWRT
+  boot is followed with a BootTracker (a kernel panic fails the slot early).
+- A test whose "depends_on" tests did not pass is skipped, as in Run All.
+- stop() aborts the running test and waits for it to give the console back
+  before the slot closes its session.
+- Progress is reported as (slot_index, field, value) events through
+  `on_event`, which is called from the station thread.
+
+Usage:
+    station = TestStation(find_ports_for_vidpid((MY_VID, MY_PID)), tests, settings, on_event=q.put)
+    station.start()
+    ...
+    station.stop()
+"""
+
+from typing import Callable, Dict, List, Optional, Sequence
+import asyncio
+import re
+import threading
+import time
+
+from log import logger
+from metrics import metrics
+from async_uboot_tester import AsyncUBootTester
+from boot_tracker import BootTracker
+from console_session import ConsoleSession
+from excel_writer import append_test_results, get_next_available_mac
+from linux_agent import run_agent_checks
+from test_definitions import Eth0Test, WiFiTest, XbeeTest
+from test_scheduler import failed_dependencies, plan_phases
+from uboot_tester import UBOOT_PROMPT, AUTOBOOT_STOP_KEY
+
+__all__ = ["TestStation", "SlotState", "make_tester"]
+
+# The Excel files are shared by all slots (called on executor threads)
+_excel_lock = threading.Lock()
+
+
+def _allocate_mac():
+    with _excel_lock:
+        # Mark as used straight away so two slots never get the same MAC
+        return get_next_available_mac(True)
+
+
+def _save_results(results, mac_addr):
+    with _excel_lock:
+        append_test_results(results, mac_addr)
+
+
+def make_tester(test_class, settings: Dict, port: str, session=None, log_callback=None, mac_addr=None):
+    """Instantiate a test class with the per-class arguments HardwareTestApp passes."""
+    common = dict(port=port, debug=True, log_callback=log_callback, session=session)
+    if test_class is Eth0Test:
+        return test_class(slot=settings["minipcie_slot"], mac_addr=mac_addr,
+                          server_ip=settings["server_ip"], min_throughput=settings.get("eth_min_mbps", 0),
+                          tftp_port=settings.get("tftp_port", 69), dhcp_pool=settings.get("dhcp_pool") or None,
+                          dhcp_interface=settings.get("dhcp_interface") or None, **common)
+    if test_class is WiFiTest:
+        return test_class(wifi_ssid=settings["wifi_ssid"], wifi_password=settings["wifi_password"],
+                          wifi_security=settings["wifi_security"], **common)
+    if test_class is XbeeTest:
+        return test_class(slot=settings["minipcie_slot"], **common)
+    return test_class(**common)
+
+
+class SlotState:
+    def __init__(self, index: int, port: str):
+        self.index = index
+        self.port = port
+        self.status = "Idle"
+        self.mac_addr: Optional[str] = None
+        self.results: Dict[str, str] = {}
+        self.started = 0.0
+        self.finished = 0.0
+
+
+class TestStation:
+    def __init__(
+        self,
+        ports: Sequence[str],
+        tests: Sequence[Dict],
+        settings: Dict,
+        on_event: Optional[Callable[[int, str, object], None]] = None,
+        boot_timeout: float = 300,
+        dry_run: bool = False,
+    ):
+        """dry_run: use placeholder MACs and do not touch the Excel files (simulated DUTs, benchmarks)."""
+        self.slots = [SlotState(i, port) for i, port in enumerate(ports)]
+        # Manual tests need an operator at the slot; the station runs the automatic ones
+        self.tests = [t for t in tests if not t["requires_input"]]
+        self.settings = settings
+        self.on_event = on_event
+        self.boot_timeout = boot_timeout
+        self.dry_run = dry_run
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._tasks: List[asyncio.Task] = []
+
+    # ------- control -------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(target=self._thread_main, name="TestStation", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Cancel every slot; a test already running is aborted after its current step."""
+        if self._loop and not self._loop.is_closed():
+            for task in self._tasks:
+                self._loop.call_soon_threadsafe(task.cancel)
+
+    def _thread_main(self):
+        asyncio.run(self._run_all())
+
+    async def _run_all(self):
+        self._loop = asyncio.get_running_loop()
+        self._tasks = [asyncio.ensure_future(self._run_slot(slot)) for slot in self.slots]
+        start = time.monotonic()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        logger.info(f"Station run of {len(self.slots)} DUTs finished in {time.monotonic() - start:.1f} s")
+
+    def _emit(self, slot: SlotState, field: str, value):
+        if field == "status":
+            slot.status = value
+        if self.on_event:
+            self.on_event(slot.index, field, value)
+
+    # ------- one DUT -------
+    async def _run_slot(self, slot: SlotState):
+        session = ConsoleSession(slot.port)
+        console = AsyncUBootTester(slot.port)
+        slot.results = {t["name"]: "Pending" for t in self.tests}
+        try:
+            session.open()
+            await console.connect()     # shares the session's reader, never steals test output
+            slot.started = time.monotonic()
+
+            self._emit(slot, "status", "Waiting for U-Boot (power on the DUT)")
+            index, _, _ = await console.expect(re.escape(UBOOT_PROMPT), timeout=self.boot_timeout)
+            if index < 0:
+                self._emit(slot, "status", "No U-Boot banner")
+                return
+            await console.send(AUTOBOOT_STOP_KEY, end='')
+            await console.expect(r'=> ', timeout=5)
+
+            os_name = "uboot"
+            agent_results: Dict[str, bool] = {}
+            for test in (t for phase in plan_phases(self.tests) for t in phase.tests):
+                if test["os"] == "openwrt" and os_name != "openwrt":
+                    self._emit(slot, "status", "Booting OpenWRT")
+                    if not await self._boot_openwrt(slot, session):
+                        self._emit(slot, "status", "OpenWRT did not boot")
+                        return
+                    os_name = "openwrt"
+                    agent_results = await self._run_agent(slot, session)
+                failed_deps = failed_dependencies(test, slot.results)
+                if failed_deps:
+                    logger.warning(f"Station slot {slot.index}: {test['name']} skipped, "
+                                   f"depends on {', '.join(failed_deps)}")
+                    slot.results[test["name"]] = "SKIPPED"
+                    self._emit(slot, "result", (test["name"], "SKIPPED"))
+                    continue
+                if test["name"] in agent_results:
+                    self._record(slot, test["name"], agent_results[test["name"]])
+                    continue
+                await self._run_test(slot, session, test)
+
+            passed = all(r == "PASS" for r in slot.results.values())
+            self._emit(slot, "status", "PASS" if passed else "FAIL")
+            if not self.dry_run:
+                await self._loop.run_in_executor(None, _save_results, slot.results, slot.mac_addr)
+        except asyncio.CancelledError:
+            session.write(b'\x03')       # stop whatever the DUT was still running
+            self._emit(slot, "status", "Cancelled")
+            raise
+        except Exception as e:
+            logger.exception(f"Station slot {slot.index} ({slot.port}) failed")
+            self._emit(slot, "status", f"Error: {e}")
+        finally:
+            slot.finished = time.monotonic()
+            await console.disconnect()
+            session.close()
+
+    async def _run_test(self, slot: SlotState, session: ConsoleSession, test: Dict):
+        name = test["name"]
+        self._emit(slot, "status", f"Running {name}")
+        if test["class"] is Eth0Test and slot.mac_addr is None:
+            if self.dry_run:
+                slot.mac_addr = f"0200000000{slot.index:02X}"      # locally administered
+            else:
+                slot.mac_addr = await self._loop.run_in_executor(None, _allocate_mac)
+            self._emit(slot, "mac", slot.mac_addr)
+            metrics.set_unit_mac(slot.port, slot.mac_addr)
+            if slot.mac_addr is None:
+                slot.results[name] = "FAIL"
+                self._emit(slot, "result", (name, "FAIL"))
+                return
+
+        def log_callback(msg, slot=slot):
+            logger.debug(f"[slot {slot.index}] {msg}")
+
+        tester = make_tester(test["class"], self.settings, slot.port, session=session,
+                             log_callback=log_callback, mac_addr=slot.mac_addr)
+        success = await self._blocking(tester.run, abort=tester.abort)
+        self._record(slot, name, success)
+
+    async def _blocking(self, func, abort: Callable[[], None]):
+        """
+        Run func() in the executor. If the slot is cancelled meanwhile, call abort() and wait
+        until func has returned (it still holds the console) before the cancel goes on.
+        """
+        future = self._loop.run_in_executor(None, func)
+        try:
+            return await asyncio.shield(future)
+        except asyncio.CancelledError:
+            abort()
+            await asyncio.wait([future])
+            if not future.cancelled():
+                future.exception()          # TestAborted: retrieved so it is not logged as unhandled
+            raise
+
+    async def _boot_openwrt(self, slot: SlotState, session: ConsoleSession) -> bool:
+        """Boot OpenWRT and follow its milestones until the shell accepts input; False on a panic or timeout."""
+        def on_boot_event(event, value):
+            if event == "milestone":
+                self._loop.call_soon_threadsafe(self._emit, slot, "status",
+                                                f"Booting OpenWRT: {value.milestone.label}")
+
+        tracker = BootTracker(session, on_event=on_boot_event, timeout=self.boot_timeout)
+        session.write(b'boot\r\n')
+        return await self._blocking(tracker.run, abort=tracker.cancel)
+
+    def _record(self, slot: SlotState, name: str, success: bool):
+        result = "PASS" if success else "FAIL"
+        slot.results[name] = result
+        self._emit(slot, "result", (name, result))
+
+    async def _run_agent(self, slot: SlotState, session: ConsoleSession) -> Dict[str, bool]:
+        """Run the slot's WiFi/USB/SIM checks in parallel on the DUT (see linux_agent); results by test name."""
+        agent_tests = [t for t in self.tests if t["os"] == "openwrt" and t.get("agent")]
+        if len(agent_tests) < 2:
+            return {}
+        self._emit(slot, "status", "Running Linux checks on the DUT")
+
+        def log_callback(msg, slot=slot):
+            logger.debug(f"[slot {slot.index}] {msg}")
+
+        testers = {t["agent"]: make_tester(t["class"], self.settings, slot.port, session=session,
+                                           log_callback=log_callback) for t in agent_tests}
+        def abort():
+            for tester in testers.values():
+                tester.abort()
+
+        by_check = await self._blocking(lambda: run_agent_checks(testers), abort=abort)
+        return {t["name"]: by_check[t["agent"]] for t in agent_tests if t["agent"] in by_check}
@@ -0,0 +1,111 @@
+"""
+Test Station window (pure tkinter).
+Shows one status tile per fixture slot and drives a TestStation.
+"""
+import queue
+import tkinter as tk
+from tkinter import messagebox
+
+from station import TestStation
+from serial_autoconnect import find_ports_for_vidpid
+
+STATUS_COLORS = {"PASS": "green", "FAIL": "red", "Pending": "grey"}
+
+
+class SlotTile(tk.LabelFrame):
+    """Status tile for one DUT slot."""
+
+    def __init__(self, master, index, port, test_names, **kwargs):
+        super().__init__(master, text=f"Slot {index + 1}  ({port})", padx=5, pady=5, **kwargs)
+        self.status_label = tk.Label(self, text="Idle", anchor="w", width=36)
+        self.status_label.grid(row=0, column=0, columnspan=2, sticky="w")
+        self.mac_label = tk.Label(self, text="MAC: -", anchor="w")
+        self.mac_label.grid(row=1, column=0, columnspan=2, sticky="w")
+        self.result_labels = {}
+        for row, name in enumerate(test_names, start=2):
+            tk.Label(self, text=name, anchor="w").grid(row=row, column=0, sticky="w")
+            lbl = tk.Label(self, text="Pending", fg=STATUS_COLORS["Pending"], anchor="w")
+            lbl.grid(row=row, column=1, sticky="w")
+            self.result_labels[name] = lbl
+
+    def update_field(self, field, value):
+        if field == "status":
+            self.status_label.config(text=value, fg=STATUS_COLORS.get(value, "black"))
+        elif field == "mac":
+            self.mac_label.config(text=f"MAC: {value or 'none available'}")
+        elif field == "result":
+            name, result = value
+            lbl = self.result_labels.get(name)
+            if lbl:
+                lbl.config(text=result, fg=STATUS_COLORS.get(result, "black"))
+
+
+class StationFrame(tk.Frame):
+    """Scan for fixture adapters and run the full sequence on all of them at once."""
+
+    COLUMNS = 2
+
+    def __init__(self, master, vid_pid, tests, get_settings, **kwargs):
+        super().__init__(master, **kwargs)
+        self.vid_pid = vid_pid
+        self.tests = tests
+        self.get_settings = get_settings      # callable returning the app's current settings
+        self.station = None
+        self.events = queue.Queue()
+        self.tiles = []
+
+        buttons = tk.Frame(self)
+        buttons.pack(side=tk.TOP, fill=tk.X)
+        tk.Button(buttons, text="Rescan", command=self.rescan).pack(side=tk.LEFT, padx=5, pady=5)
+        self.start_button = tk.Button(buttons, text="Test All", command=self.start)
+        self.start_button.pack(side=tk.LEFT, padx=5, pady=5)
+        tk.Button(buttons, text="Stop", command=self.stop).pack(side=tk.LEFT, padx=5, pady=5)
+
+        self.tile_frame = tk.Frame(self)
+        self.tile_frame.pack(fill=tk.BOTH, expand=True)
+
+        self.rescan()
+        self.after(100, self._drain_events)
+
+    def rescan(self):
+        if self.station and any(s.status.startswith(("Running", "Waiting", "Booting")) for s in self.station.slots):
+            messagebox.showwarning("Test Station", "Stop the running station before rescanning.")
+            return
+        for tile in self.tiles:
+            tile.destroy()
+        self.ports = find_ports_for_vidpid(self.vid_pid)
+        names = [t["name"] for t in self.tests if not t["requires_input"]]
+        self.tiles = []
+        for i, port in enumerate(self.ports):
+            tile = SlotTile(self.tile_frame, i, port, names)
+            tile.grid(row=i // self.COLUMNS, column=i % self.COLUMNS, padx=5, pady=5, sticky="nsew")
+            self.tiles.append(tile)
+        if not self.ports:
+            tile = tk.Label(self.tile_frame, text="No fixture adapters found.", fg="red")
+            tile.grid(row=0, column=0, padx=5, pady=5)
+            self.tiles.append(tile)
+
+    def start(self):
+        if not self.ports:
+            messagebox.showerror("Test Station", "No fixture adapters found.")
+            return
+        self.rescan()
+        self.station = TestStation(self.ports, self.tests, self.get_settings(),
+                                   on_event=lambda *event: self.events.put(event))
+        self.station.start()
+
+    def stop(self):
+        if self.station:
+            self.station.stop()
+
+    def _drain_events(self):
+        # Events come from the station thread; widgets are only touched here
+        try:
+            while True:
+                index, field, value = self.events.get_nowait()
+                if index < len(self.tiles) and isinstance(self.tiles[index], SlotTile):
+                    self.tiles[index].update_field(field, value)
+        except queue.Empty:
+            pass
+        if self.winfo_exists():
+            self.after(100, self._drain_events)
@@ -0,0 +1,103 @@
+# terminal_state.py
+"""
+What the DUT's console is showing right now: U-Boot, the OpenWRT shell or a boot.
+
+- classify_console() looks at the end of the console output: the last
+  U-Boot prompt, shell prompt or boot log line decides.
+- TerminalStateMonitor listens to the live stream of a console session
+  (push mode, no cursor to drain) and caches the latest classification, so
+  a state the console already showed costs nothing to look up.
+- probe() is the non-destructive check: it presses Enter and classifies the
+  answer (a prompt comes back within a few ms), never reboot or boot.
+
+Usage:
+    monitor = TerminalStateMonitor(session)
+    state = monitor.state_if_fresh(5.0) or monitor.probe()    # "uboot", "linux", "booting" or None
+    ...
+    monitor.close()
+"""
+
+from typing import Optional
+import re
+import threading
+import time
+
+from log import logger
+from uboot_tester import UBOOT_PROMPT, OPENWRT_PROMPT
+
+__all__ = ["UBOOT", "LINUX", "BOOTING", "classify_console", "TerminalStateMonitor"]
+
+# Same names as HardwareTestApp.terminal_state
+UBOOT = "uboot"
+LINUX = "linux"
+BOOTING = "booting"
+
+# Last match in the output wins; prompts are anchored to the end of the text seen so far
+STATE_PATTERNS = [
+    (UBOOT, re.compile(r'(?:^|[\r\n])=> $')),
+    (LINUX, re.compile(r'root@[^\r\n]*[#$] $')),
+    (LINUX, re.compile(r'Please press Enter to activate this console')),
+    (BOOTING, re.compile(r'U-Boot 20\d\d|' + re.escape(UBOOT_PROMPT) + r'|Starting kernel|'
+                         r'\[\s*\d+\.\d{6}\]|' + re.escape(OPENWRT_PROMPT))),
+]
+TAIL_SIZE = 512
+
+
+def classify_console(text: str) -> Optional[str]:
+    """State shown by the end of `text`; None if it gives no clue."""
+    best, best_end = None, -1
+    for state, pattern in STATE_PATTERNS:
+        for m in pattern.finditer(text):
+            if m.end() > best_end:
+                best, best_end = state, m.end()
+    return best
+
+
+class TerminalStateMonitor:
+    def __init__(self, session):
+        """session: open ConsoleSession; the monitor follows its stream from now on."""
+        self.session = session
+        self.state: Optional[str] = None
+        self.updated = 0.0                 # monotonic time of the last classification
+        self._tail = ""
+        self._changed = threading.Event()
+        self._reader = session.reader
+        self._reader.add_listener(self._on_data)
+
+    def close(self):
+        self._reader.remove_listener(self._on_data)
+
+    def _on_data(self, ts: float, data: bytes):
+        # Reader thread: keep it cheap
+        self._tail = (self._tail + data.decode("utf-8", errors="ignore"))[-TAIL_SIZE:]
+        state = classify_console(self._tail)
+        if state is not None:
+            if state != self.state:
+                logger.debug(f"Terminal state: {self.state} -> {state}")
+            self.state = state
+            self.updated = ts
+            self._changed.set()
+
+    def state_if_fresh(self, max_age: float) -> Optional[str]:
+        """Cached state if the console confirmed it within the last `max_age` seconds."""
+        if self.state is not None and time.monotonic() - self.updated <= max_age:
+            return self.state
+        return None
+
+    def probe(self, timeout: float = 0.5) -> Optional[str]:
+        """Press Enter and classify the answer; None if nothing recognisable came back."""
+        self._changed.clear()
+        sent = time.monotonic()
+        try:
+            self.session.write(b'\r\n')
+        except Exception:
+            logger.warning("Terminal state probe: write failed", exc_info=True)
+            return None
+        end = sent + timeout
+        while True:
+            if self._changed.wait(max(0, end - time.monotonic())) and self.updated >= sent:
+                if self.state != BOOTING:
+                    return self.state
+                self._changed.clear()      # boot log scrolling by: it may still end in a prompt
+            if time.monotonic() >= end:
+                return self.state if self.updated >= sent else None
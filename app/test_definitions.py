@@ -1,17 +1,26 @@
 from uboot_tester import UBootTester
+from dhcp_server import acquire_dhcp_server
 import time
 from log import logger
 
 # Ethernet Tester
 class Eth0Test(UBootTester):
-    def __init__(self, mac_addr=None, server_ip=None, port='/dev/ttyUSB0', slot='Slot 1', debug=False, log_callback=None):
-        super().__init__(port=port, debug=debug, log_callback=log_callback)
+    def __init__(self, mac_addr=None, server_ip=None, port='/dev/ttyUSB0', slot='Slot 1', debug=False, log_callback=None, session=None,
+                 min_throughput=0, tftp_port=69, dhcp_pool=None, dhcp_interface=None):
+        super().__init__(port=port, debug=debug, log_callback=log_callback, session=session)
         # Define the setup and test commands for a Ethernet test
         self.mac_addr = mac_addr
         self.server_ip = server_ip
+        # Minimum TFTP throughput in MB/s; 0 keeps the plain DHCP check
+        self.min_throughput = min_throughput
+        self.tftp_port = tftp_port
+        # First address of the embedded DHCP responder's pool; None leases from the LAN's server
+        self.dhcp_pool = dhcp_pool
+        self.dhcp_interface = dhcp_interface
         linux_port = 'ttyS0' if slot.startswith('Slot 1') else 'ttyS1'
         logger.info(f"Initializing Linux Tests on {linux_port}")
         formatted_mac = ":".join(self.mac_addr[i:i+2] for i in range(0, 12, 2))
+        self.formatted_mac = formatted_mac
         self.setup_cmds = [
             f'setenv ethaddr {formatted_mac}',
             f'setenv bootargs "console={linux_port},115200 ethaddr0={formatted_mac}"',
@@ -29,7 +38,20 @@ class Eth0Test(UBootTester):
            
             # self._log(result.stdout)
 
-            success = self.run_test_case(self.setup_cmds, self.test_cmd, self.expect)
+            dhcp_server = None
+            if self.dhcp_pool:
+                try:
+                    dhcp_server = acquire_dhcp_server(self.server_ip, self.dhcp_pool, interface=self.dhcp_interface)
+                except OSError as e:
+                    self._log(f">>> ERROR: DHCP responder could not start ({e})\n")
+                    return False
+            since = time.monotonic()
+            if self.min_throughput > 0:
+                success = self.run_eth_qualification_test_case(self.setup_cmds, self.min_throughput, self.tftp_port)
+            else:
+                success = self.run_test_case(self.setup_cmds, self.test_cmd, self.expect)
+            if dhcp_server is not None:
+                self.report_dhcp_lease(dhcp_server, self.formatted_mac, since)
         except Exception as e:
             logger.exception("Error during Ethernet test:")
             success = False
@@ -39,8 +61,8 @@ class Eth0Test(UBootTester):
     
 # RTC Tester
 class RTCTest(UBootTester):
-    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None):
-        super().__init__(port=port, debug=debug, log_callback=log_callback)
+    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None, session=None):
+        super().__init__(port=port, debug=debug, log_callback=log_callback, session=session)
         logger.info("Initializing RTC Test")
         # Define the setup and test commands for a USB test
         self.test_cmd = 'date'
@@ -48,7 +70,7 @@ class RTCTest(UBootTester):
     def run(self):
         try:
             self.connect()
-            success = self.run_rtc_test_case(self.test_cmd, 3)
+            success = self.run_rtc_drift_test_case(self.test_cmd, tolerance=0.05)
         except Exception as e:
             logger.exception("Error during RTC test:")
             success = False
@@ -58,8 +80,8 @@ class RTCTest(UBootTester):
     
 # Xbee Tester
 class XbeeTest(UBootTester):
-    def __init__(self, port='/dev/ttyUSB0', slot='Slot 1', debug=False, log_callback=None):
-        super().__init__(port=port, debug=debug, log_callback=log_callback)
+    def __init__(self, port='/dev/ttyUSB0', slot='Slot 1', debug=False, log_callback=None, session=None, api_mode=True):
+        super().__init__(port=port, debug=debug, log_callback=log_callback, session=session)
         logger.info("Initializing Xbee Test")
         # Define the setup and test commands for a USB test
         uboot_port = 'nuc980_serial0' if slot.startswith('Slot 1') else 'nuc980_serial1'
@@ -73,11 +95,23 @@ class XbeeTest(UBootTester):
             f'setenv stdout {uboot_port}',
         ]
         # self.test_cmd = 'AT\r'
+        # API mode: UART2 is started as a console output once, then the frames bypass the console
+        self.api_mode = api_mode
+        self.api_setup_cmds = [
+            f'setenv stdout {uboot_port},nuc980_serial2',
+            f'setenv stdout {uboot_port}',
+            'mw 0xb0000080 0x33333300',  # Set MFP RST PIN 0
+            'gpio set 65',               # Set RST PIN (PC1) high
+            'mw 0xb0072024 0x300004e0',  # Set UART2 to 9600 baud rate
+        ]
 
     def run(self):
         try:
             self.connect()
-            success = self.run_xbee_test_case(self.setup_cmds, 2)
+            success = self.run_xbee_api_test_case(self.api_setup_cmds) if self.api_mode else None
+            if success is None:
+                # Module in transparent mode (AP=0): fall back to "+++" command mode
+                success = self.run_xbee_test_case(self.setup_cmds, 2)
         except Exception as e:
             logger.exception("Error during Xbee test:")
             success = False
@@ -87,8 +121,8 @@ class XbeeTest(UBootTester):
     
 # BatteryTest
 class BatteryTest(UBootTester):
-    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None):
-        super().__init__(port=port, debug=debug, log_callback=log_callback)
+    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None, session=None):
+        super().__init__(port=port, debug=debug, log_callback=log_callback, session=session)
         logger.info("Initializing Battery Test")
         # Define the setup and test commands for a Battery test
         self.setup_cmds = [
@@ -101,7 +135,7 @@ class BatteryTest(UBootTester):
     def run(self):
         try:
             self.connect()
-            success = self.run_batt_test_case(self.setup_cmds, 10)
+            success = self.run_batt_sampler_test_case(self.setup_cmds, 10)
         except Exception as e:
             logger.exception("Error during Battery test:")
             success = False
@@ -111,8 +145,8 @@ class BatteryTest(UBootTester):
     
 # RelayTest
 class RelayTest(UBootTester):
-    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None):
-        super().__init__(port=port, debug=debug, log_callback=log_callback)
+    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None, session=None):
+        super().__init__(port=port, debug=debug, log_callback=log_callback, session=session)
         logger.info("Initializing Relay Test")
         # Define the setup and test commands for a Relay test
         # Global GPIO Number = (Port Index × 32) + Pin Number
@@ -125,7 +159,7 @@ class RelayTest(UBootTester):
             for i in range(2):
                 self.send_command_quick(self.setup_cmds)
                 self._log("Relay toggled, (can you hear?)\n")
-                time.sleep(1.0)
+                self._guard(1.0)
             return True
         except Exception as e:
             logger.exception("Error during Relay test:")
@@ -137,8 +171,8 @@ class RelayTest(UBootTester):
     
 # SIMTest
 class SIMTest(UBootTester):
-    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None):
-        super().__init__(port=port, debug=debug, log_callback=log_callback)
+    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None, session=None):
+        super().__init__(port=port, debug=debug, log_callback=log_callback, session=session)
         logger.info("Initializing SIM Test")
         self.setup_cmds = []           # No extra setup needed
         # self.test_cmd = "boot"         # U-Boot boot command
@@ -159,14 +193,15 @@ class SIMTest(UBootTester):
        
 # USB Tester
 class USBTest(UBootTester):
-    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None):
-        super().__init__(port=port, debug=debug, log_callback=log_callback)
+    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None, session=None):
+        super().__init__(port=port, debug=debug, log_callback=log_callback, session=session)
         logger.info("Initializing USB Test")
         # Define the setup and test commands for a USB test
         self.setup_cmds = 'lsusb'
+        # Searched in "vid:pid description" of each lsusb device
         self.expect = [
-            r"SimTech",
-            r"Raspberry Pi",
+            r"^1e0e:|SimTech",
+            r"^2e8a:|Raspberry Pi",
             r"ZEPHYR ECS[_ ]USB",   # [_ ] means “underscore or space”
         ]
 
@@ -183,17 +218,15 @@ class USBTest(UBootTester):
 
 # WiFi Tester
 class WiFiTest(UBootTester):
-    def __init__(self, wifi_ssid=None, wifi_password=None, wifi_security=None, port='/dev/ttyUSB0', debug=False, log_callback=None):
-        super().__init__(port=port, debug=debug, log_callback=log_callback)
+    def __init__(self, wifi_ssid=None, wifi_password=None, wifi_security=None, port='/dev/ttyUSB0', debug=False, log_callback=None, session=None):
+        super().__init__(port=port, debug=debug, log_callback=log_callback, session=session)
         logger.info("Initializing WiFi Test")
         self.wifi_ssid = wifi_ssid
         self.wifi_password = wifi_password
         self.wifi_security = wifi_security  # Options: OPEN, WEP, WPA, WPA2
         # Define the setup and test commands for a WiFi test
-        self.setup_cmds = [
-            # 'gpioset gpiochip0 66=0',  # Set ESP32 EN PIN low
-            # 'gpioset gpiochip0 66=1',  # Set ESP32 EN PIN high
-            # 'devmem 0xB00040B0 32 0x02000000', # Reset Esp32
+        # Configuration files only (the on-device agent brings the radio up itself, see linux_agent)
+        self.config_cmds = [
             '''cat > /etc/config/network << 'EOF'
 config interface 'loopback'
         option ifname 'lo'
@@ -226,6 +259,12 @@ config wifi-iface 'wifinet0'
         option encryption 'psk2'
         option key '{wifi_password}'
 EOF''',
+        ]
+        self.setup_cmds = [
+            # 'gpioset gpiochip0 66=0',  # Set ESP32 EN PIN low
+            # 'gpioset gpiochip0 66=1',  # Set ESP32 EN PIN high
+            # 'devmem 0xB00040B0 32 0x02000000', # Reset Esp32
+            *self.config_cmds,
             'wifi reload',               # run in background
             'wifi up',               # bring up wlan0 interface
             # 'udhcpc -i wlan0 -q -t 5',  # request an IP via udhcpc (OpenWrt's DHCP client)
@@ -251,8 +290,8 @@ EOF''',
 # BLE Tester
 # To-Do: Make it automatic
 class BLETest(UBootTester):
-    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None):
-        super().__init__(port=port, debug=debug, log_callback=log_callback)
+    def __init__(self, port='/dev/ttyUSB0', debug=False, log_callback=None, session=None):
+        super().__init__(port=port, debug=debug, log_callback=log_callback, session=session)
         logger.info("Initializing BLE Test")
         # Define the setup and test commands for a USB test
         self.setup_cmds = ''
@@ -268,4 +307,21 @@ class BLETest(UBootTester):
         finally:
             self.disconnect()
         return success
-    
\ No newline at end of file
+
+
+# Test definitions shown in the GUI, in run order, with a reference to the test class.
+# "depends_on" (optional): tests that must pass first (see test_scheduler)
+# "agent" (optional): check of the on-device agent that can stand in for the test (see linux_agent)
+TESTS = [
+    {"name": "Ethernet Test", "requires_input": False, "os":"uboot", "class": Eth0Test},
+    {"name": "RTC Test", "requires_input": False, "os":"uboot", "class": RTCTest},
+    {"name": "Xbee Test", "requires_input": False,  "os":"uboot","class": XbeeTest},
+    {"name": "Battery Test", "requires_input": False, "os":"uboot", "class": BatteryTest},
+    {"name": "Relay Test", "requires_input": True, "os":"uboot", "class": RelayTest},
+    {"name": "BLE Test", "requires_input": True, "os":"openwrt", "class": BLETest},
+    {"name": "WiFi Test", "requires_input": False, "os":"openwrt", "class": WiFiTest, "agent": "wifi"},
+    {"name": "USB Test", "requires_input": False, "os":"openwrt", "class": USBTest, "agent": "usb"},
+    # The modem's AT port (/dev/ttyUSB2) only exists once it has enumerated on USB
+    {"name": "SIM Test", "requires_input": False, "os":"openwrt", "class": SIMTest, "depends_on": ["USB Test"], "agent": "sim"},
+    # {"name": "Button Test", "requires_input": False, "class": ButtonTest},
+]
@@ -0,0 +1,260 @@
+# test_scheduler.py
+"""
+Phase-aware "Run All" scheduler.
+
+- Orders the selected tests into at most one U-Boot phase followed by one
+  OpenWRT phase, keeping the list order inside a phase and honouring the
+  optional "depends_on" key of a test definition (names of tests that must
+  run, and pass, first).
+- Runs the plan unattended on a console session: the reboot into U-Boot and
+  the boot into OpenWRT are done by the scheduler itself, no popups.
+- Reports how many OS transitions the plan avoided compared with running the
+  selection in the given order, and the time that saved (estimated from the
+  transitions measured during the run).
+
+Usage:
+    scheduler = RunAllScheduler(session, selected_tests, make_tester, start_os="uboot", on_event=q.put)
+    summary = scheduler.run()      # blocking, call it from a worker thread
+"""
+
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+import re
+import threading
+import time
+
+from log import logger
+from serial_expect import SerialExpect
+from boot_tracker import BootTracker
+from linux_agent import run_agent_checks
+from uboot_tester import UBOOT_PROMPT, AUTOBOOT_STOP_KEY
+
+__all__ = ["Phase", "RunSummary", "plan_phases", "count_transitions", "failed_dependencies", "RunAllScheduler"]
+
+# Phase order of a plan; matches the "os" key of the test definitions
+PHASE_ORDER = ("uboot", "openwrt")
+# terminal_state names used by the app for each phase
+TERMINAL_STATE = {"uboot": "uboot", "openwrt": "linux"}
+# Used for the time-saved figure when no transition was measured during the run
+DEFAULT_TRANSITION_TIME = 60.0
+
+
+class Phase(NamedTuple):
+    os: str
+    tests: List[Dict]
+
+
+class RunSummary(NamedTuple):
+    results: Dict[str, str]        # test name -> "PASS" / "FAIL" / "SKIPPED"
+    transitions: int               # OS transitions the plan needed
+    naive_transitions: int         # ... and running the selection in list order would have needed
+    transition_time: float         # average measured transition time (s)
+    elapsed: float
+
+    @property
+    def reboots_avoided(self) -> int:
+        return max(0, self.naive_transitions - self.transitions)
+
+    @property
+    def time_saved(self) -> float:
+        return self.reboots_avoided * self.transition_time
+
+
+def _order_phase(tests: Sequence[Dict], done: set) -> List[Dict]:
+    """Stable topological order of one phase; `done` holds names already scheduled."""
+    names = {t["name"] for t in tests}
+    ordered, pending = [], list(tests)
+    while pending:
+        for test in pending:
+            deps = [d for d in test.get("depends_on", ()) if d in names]
+            if all(d in done for d in deps):
+                ordered.append(test)
+                done.add(test["name"])
+                pending.remove(test)
+                break
+        else:
+            raise ValueError("Circular test dependencies: " + ", ".join(t["name"] for t in pending))
+    return ordered
+
+
+def plan_phases(tests: Sequence[Dict]) -> List[Phase]:
+    """
+    Split `tests` into a U-Boot phase and an OpenWRT phase (empty phases are dropped).
+    Raises ValueError if a dependency cannot be satisfied in that order.
+    """
+    selected = {t["name"] for t in tests}
+    for test in tests:
+        if test["os"] not in PHASE_ORDER:
+            raise ValueError(f"{test['name']}: unknown OS '{test['os']}'")
+        for dep in test.get("depends_on", ()):
+            dep_test = next((t for t in tests if t["name"] == dep), None)
+            if dep_test is None:
+                continue        # not selected: assume it was run before
+            if PHASE_ORDER.index(dep_test["os"]) > PHASE_ORDER.index(test["os"]):
+                raise ValueError(f"{test['name']} ({test['os']}) depends on {dep} ({dep_test['os']}), "
+                                 f"which can only run after it")
+    done = set()
+    phases = []
+    for os_name in PHASE_ORDER:
+        phase_tests = [t for t in tests if t["os"] == os_name]
+        if phase_tests:
+            phases.append(Phase(os_name, _order_phase(phase_tests, done)))
+    logger.debug("Run plan: %s (%d tests selected)",
+                 " | ".join(f"{p.os}: {', '.join(t['name'] for t in p.tests)}" for p in phases), len(selected))
+    return phases
+
+
+def count_transitions(tests: Sequence[Dict], start_os: Optional[str]) -> int:
+    """Number of U-Boot <-> OpenWRT transitions needed to run `tests` in this order."""
+    current = start_os
+    transitions = 0
+    for test in tests:
+        if test["os"] != current:
+            transitions += 1
+            current = test["os"]
+    return transitions
+
+
+def failed_dependencies(test: Dict, results: Dict[str, str]) -> List[str]:
+    """Names of the tests `test` depends on that did not pass; a dependency missing from `results` was not selected."""
+    return [d for d in test.get("depends_on", ()) if results.get(d, "PASS") != "PASS"]
+
+
+class RunAllScheduler:
+    def __init__(
+        self,
+        session,
+        tests: Sequence[Dict],
+        make_tester: Callable[[Dict], object],
+        start_os: Optional[str] = None,
+        on_event: Optional[Callable[[str, object], None]] = None,
+        boot_timeout: float = 300,
+    ):
+        """
+        session:     open ConsoleSession of the DUT
+        tests:       selected test definitions, in the order the operator sees them
+        make_tester: returns the tester instance for a test definition
+        start_os:    "uboot", "openwrt" or None if unknown
+        on_event:    called with (event, value) from the scheduler thread:
+                     ("status", str), ("os", "uboot"/"openwrt"), ("result", (name, result)), ("summary", RunSummary)
+        """
+        self.session = session
+        self.tests = list(tests)
+        self.make_tester = make_tester
+        self.start_os = start_os
+        self.on_event = on_event
+        self.boot_timeout = boot_timeout
+        self._cancel = threading.Event()
+        self._boot_tracker: Optional[BootTracker] = None
+        self._transition_times: List[float] = []
+
+    def cancel(self):
+        """Stop after the running test (or right away while OpenWRT boots)."""
+        self._cancel.set()
+        if self._boot_tracker:
+            self._boot_tracker.cancel()
+
+    def _emit(self, event: str, value):
+        if self.on_event:
+            self.on_event(event, value)
+
+    # ------- OS transitions -------
+    def _console(self) -> SerialExpect:
+        # A fresh cursor: only output produced after our command can match
+        cursor = self.session.cursor()
+        return SerialExpect(lambda: cursor.read(timeout=0.1))
+
+    def _enter_uboot(self) -> bool:
+        self._emit("status", "Rebooting into U-Boot...")
+        console = self._console()
+        self.session.write(b'reboot\r\n')
+        index, _, _ = console.expect(re.escape(UBOOT_PROMPT), timeout=self.boot_timeout)
+        if index < 0:
+            return False
+        self.session.write(AUTOBOOT_STOP_KEY.encode())
+        index, _, _ = console.expect(r'=> ', timeout=5)
+        return index == 0
+
+    def _enter_openwrt(self) -> bool:
+        self._emit("status", "Booting OpenWRT...")
+
+        def on_boot_event(event, value):
+            if event == "milestone":
+                self._emit("status", f"Booting OpenWRT: {value.milestone.label}...")
+
+        self._boot_tracker = BootTracker(self.session, on_event=on_boot_event, timeout=self.boot_timeout)
+        self.session.write(b'boot\r\n')
+        try:
+            return self._boot_tracker.run()
+        finally:
+            self._boot_tracker = None
+
+    def _transition(self, os_name: str) -> bool:
+        start = time.monotonic()
+        ok = self._enter_uboot() if os_name == "uboot" else self._enter_openwrt()
+        if ok:
+            self._transition_times.append(time.monotonic() - start)
+            self._emit("os", os_name)
+        return ok
+
+    # ------- on-device agent -------
+    def _run_agent(self, tests: Sequence[Dict]) -> Dict[str, bool]:
+        """Results (by test name) of the tests the on-device agent ran in parallel; {} to run them one by one."""
+        agent_tests = [t for t in tests if t.get("agent")]
+        if len(agent_tests) < 2 or self._cancel.is_set():
+            return {}
+        self._emit("status", f"Running {', '.join(t['name'] for t in agent_tests)} on the DUT...")
+        by_check = run_agent_checks({t["agent"]: self.make_tester(t) for t in agent_tests})
+        return {t["name"]: by_check[t["agent"]] for t in agent_tests if t["agent"] in by_check}
+
+    # ------- run -------
+    def run(self) -> RunSummary:
+        start = time.monotonic()
+        results = {t["name"]: "SKIPPED" for t in self.tests}
+        current = self.start_os
+        transitions = 0
+        phases = plan_phases(self.tests)
+
+        for phase in phases:
+            if self._cancel.is_set():
+                break
+            if phase.os != current:
+                transitions += 1
+                if not self._transition(phase.os):
+                    logger.error(f"Run All: could not reach {phase.os}, remaining tests skipped")
+                    self._emit("status", f"Could not reach {phase.os}")
+                    break
+                current = phase.os
+            agent_results = self._run_agent(phase.tests) if phase.os == "openwrt" else {}
+            for test in phase.tests:
+                if self._cancel.is_set():
+                    break
+                name = test["name"]
+                failed_deps = failed_dependencies(test, results)
+                if failed_deps:
+                    logger.warning(f"Run All: {name} skipped, depends on {', '.join(failed_deps)}")
+                    self._emit("result", (name, "SKIPPED"))
+                    continue
+                if name in agent_results:
+                    success = agent_results[name]
+                else:
+                    self._emit("status", f"Running {name}...")
+                    try:
+                        success = self.make_tester(test).run()
+                    except Exception:
+                        logger.exception(f"Run All: {name} raised")
+                        success = False
+                results[name] = "PASS" if success else "FAIL"
+                self._emit("result", (name, results[name]))
+
+        measured = self._transition_times
+        summary = RunSummary(
+            results=results,
+            transitions=transitions,
+            naive_transitions=count_transitions(self.tests, self.start_os),
+            transition_time=sum(measured) / len(measured) if measured else DEFAULT_TRANSITION_TIME,
+            elapsed=time.monotonic() - start,
+        )
+        logger.info(f"Run All finished in {summary.elapsed:.1f} s: {summary.transitions} OS transitions, "
+                    f"{summary.reboots_avoided} avoided (~{summary.time_saved:.0f} s saved)")
+        self._emit("summary", summary)
+        return summary
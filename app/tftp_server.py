@@ -0,0 +1,248 @@
+# tftp_server.py
+"""
+Read-only TFTP server (RFC 1350, blksize/tsize options of RFC 2348/2349) for the Ethernet qualification.
+
+- Serves in-memory files only (the test payload), so nothing on the station's
+  disk is exposed and no external server is needed.
+- Each transfer runs on its own thread and UDP port, as the RFC asks, so the
+  slots of a station can fetch at the same time.
+- The server times every transfer (first DATA sent to last ACK received),
+  which gives the link throughput without depending on the console.
+- One server per UDP port is shared by all testers (acquire_tftp_server).
+
+Usage:
+    server = acquire_tftp_server(port=69)
+    server.add_file("igv4_eth.bin", payload)
+    ...DUT runs `tftp 0x80008000 igv4_eth.bin`...
+    transfer = server.wait_transfer("igv4_eth.bin", client_ip, timeout=5)
+    print(transfer.throughput)     # bytes per second
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Tuple
+import random
+import socket
+import struct
+import threading
+import time
+import zlib
+
+from log import logger
+
+__all__ = ["TFTP_PORT", "Transfer", "TftpServer", "make_payload", "acquire_tftp_server"]
+
+TFTP_PORT = 69
+RRQ, WRQ, DATA, ACK, ERROR, OACK = 1, 2, 3, 4, 5, 6
+ERR_NOT_FOUND, ERR_ILLEGAL = 1, 4
+DEFAULT_BLKSIZE = 512
+MAX_BLKSIZE = 65464
+RETRIES = 5
+RETRY_TIMEOUT = 1.0
+
+
+class Transfer(NamedTuple):
+    filename: str
+    client: Tuple[str, int]
+    size: int                  # bytes sent (the whole file on success)
+    blksize: int
+    started: float             # monotonic: first DATA (or OACK) sent
+    finished: float            # ... last ACK received
+    ok: bool
+    error: Optional[str] = None
+
+    @property
+    def duration(self) -> float:
+        return self.finished - self.started
+
+    @property
+    def throughput(self) -> float:
+        """Bytes per second."""
+        return self.size / self.duration if self.duration > 0 else 0.0
+
+
+def make_payload(size: int, seed: int = 0x16E4) -> bytes:
+    """Deterministic pseudo-random test payload (no runs a PHY or a compressor could hide errors in)."""
+    return random.Random(seed).getrandbits(size * 8).to_bytes(size, "little") if size else b""
+
+
+def _parse_request(packet: bytes) -> Tuple[str, str, Dict[str, str]]:
+    fields = packet[2:].split(b"\0")
+    if len(fields) < 3:
+        raise ValueError("truncated request")
+    filename, mode = fields[0].decode(errors="replace"), fields[1].decode(errors="replace").lower()
+    options = {}
+    for name, value in zip(fields[2:-1:2], fields[3::2]):
+        options[name.decode(errors="replace").lower()] = value.decode(errors="replace")
+    return filename, mode, options
+
+
+class TftpServer:
+    def __init__(self, host: str = "0.0.0.0", port: int = TFTP_PORT):
+        self.host = host
+        self.port = port
+        self.files: Dict[str, bytes] = {}
+        self.transfers: List[Transfer] = []
+        self._sock: Optional[socket.socket] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+        self._cond = threading.Condition()
+
+    # ------- lifetime -------
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        self._sock.bind((self.host, self.port))
+        self._sock.settimeout(0.5)
+        self.port = self._sock.getsockname()[1]      # port 0: the OS picked one
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._serve, name=f"TftpServer({self.port})", daemon=True)
+        self._thread.start()
+        logger.info(f"TFTP server listening on {self.host}:{self.port}")
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(timeout=2)
+        if self._sock:
+            self._sock.close()
+            self._sock = None
+
+    def add_file(self, name: str, data: bytes):
+        self.files[name] = data
+
+    def crc32(self, name: str) -> int:
+        return zlib.crc32(self.files[name]) & 0xFFFFFFFF
+
+    # ------- results -------
+    def wait_transfer(self, name: str, client_ip: Optional[str] = None, since: float = 0.0,
+                      timeout: float = 10.0) -> Optional[Transfer]:
+        """First finished transfer of `name` (to `client_ip`) that started after `since`; None on timeout."""
+        def find():
+            for transfer in self.transfers:
+                if (transfer.filename == name and transfer.started >= since
+                        and (client_ip is None or transfer.client[0] == client_ip)):
+                    return transfer
+            return None
+
+        with self._cond:
+            self._cond.wait_for(find, timeout)
+            return find()
+
+    def _record(self, transfer: Transfer):
+        with self._cond:
+            self.transfers.append(transfer)
+            del self.transfers[:-100]
+            self._cond.notify_all()
+        if transfer.ok:
+            logger.info(f"TFTP {transfer.filename} -> {transfer.client[0]}: {transfer.size} bytes in "
+                        f"{transfer.duration:.3f} s ({transfer.throughput / 1e6:.2f} MB/s, blksize {transfer.blksize})")
+        else:
+            logger.warning(f"TFTP {transfer.filename} -> {transfer.client[0]} failed: {transfer.error}")
+
+    # ------- protocol -------
+    def _serve(self):
+        while not self._stop.is_set():
+            try:
+                packet, client = self._sock.recvfrom(1024)
+            except socket.timeout:
+                continue
+            except OSError:
+                break
+            if len(packet) < 2:
+                continue
+            threading.Thread(target=self._handle, args=(packet, client), name=f"TFTP {client[0]}",
+                             daemon=True).start()
+
+    def _handle(self, packet: bytes, client: Tuple[str, int]):
+        # Every transfer gets its own socket (transfer ID)
+        sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        try:
+            sock.bind((self.host, 0))
+            sock.settimeout(RETRY_TIMEOUT)
+            opcode = struct.unpack("!H", packet[:2])[0]
+            if opcode != RRQ:
+                sock.sendto(struct.pack("!HH", ERROR, ERR_ILLEGAL) + b"read-only server\0", client)
+                return
+            try:
+                filename, mode, options = _parse_request(packet)
+            except ValueError as e:
+                sock.sendto(struct.pack("!HH", ERROR, ERR_ILLEGAL) + f"{e}\0".encode(), client)
+                return
+            filename = filename.lstrip("/")
+            data = self.files.get(filename)
+            if data is None:
+                sock.sendto(struct.pack("!HH", ERROR, ERR_NOT_FOUND) + b"file not found\0", client)
+                self._record(Transfer(filename, client, 0, 0, time.monotonic(), time.monotonic(), False,
+                                      "file not found"))
+                return
+            self._send_file(sock, client, filename, data, options)
+        finally:
+            sock.close()
+
+    def _exchange(self, sock, client, packet: bytes, block: int) -> bool:
+        """Send `packet` until the client ACKs `block` (OACK: block 0)."""
+        for _ in range(RETRIES):
+            sock.sendto(packet, client)
+            deadline = time.monotonic() + RETRY_TIMEOUT
+            while time.monotonic() < deadline:
+                try:
+                    reply, address = sock.recvfrom(1024)
+                except socket.timeout:
+                    break
+                if address != client or len(reply) < 4:
+                    continue
+                opcode, number = struct.unpack("!HH", reply[:4])
+                if opcode == ERROR:
+                    return False
+                if opcode == ACK and number == block & 0xFFFF:
+                    return True
+                # Duplicate ACK of the previous block: keep waiting (no Sorcerer's Apprentice resend)
+        return False
+
+    def _send_file(self, sock, client, filename: str, data: bytes, options: Dict[str, str]):
+        blksize = DEFAULT_BLKSIZE
+        accepted = {}
+        if "blksize" in options:
+            try:
+                blksize = max(8, min(MAX_BLKSIZE, int(options["blksize"])))
+                accepted["blksize"] = str(blksize)
+            except ValueError:
+                pass
+        if "tsize" in options:
+            accepted["tsize"] = str(len(data))
+        started = time.monotonic()
+        if accepted:
+            oack = struct.pack("!H", OACK) + b"".join(f"{k}\0{v}\0".encode() for k, v in accepted.items())
+            if not self._exchange(sock, client, oack, 0):
+                self._record(Transfer(filename, client, 0, blksize, started, time.monotonic(), False,
+                                      "no ACK for the options"))
+                return
+        block = 1
+        offset = 0
+        while True:
+            chunk = data[offset:offset + blksize]
+            if not self._exchange(sock, client, struct.pack("!HH", DATA, block & 0xFFFF) + chunk, block):
+                self._record(Transfer(filename, client, offset, blksize, started, time.monotonic(), False,
+                                      f"no ACK for block {block}"))
+                return
+            offset += len(chunk)
+            if len(chunk) < blksize:
+                break
+            block += 1
+        self._record(Transfer(filename, client, offset, blksize, started, time.monotonic(), True))
+
+
+# ------- shared servers -------
+_servers: Dict[int, TftpServer] = {}
+_servers_lock = threading.Lock()
+
+
+def acquire_tftp_server(port: int = TFTP_PORT) -> TftpServer:
+    """The running server on `port` (started on first use, kept for the life of the app)."""
+    with _servers_lock:
+        server = _servers.get(port)
+        if server is None:
+            server = TftpServer(port=port)
+            server.start()
+            _servers[port] = server
+        return server
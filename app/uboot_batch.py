@@ -0,0 +1,108 @@
+# uboot_batch.py
+"""
+U-Boot command coalescer.
+
+- Packs a setup sequence into as few console lines as U-Boot's command
+  buffer (CONFIG_SYS_CBSIZE) allows, using ';'-separated command lists.
+- Every command is followed by `echo ~<n>:$?` so the combined output can be
+  split back per command, with its exit status when the hush shell is enabled.
+
+Usage:
+    for batch in coalesce_commands(cmds):
+        ser.write((build_line(batch) + "\\r\\n").encode())
+        ...wait for marker_pattern(batch) and the prompt...
+        results = parse_batch_output(output, batch)
+"""
+
+from typing import List, NamedTuple, Optional, Sequence, Tuple
+import re
+
+__all__ = [
+    "UBOOT_CBSIZE",
+    "CommandResult",
+    "coalesce_commands",
+    "build_line",
+    "marker_pattern",
+    "parse_batch_output",
+]
+
+# CONFIG_SYS_CBSIZE of the IGv4 U-Boot build (console input buffer, incl. terminator)
+UBOOT_CBSIZE = 256
+
+# Messages U-Boot prints when a command fails even if $? is not available
+ERROR_RE = re.compile(r"Unknown command|## Error|Usage:|Error: |Failed|failed")
+MARKER_RE = re.compile(r"(?:^|[\r\n])~(\d+):([^\r\n]*)")
+
+
+class CommandResult(NamedTuple):
+    command: str
+    status: Optional[int]      # None when $? is not expanded (no hush shell)
+    output: str
+    error: Optional[str]       # first error line, None if the command succeeded
+
+
+def _marked(index: int, command: str) -> str:
+    return f"{command};echo ~{index}:$?"
+
+
+def coalesce_commands(cmds: Sequence[str], max_len: int = UBOOT_CBSIZE - 2) -> List[List[Tuple[int, str]]]:
+    """
+    Split `cmds` into batches of (index, command) that fit on one console line.
+    Order is preserved; a command too long to share a line gets a line of its own.
+    """
+    batches: List[List[Tuple[int, str]]] = []
+    current: List[Tuple[int, str]] = []
+    length = 0
+    for index, cmd in enumerate(cmds):
+        piece = len(_marked(index, cmd))
+        extra = piece + (1 if current else 0)     # ";" separator
+        if current and length + extra > max_len:
+            batches.append(current)
+            current, length, extra = [], 0, piece
+        current.append((index, cmd))
+        length += extra
+    if current:
+        batches.append(current)
+    return batches
+
+
+def build_line(batch: Sequence[Tuple[int, str]]) -> str:
+    """The console line for a batch, e.g. 'setenv a 1;echo ~0:$?;saveenv;echo ~1:$?'."""
+    return ";".join(_marked(index, cmd) for index, cmd in batch)
+
+
+def marker_pattern(batch: Sequence[Tuple[int, str]]) -> str:
+    """Regex matching the printed marker of the last command in the batch (not its echo)."""
+    return rf"[\r\n]~{batch[-1][0]}:[^$\r\n]*[\r\n]"
+
+
+def parse_batch_output(text: str, batch: Sequence[Tuple[int, str]]) -> List[CommandResult]:
+    """Split the console output of one batch line into per-command results."""
+    # skip the echo of the line itself
+    echo_end = text.find(f"echo ~{batch[-1][0]}:$?")
+    pos = echo_end + len(f"echo ~{batch[-1][0]}:$?") if echo_end >= 0 else 0
+
+    markers = {}
+    for m in MARKER_RE.finditer(text, pos):
+        markers[int(m.group(1))] = m
+
+    results = []
+    for index, cmd in batch:
+        m = markers.get(index)
+        if m is None:
+            results.append(CommandResult(cmd, None, "", "no output marker (command did not finish)"))
+            continue
+        output = text[pos:m.start()].strip()
+        pos = m.end()
+        status_text = m.group(2).strip()
+        status = int(status_text) if status_text.lstrip("-").isdigit() else None
+        error = None
+        err = ERROR_RE.search(output)
+        if err:
+            line_start = output.rfind("\n", 0, err.start()) + 1
+            line_end = output.find("\n", err.start())
+            error = output[line_start:line_end if line_end >= 0 else None].strip()
+        elif status not in (None, 0):
+            error = f"exit status {status}"
+        results.append(CommandResult(cmd, status, output, error))
+    return results
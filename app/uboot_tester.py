@@ -1,16 +1,83 @@
-import serial
 import time
 import re
+import threading
+from contextlib import contextmanager
+from console_ops import Blocking, Expect, Flush, Guard, Write
 from log import logger
-
-class UBootTester:
-    def __init__(self, port='/dev/ttyUSB0', baudrate=115200, timeout=0.1, debug=False, log_callback=None):
-        self.port = port
-        self.baudrate = baudrate
-        self.timeout = timeout
-        self.ser = None
-        self.debug = debug
-        self.log_callback = log_callback
+from metrics import metrics
+from rtc_drift import RTC_TIME_RE, RTCSample, DriftEstimator, parse_rtc_time
+from serial_expect import SerialExpect
+from serial_reader import acquire_port_reader, release_port_reader
+from tftp_server import TFTP_PORT, acquire_tftp_server, make_payload
+from modem_at import ModemClient
+from uboot_batch import coalesce_commands, build_line, marker_pattern, parse_batch_output
+from usb_devices import match_devices, parse_lsusb
+from xbee_api import (FrameDecoder, FrameError, UART2_DAT, UART2_FIFOSTS, at_command_frame, fifo_rx_count,
+                      parse_at_response, parse_md_words, uart_write_commands)
+
+# Shell prompt printed by OpenWRT once a command has finished (e.g. "root@OpenWrt:~# ")
+SHELL_PROMPT_RE = r'root@[^\r\n]*[#$] '
+# U-Boot command prompt at the start of a line
+UBOOT_PROMPT_RE = r'[\r\n]=> '
+# Association and DHCP events streamed to the console by the WiFi test's listeners
+WIFI_EVENT_CMDS = ['iw event & WIFI_IW=$!', 'ubus listen network.interface & WIFI_UBUS=$!']
+WIFI_EVENT_STOP_CMD = 'kill $WIFI_IW $WIFI_UBUS'
+WIFI_ASSOC_RE = r'wlan0 \(phy #\d+\): connected to [0-9a-fA-F:]{17}'
+WIFI_IFUP_RE = r'"action":\s*"ifup",\s*"interface":\s*"wwan"'
+SHELL_NOT_FOUND_RE = r'-ash: [\w.-]+: not found'
+# Power-fail input of the battery test: GPIO PB.13 (1x32 + 13), low once the supply is gone
+POWER_FAIL_GPIO = 45
+# Markers of the device-side power-fail sampler (see battery_sampler_line)
+PF_MARKER_RE = r'[\r\n]~PF:(start|timeout|low:([0-9a-fA-F]+))'
+# Boot milestones of the IGv4 console
+OPENWRT_PROMPT = "esp32_sdio_c5: print_capabilities"
+OPENWRT_PROMPT_2 = "nuc980-emac0 b0012000.emac0: eth0 is"
+# UBOOT_PROMPT = "Hit any key to stop autoboot"       # old prompt
+UBOOT_PROMPT = "Autoboot in 1 seconds"               # new prompt
+AUTOBOOT_STOP_KEY = "ecsi25"                         # magic key that interrupts autoboot
+# What send_command_quick costs per command without prompt pacing (0.2 s write guard + 0.2 s listen)
+FIXED_COMMAND_TIME = 0.4
+# lsusb re-polls while USB devices are still enumerating (seconds, doubling)
+USB_POLL_MIN = 0.25
+USB_POLL_MAX = 2.0
+# Ethernet qualification: payload fetched from the station's TFTP server and checked with crc32
+TFTP_LOAD_ADDR = 0x01000000
+ETH_PAYLOAD_NAME = "igv4_eth.bin"
+ETH_PAYLOAD_SIZE = 1 << 20
+# Both end on the line break, so a number cut between two reads is never taken for the whole one
+DHCP_BOUND_RE = r'DHCP client bound to address (\d+\.\d+\.\d+\.\d+)[^\r\n]*\r?\n'
+TFTP_DONE_RE = r'Bytes transferred = (\d+)[^\r\n]*\r?\n'
+# dhcp/tftp giving up (U-Boot would retry forever on a missing server)
+NET_ERROR_RE = r'TFTP error[^\r\n]*|Retry (?:count|time) exceeded|Abort'
+CRC32_RE = r'==> ([0-9a-fA-F]{8})'
+
+def battery_sampler_line(interval=0.02, timeout=10.0, gpio=POWER_FAIL_GPIO):
+    """
+    U-Boot hush line sampling the power-fail input every `interval` s on the board until it reads low.
+    Relies on `gpio input` exiting with the pin value. Prints ~PF:start, then ~PF:low:<samples, hex>
+    or ~PF:timeout (also after a Ctrl+C, which interrupts `sleep`).
+    """
+    limit = f"{max(1, int(timeout / interval)):x}"
+    return (f"echo ~PF:start;setenv pf_n 0;"
+            f"until gpio input {gpio} || itest $pf_n -ge {limit};"
+            f"do setexpr pf_n $pf_n + 1;sleep {interval} || setenv pf_n {limit};done;"
+            f"if itest $pf_n -ge {limit};then echo ~PF:timeout;else echo ~PF:low:$pf_n;fi")
+
+
+class TestAborted(BaseException):
+    """
+    Raised in the tester's thread after abort(). A BaseException, so the `except Exception`
+    of the tests' run() lets it through (their `finally` still gives the console back).
+    """
+
+
+class ConsoleTestCases:
+    """
+    Test cases shared by UBootTester and AsyncUBootTester.
+    Each case is a generator that yields console operations (see console_ops) and gets their results back,
+    so the command sequences and the parsing of the replies exist once. The testers only carry out
+    the I/O in their _drive(): blocking reads here, the event loop in AsyncUBootTester.
+    """
 
     def _log(self, msg):
         # Optionally log to GUI status and/or console
@@ -19,75 +86,195 @@ class UBootTester:
         if self.log_callback:
             self.log_callback(msg)
             
-    def connect(self):
-        self.ser = serial.Serial(self.port, self.baudrate, timeout=self.timeout)
-        self.ser.reset_input_buffer()
-        self.ser.reset_output_buffer()
-        time.sleep(0.5)
-
-    def disconnect(self):
-        if self.ser and self.ser.is_open:
-            self.ser.close()
-
-    def _debug_print(self, msg):
-        if self.debug:
-            print("[DEBUG]", msg, end='')
-
-    def send_command_quick(self, command):
+    @contextmanager
+    def _span(self, phase):
+        """Time a phase for the metrics export; phases nested in another one count towards the outer one."""
+        if self._in_span:
+            yield
+            return
+        self._in_span = True
+        try:
+            with metrics.span(phase, test=type(self).__name__, port=self.port, mac=getattr(self, "mac_addr", None)):
+                yield
+        finally:
+            self._in_span = False
+
+    def _quick_command_steps(self, command):
         """Send config/setup commands quickly. Print any received output if debug is on."""
-        if not self.ser or not self.ser.is_open:
-            raise Exception("Serial port not open")
-
-        self.ser.write((command + '\r\n').encode())
-        time.sleep(0.2)
+        if self.paced:
+            return (yield from self._paced_command_steps(command))
 
-        end_time = time.time() + 0.2
-        while time.time() < end_time:
-            if self.ser.in_waiting:
-                self._log(".")
-                data = self.ser.read(self.ser.in_waiting)
-                self._debug_print(data.decode(errors='ignore'))
-            time.sleep(0.05)
+        yield Write((command + '\r\n').encode())
+        yield Expect([], timeout=FIXED_COMMAND_TIME, progress=True)
+        return False
 
-    def send_and_wait_for_output(self, command, expect, timeout=10):
-        if not self.ser or not self.ser.is_open:
-            raise Exception("Serial port not open")
+    def _paced_command_steps(self, command, timeout=None):
+        """
+        Send a command and return as soon as its echo and the next U-Boot prompt are seen.
+        Returns True if the prompt came back within `timeout` (default self.command_timeout).
+        """
+        timeout = self.command_timeout if timeout is None else timeout
+        end_time = time.monotonic() + timeout
+        yield Write((command + '\r\n').encode())
+        # Prompts printed before the echo belong to earlier commands
+        index, _, _ = yield Expect(re.escape(command), timeout=timeout, progress=True)
+        if index == 0:
+            index, _, _ = yield Expect(UBOOT_PROMPT_RE, timeout=max(0, end_time - time.monotonic()),
+                                       progress=True)
+        if index != 0:
+            logger.warning(f"No U-Boot prompt after '{command}' within {timeout} s")
+            return False
+        return True
 
-        self.ser.reset_input_buffer()
-        self.ser.write((command + '\r\n').encode())
+    def _batch_steps(self, setup_cmds):
+        """
+        Send setup commands as few ';'-separated console lines and check each command's result.
+        Returns True when every line came back with its markers and a prompt.
+        """
+        all_prompts = True
+        for batch in coalesce_commands(setup_cmds):
+            line = build_line(batch)
+            print(f"  -> {line}")
+            timeout = self.command_timeout * len(batch)
+            end_time = time.monotonic() + timeout
+            yield Write((line + '\r\n').encode())
+            index, _, output = yield Expect(marker_pattern(batch), timeout=timeout, progress=True)
+            if index == 0:
+                index, _, _ = yield Expect(UBOOT_PROMPT_RE, timeout=max(0, end_time - time.monotonic()),
+                                           progress=True)
+            if index != 0:
+                logger.warning(f"No U-Boot prompt after batch '{line}' within {timeout} s")
+                all_prompts = False
+
+            for result in parse_batch_output(output, batch):
+                if result.error:
+                    logger.warning(f"Setup command '{result.command}' failed: {result.error}")
+                    self._log(f"✗ {result.command}: {result.error}\n")
+        return all_prompts
+
+    def _setup_steps(self, setup_cmds):
+        """
+        Send a list of setup commands (coalesced or one by one) and log the time spent.
+        Returns True when every command was acknowledged by a prompt (paced mode only).
+        """
+        start = time.monotonic()
+        all_prompts = True
+        with self._span("setup"):
+            if self.paced and self.coalesce:
+                all_prompts = yield from self._batch_steps(setup_cmds)
+            else:
+                for cmd in setup_cmds:
+                    print(f"  -> {cmd}")
+                    all_prompts = (yield from self._quick_command_steps(cmd)) and all_prompts
+
+        if self.paced and setup_cmds:
+            elapsed = time.monotonic() - start
+            saved = FIXED_COMMAND_TIME * len(setup_cmds) - elapsed
+            logger.info(f"Setup: {len(setup_cmds)} commands in {elapsed:.2f} s "
+                        f"({saved:.2f} s saved by {'coalescing' if self.coalesce else 'prompt pacing'})")
+        return all_prompts
+
+    def _send_and_wait_steps(self, command, expect, timeout=10):
+        yield Flush()
+        yield Write((command + '\r\n').encode())
         self._log(f"Waiting for result (up to {timeout} seconds)...\n")
 
-        output = b''
-        end_time = time.time() + timeout
+        index, _, output = yield Expect(re.escape(expect), timeout=timeout, progress=True)
+        if index == 0:
+            yield Write(b'\x03')  # Send Ctrl+C to stop the command
+            return output, True
 
-        while time.time() < end_time:
-            if self.ser.in_waiting:
-                self._log(".")
-                chunk = self.ser.read(self.ser.in_waiting)
-                output += chunk
-                self._debug_print(chunk.decode(errors='ignore'))
-                if expect.encode() in output:
-                    self.ser.write(b'\x03')  # Send Ctrl+C to stop the command
-                    return output.decode(), True
-            time.sleep(0.2)
+        return output, False
 
-        return output.decode(), False
-
-    def run_test_case(self, setup_cmds, test_cmd, expect, wait_time=10):
+    def _test_case_steps(self, setup_cmds, test_cmd, expect, wait_time=10):
         self._log("Sending setup commands...\n")
-        for cmd in setup_cmds:
-            print(f"  -> {cmd}")
-            self.send_command_quick(cmd)
-            
-        time.sleep(1.0)  # Guard time
+        if (yield from self._setup_steps(setup_cmds)):
+            # The last prompt is back, the console is idle: no guard time needed
+            logger.info("Guard time skipped (1.00 s saved by prompt pacing)")
+        else:
+            yield Guard(1.0)  # Guard time
         self._log(f"\nRunning test command: {test_cmd}\n")
-        output, success = self.send_and_wait_for_output(test_cmd, expect, timeout=wait_time)
+        output, success = yield from self._send_and_wait_steps(test_cmd, expect, timeout=wait_time)
 
         self._log("Final Output:\n")
         self._log(output)
 
         return success
     
+    # Ethernet qualification
+    def _eth_qualification_steps(self, setup_cmds, min_throughput, tftp_port=TFTP_PORT, timeout=20):
+        """
+        DHCP, then fetch ETH_PAYLOAD_NAME from the station's TFTP server and crc32 it in RAM.
+        Passes when the whole payload arrived intact at `min_throughput` MB/s or more
+        (timed by the server, first DATA to last ACK).
+        """
+        server = acquire_tftp_server(tftp_port)
+        if ETH_PAYLOAD_NAME not in server.files:
+            server.add_file(ETH_PAYLOAD_NAME, make_payload(ETH_PAYLOAD_SIZE))
+        size = len(server.files[ETH_PAYLOAD_NAME])
+
+        cmds = list(setup_cmds) + ['setenv autoload no']
+        if server.port != TFTP_PORT:
+            cmds.append(f'setenv tftpdstp {server.port}')
+        self._log("Sending setup commands...\n")
+        if not (yield from self._setup_steps(cmds)):
+            yield Guard(1.0)
+
+        self._log("\nRunning test command: dhcp\n")
+        yield Flush()
+        yield Write(b'dhcp\r\n')
+        index, match, output = yield Expect([DHCP_BOUND_RE, NET_ERROR_RE], timeout=10)
+        self._log(output)
+        if index != 0:
+            yield from self._stop_net_command_steps()
+            self._log(">>> ERROR: no DHCP lease\n")
+            return False
+        client_ip = match.group(1).decode()
+
+        self._log(f"\nRunning test command: tftp 0x{TFTP_LOAD_ADDR:x} {ETH_PAYLOAD_NAME}\n")
+        since = time.monotonic()
+        yield Flush()
+        yield Write(f'tftp 0x{TFTP_LOAD_ADDR:x} {ETH_PAYLOAD_NAME}\r\n'.encode())
+        index, match, output = yield Expect([TFTP_DONE_RE, NET_ERROR_RE], timeout=timeout)
+        self._log(output + '\n')
+        if index != 0:
+            yield from self._stop_net_command_steps()
+            self._log(">>> ERROR: TFTP transfer failed\n")
+            return False
+        received = int(match.group(1))
+        transfer = yield Blocking(lambda: server.wait_transfer(ETH_PAYLOAD_NAME, client_ip, since=since, timeout=2))
+
+        yield Flush()
+        yield Write(f'crc32 0x{TFTP_LOAD_ADDR:x} 0x{size:x}\r\n'.encode())
+        index, match, _ = yield Expect(CRC32_RE, timeout=5)
+        crc = int(match.group(1), 16) if index == 0 else None
+        return self.check_eth_transfer(server, received, crc, transfer, min_throughput)
+
+    def _stop_net_command_steps(self):
+        """Ctrl+C a dhcp/tftp that is still retrying and wait for the prompt, so the next test reads a quiet console."""
+        yield Write(b'\x03')
+        index, _, _ = yield Expect(UBOOT_PROMPT_RE, timeout=self.command_timeout)
+        if index != 0:
+            logger.warning(f"No U-Boot prompt within {self.command_timeout} s after stopping the network command")
+        yield Flush()
+
+    def check_eth_transfer(self, server, received, crc, transfer, min_throughput):
+        """Log and judge a qualification transfer: complete, CRC as served, fast enough."""
+        size = len(server.files[ETH_PAYLOAD_NAME])
+        size_ok = received == size
+        crc_ok = crc == server.crc32(ETH_PAYLOAD_NAME)
+        mbps = transfer.throughput / 1e6 if transfer and transfer.ok else 0.0
+        speed_ok = mbps >= min_throughput
+        self._log(f"[{'✔' if size_ok else '✘'}]{received} of {size} bytes received\n")
+        self._log(f"[{'✔' if crc_ok else '✘'}]CRC32 {'-' if crc is None else f'{crc:08x}'} "
+                  f"(expected {server.crc32(ETH_PAYLOAD_NAME):08x})\n")
+        self._log(f"[{'✔' if speed_ok else '✘'}]{mbps:.2f} MB/s (minimum {min_throughput:.2f} MB/s)\n")
+        if size_ok and crc_ok and speed_ok:
+            self._log(">>> Test Passed\n")
+            return True
+        self._log(">>> Test Failed\n")
+        return False
+
     # RTC Tester
     def check_time_difference_within_tolerance(self, text, time_elapsed):
         # Extract time strings using regular expression
@@ -118,251 +305,354 @@ class UBootTester:
         
         return output, success
     
-    def run_rtc_test_case(self, test_cmd, wait_time=2):
+    def _rtc_steps(self, test_cmd, wait_time=2):
         self._log("Reading time...\n")
-        self.ser.write((test_cmd + '\n').encode())
+        yield Flush()
+        yield Write((test_cmd + '\n').encode())
         for i in range(wait_time, 0, -1):
             self._log(f"Wait {i} seconds\n")
-            time.sleep(1)
+            yield Guard(1)
             
         self._log("Reading time again\n")
-        self.ser.write((test_cmd + '\n').encode())       
-        time.sleep(0.5)
-        # Reading the output
-        output = self.ser.read(self.ser.in_waiting)
-        output_decoded = output.decode(errors='ignore')
-        # self._log(output_decoded)
+        yield Write((test_cmd + '\n').encode())
+        # Both replies are buffered; return as soon as the second timestamp is in
+        output_decoded = ''
+        for _ in range(2):
+            index, _, text = yield Expect(r'Time:\s*\d+:\d+:\d+', timeout=2)
+            output_decoded += text
+            if index < 0:
+                break
 
-        output, success = self.check_time_difference_within_tolerance(output_decoded, wait_time)
+        with self._span("parse"):
+            output, success = self.check_time_difference_within_tolerance(output_decoded, wait_time)
 
         self._log("Final Output:\n")
         self._log(output)
 
         return success
 
+    def _rtc_drift_steps(self, test_cmd, tolerance=0.05, max_time=6.0, edge_margin=0.1):
+        """
+        Poll `test_cmd` (date) and estimate the RTC drift from the seconds roll-overs (see rtc_drift).
+        Passes as soon as the whole drift bound is within +/- `tolerance`, fails as soon as it is
+        entirely outside; after `max_time` seconds the point estimate decides.
+        Between edges the polling pauses until `edge_margin` seconds before the next one is due.
+        """
+        self._log("Measuring RTC drift...\n")
+        yield Flush()
+        estimator = DriftEstimator()
+        estimate = None
+        end_time = time.monotonic() + max_time
+        while time.monotonic() < end_time:
+            sent = time.monotonic()
+            yield Write((test_cmd + '\n').encode())
+            index, _, text = yield Expect(RTC_TIME_RE, timeout=2)
+            if index < 0:
+                self._log(f"No reply to '{test_cmd}'\n{text}\n")
+                return False
+            with self._span("parse"):
+                estimate = estimator.add(RTCSample(sent, self._rx_time, parse_rtc_time(text)))
+            if estimate and (estimate.within(tolerance) or estimate.outside(tolerance)):
+                break
+            if estimator.last_edge is not None:
+                pause = estimator.last_edge + 1 - edge_margin - time.monotonic()
+                if pause > 0:
+                    yield Guard(max(0, min(pause, end_time - time.monotonic())))
+        else:
+            logger.warning(f"RTC drift bound not within {tolerance:.0%} after {max_time} s")
+
+        if estimate is None:
+            self._log("Final Output:\nRTC drift could not be measured\n")
+            return False
+        success = abs(estimate.drift) <= tolerance and not estimate.outside(tolerance)
+        logger.info(f"RTC {estimate} from {estimator.samples} readings")
+        self._log("Final Output:\n")
+        self._log(f"RTC {estimate}\n")
+        return success
+
 #Xbee Tester    
-    def run_xbee_test_case(self, setup_cmds, wait_time=2):
+    def _xbee_steps(self, setup_cmds, wait_time=2):
         self._log("Sending setup command \n")
-        for cmd in setup_cmds[:5]:
-            print(f"  -> {cmd}")
-            self.send_command_quick(cmd)
+        yield from self._setup_steps(setup_cmds[:5])
 
-        time.sleep(1.2)   # Guard time
+        yield Guard(1.2)   # Guard time
         self._log("Sending setup command +++\n")
-        self.ser.write(('+++').encode())
-        time.sleep(1.2)   # Guard time
-        self.ser.write(('\n').encode())
+        yield Write(b'+++')
+        yield Guard(1.2)   # Guard time
+        yield Write(b'\n')
         for i in range(wait_time, 0, -1):
             self._log(f"Wait {i} seconds\n")
-            time.sleep(1)
+            yield Guard(1)
             
         self._log("Sending AT\n")
-        self.ser.write(('AT\r').encode())       
-        time.sleep(0.5)
+        yield Write(b'AT\r')
         # Reading the output
-        output = self.ser.read(self.ser.in_waiting)
-        output_decoded = output.decode(errors='ignore')
+        index, _, output_decoded = yield Expect(re.escape("=> OK"), timeout=1.0)
         # self._log(output_decoded)
 
         # self._log("Final Output:\n")
         # self._log(output_decoded)
-        time.sleep(0.5)
+        yield Guard(0.5)
         #self._log("Undoing Configurations \n")
-        for cmd in setup_cmds[5:]:
-            print(f"  -> {cmd}")
-            self.send_command_quick(cmd)
-        time.sleep(0.5)
+        yield from self._setup_steps(setup_cmds[5:])
+        yield Guard(0.5)
 
-        if "=> OK" in output_decoded:
+        if index == 0:
             return True
         else:
             return False
 
 
+    def _read_register_steps(self, address, count=1):
+        """Read a register `count` times with `md` (each read of a FIFO register pops it); returns the values."""
+        values = []
+        for start in range(0, count, 12):          # 12 reads fit on one console line
+            line = ";".join([f"md {address:#x} 1"] * min(12, count - start))
+            yield Write((line + '\r\n').encode())
+            index, _, _ = yield Expect(re.escape(line), timeout=self.command_timeout)
+            if index == 0:
+                index, _, output = yield Expect(UBOOT_PROMPT_RE, timeout=self.command_timeout)
+                values += parse_md_words(output, address)
+            if index != 0:
+                logger.warning(f"No U-Boot prompt after '{line}'")
+                break
+        return values
+
+    def _xbee_api_steps(self, setup_cmds, command='VR', timeout=1.0, resend=0.3):
+        """
+        Query the XBee with an API frame (AT `command`) written straight into UART2 and read its
+        framed reply from the RX FIFO (see xbee_api). Needs the module in API mode (AP=1).
+        Returns True/False for a valid OK/error response, None when no frame came back.
+        """
+        self._log("Sending setup command \n")
+        yield from self._setup_steps(setup_cmds)
+        decoder = FrameDecoder()
+        frame_id = 0
+        next_send = time.monotonic()
+        end_time = next_send + timeout
+        while time.monotonic() < end_time:
+            fifosts = yield from self._read_register_steps(UART2_FIFOSTS)
+            count = fifo_rx_count(fifosts[0]) if fifosts else 0
+            if count:
+                received = bytes(v & 0xFF for v in (yield from self._read_register_steps(UART2_DAT, count)))
+                with self._span("parse"):
+                    for data in decoder.feed(received):
+                        try:
+                            response = parse_at_response(data)
+                        except FrameError as e:
+                            self._log(f"✗ {e}\n")
+                            return False
+                        if response is None or response.command != command:
+                            continue        # modem status after the reset, or an earlier query
+                        self._log(f"AT{command} response: {response.status_text} {response.value.hex()}\n")
+                        return response.ok
+            if time.monotonic() >= next_send:
+                # The module may still be starting after its reset: ask again with a new frame id
+                frame_id += 1
+                frame = at_command_frame(command, frame_id)
+                self._log(f"Sending API frame AT{command}: {frame.hex(' ')}\n")
+                yield from self._setup_steps(uart_write_commands(frame))
+                next_send = time.monotonic() + resend
+        if decoder.errors:
+            self._log(f"✗ {decoder.errors} corrupted frame(s) from the XBee\n")
+            return False
+        self._log("No API frame from the XBee\n")
+        return None
+
 #Battery Tester    
-    def run_batt_test_case(self, setup_cmds, wait_time=2):
+    def _batt_steps(self, setup_cmds, wait_time=2):
         self._log("Sending setup command \n")
-        for cmd in setup_cmds:
-            print(f"  -> {cmd}")
-            self.send_command_quick(cmd)
+        yield from self._setup_steps(setup_cmds)
 
-        time.sleep(.2)   # Guard time
+        yield Guard(.2)   # Guard time
         self._log("Remove power, checking Power fail:\n")
-        self.ser.write(('\n').encode())
+        yield Write(b'\n')
+        power_fail = False
+        output_decoded = ''
         for i in range(wait_time, 0, -1):
-            self._log(f"Waiting for power removal (auto timeout in {i} seconds)\n")            
-            self.ser.write(('gpio input 45\n').encode()) # GPIO PB.13 (1x32 + 13)
-            output = self.ser.read(self.ser.in_waiting)
-            output_decoded = output.decode(errors='ignore')
-            if "value is 0" in output_decoded:
+            self._log(f"Waiting for power removal (auto timeout in {i} seconds)\n")
+            sample_end = time.monotonic() + 1
+            yield Write(b'gpio input 45\n')   # GPIO PB.13 (1x32 + 13)
+            # Check the reply to this sample, not the previous one
+            index, match, output_decoded = yield Expect(r'value is ([01])', timeout=1)
+            if index == 0 and match.group(1) == b'0':
                 self._log("Power fail detected\n")
+                power_fail = True
                 break
-            time.sleep(1)
-            
-        # Reading the output
-        # output = self.ser.read(self.ser.in_waiting)
-        # output_decoded = output.decode(errors='ignore')
+            yield Guard(max(0, sample_end - time.monotonic()))   # 1 s sampling period
 
         self._log("Final Output:\n")
         self._log(output_decoded)
-        time.sleep(0.5)
+        yield Guard(0.5)
 
-        if "value is 0" in output_decoded:
+        if power_fail:
             return True
         else:
             return False
         
+    def _gpio_exit_status_steps(self, gpio=POWER_FAIL_GPIO):
+        """
+        True if `gpio input` exits with the pin value on this U-Boot (what the device-side sampler needs).
+        Newer U-Boot versions always exit with 0; the pin must read high (power present) to tell.
+        """
+        yield Flush()
+        yield Write((f'gpio input {gpio};echo ~PF:$?' + '\r\n').encode())
+        index, _, output = yield Expect(r'[\r\n]~PF:(\d+)', timeout=self.command_timeout)
+        value = re.search(r'value is ([01])', output)
+        if index != 0 or not value:
+            return False
+        status = re.search(r'[\r\n]~PF:(\d+)', output).group(1)
+        return value.group(1) == "1" and status == "1"
+
+    def _batt_sampler_steps(self, setup_cmds, wait_time=10, interval=0.02):
+        """
+        Battery test with the sampling loop running in U-Boot (battery_sampler_line): PB.13 is read every
+        `interval` s and the host only waits for the marker, so a power fail is seen within tens of ms.
+        Records the time from the start of sampling to the power fail in self.power_fail_time.
+        Falls back to host-side sampling (run_batt_test_case) when `gpio input` cannot be used.
+        """
+        self._log("Sending setup command \n")
+        yield from self._setup_steps(setup_cmds)
+        if not (yield from self._gpio_exit_status_steps()):
+            logger.info("gpio input does not return the pin value, sampling from the host")
+            return (yield from self._batt_steps([], wait_time))
+
+        self._log("Remove power, checking Power fail:\n")
+        self._log(f"Waiting for power removal (auto timeout in {wait_time} seconds)\n")
+        line = battery_sampler_line(interval, wait_time)
+        yield Write((line + '\r\n').encode())
+        start = time.monotonic()
+        end_time = start + wait_time + self.command_timeout
+        output = ''
+        stopped = False
+        while True:
+            index, match, text = yield Expect(PF_MARKER_RE, timeout=max(0, end_time - time.monotonic()))
+            output += text
+            if index < 0 and not stopped:
+                # Sampling ran out of time: Ctrl+C ends the loop with ~PF:timeout
+                yield Write(b'\x03')
+                stopped = True
+                end_time = time.monotonic() + self.command_timeout
+                continue
+            if index < 0:
+                self._log("No answer from the power-fail sampler\n")
+                return False
+            if match.group(1) == b'start':
+                start = self._rx_time
+                continue
+            break
+
+        self._log("Final Output:\n")
+        self._log(re.sub(r'gpio: pin \d+ \(gpio \d+\) value is 1\s*', '', output))
+        if match.group(1) == b'timeout':
+            self._log("No power fail detected\n")
+            return False
+        self.power_fail_time = self._rx_time - start
+        samples = int(match.group(2), 16)
+        self._log(f"Power fail detected after {self.power_fail_time:.3f} s ({samples} samples)\n")
+        logger.info(f"Power fail after {self.power_fail_time:.3f} s, {samples} samples of {interval} s")
+        return True
+
 # SIM tester
-    def run_sim_test_case(self): #, setup_cmds, test_cmd, expect, shell_prompt, wait_time=10):
-        # 1) Issue the boot command
-        # self._log(f">>> Sending boot command\n")
-        # self.ser.write((test_cmd + '\r\n').encode())
-        # time.sleep(0.5)  # Guard time
-        
-        # # 2) Wait for OpenWRT to finish loading modules
-        # self._log(">>> Waiting for OpenWRT modules to finish loading...\n")
-        # if not self._wait_for_expected(expect, timeout=300):
-        #     self._log(">>> ERROR: Timed out waiting for kmodloader\n")
-        #     return False
-
-        # # 3) Get a shell prompt
-        # self._log(">>> Sending Enter to get shell prompt...\n")
-        # self.ser.write(b'\r\n')
-        # # Wait for shell prompt
-        # if not self._wait_for_expected(shell_prompt, timeout=120):
-        #     self._log(">>> ERROR: Timed out waiting for shell prompt\n")
-        #     return False
-
-        # 4) Set up ttyUSB2 and send AT commands
+    def _sim_steps(self):
         self._log(">>> Configuring /dev/ttyUSB2 and sending AT commands...\n")
-        # Set baud rate (adjust if necessary)
-        # self.ser.write(b'stty -F /dev/ttyUSB2 115200 cs8 -cstopb -parenb\r\n')
-        time.sleep(0.1)
-        
-        # Start background process to read from ttyUSB2
-        self.ser.write(b'cat /dev/ttyUSB2 &\r\n')
-        time.sleep(0.1)  # Allow time for background process to start
-
-        # Send AT commands
-        self.ser.write(b'echo -e "AT\\r" > /dev/ttyUSB2\r\n')
-        time.sleep(0.1)
-        self.ser.write(b'echo -e "AT+CCID\\r" > /dev/ttyUSB2\r\n')
-        time.sleep(0.1)
-
-        # 5) Capture output and check for responses
-        output = self._read_serial(timeout=10)
-        # self._log(f"Output received:\n{output}")   #Uncomment for debugging
-
-        # Check for the CCID pattern (e.g., "+CCID: 89919509129689902417")
-        ccid_pattern = r'\+CCID:\s*\d+'  # Matches "+CCID:" followed by optional whitespace and digits
-        match = re.search(ccid_pattern, output)
-
-        if match:
-            self._log(f">>> SIM card detected (CCID: {match.group()})\n")
+        modem = ModemClient()
+        yield from modem.open_steps()
+        try:
+            answered = yield from modem.sync_steps()
+            ccid = (yield from modem.ccid_steps()) if answered else None
+        finally:
+            yield from modem.close_steps()
+        if not answered:
+            self._log(">>> ERROR: Modem not responding on /dev/ttyUSB2\n")
+            return False
+
+        if ccid:
+            self._log(f">>> SIM card detected (CCID: {ccid})\n")
             return True
         else:
             self._log(">>> ERROR: SIM card not detected (no valid CCID found)\n")
             return False
 
-    def _wait_for_expected(self, expect_pattern, timeout=30):
-        """Wait for expected pattern in serial output."""
-        end_time = time.time() + timeout
-        while time.time() < end_time:
-            line = self.ser.readline().decode('utf-8', errors='ignore')
-            if line:
-                if self.debug:
-                    print(line.strip())
-                if expect_pattern in line:
-                    return True
-        return False
-
-    def _read_serial(self, timeout=10):
-        """Read all available serial data for a specified duration."""
-        output = []
-        end_time = time.time() + timeout
-        while time.time() < end_time:
-            if self.ser.in_waiting > 0:
-                data = self.ser.read(self.ser.in_waiting).decode(errors='ignore')
-                output.append(data)
-            time.sleep(0.1)
-        return ''.join(output)
-
 # WiFi Tester
-    def run_wifi_test_case(self, setup_cmds, test_cmd, expect, wait_time=10):
-        self._log("Sending setup commands:")
-        # for cmd in setup_cmds[:3]:
-        #     self._log(f"  -> {cmd}")
-        #     self.ser.write((cmd + '\r\n').encode())
-        #     time.sleep(1) # wait for command to execute
-        # time.sleep(5)  # wait for command to execute
-        output = ""
+    def _wlan0_steps(self, timeout=60):
+        """Poll until wlan0 exists; a missing interface is told by the returning prompt, not a timeout."""
         check_wlan_is_up = 'ifconfig -a | grep wlan0'
-        # turn_on_wlan0 = 'wifi'
-        # self.ser.write((turn_on_wlan0 + '\r\n').encode())
-        # time.sleep(3)  # wait for command to execute
-        self.ser.write((check_wlan_is_up + '\r\n').encode())
-        time.sleep(1)  # wait for command to execute
-        # if self.ser.in_waiting > 0:
-        #     output = self.ser.read(self.ser.in_waiting).decode(errors='ignore')
-        while "Link encap" not in output:
-            if self.ser.in_waiting > 0:
-                output = self.ser.read(self.ser.in_waiting).decode(errors='ignore')
+        end_time = time.monotonic() + timeout
+        while True:
+            yield Flush()
+            yield Write((check_wlan_is_up + '\r\n').encode())
+            index, _, _ = yield Expect([r'Link encap', SHELL_PROMPT_RE], timeout=2)
+            if index == 0:
+                return True
+            if time.monotonic() >= end_time:
+                return False
             self._log("Waiting for wlan0 status...\n")
-            self.ser.write((check_wlan_is_up + '\r\n').encode())
-            time.sleep(1)  # wait for command to execute
-            print(output)
-            time.sleep(1)  # wait for command to execute
-        
-        self.ser.write((setup_cmds[0] + '\r\n').encode())
-        self._log(f"  -> {setup_cmds[0]}")
-        for cmd in setup_cmds[1:]:
-            self._log(f"  -> {cmd}")
-            self.ser.write((cmd + '\r\n').encode())
-            time.sleep(10) # wait for command to execute
-            
-        # time.sleep(5)  # Guard time
-        self.ser.reset_input_buffer()   # flush prior bytes
+            yield Guard(0.5)
 
-        self._log(f"\nRunning test commands:")
-        for cmd in test_cmd[:2]:
-            self._log(f"  -> {cmd}")
-            self.ser.write((cmd + '\r\n').encode())
-            time.sleep(1)  # wait for command to execute
-        
-        time.sleep(3)  # wait for command to execute
-        
-        output = ""
-        if self.ser.in_waiting > 0:
-            output = self.ser.read(self.ser.in_waiting).decode(errors='ignore')
-        
-        # self._log(f"Output received:\n{output}\n\n")   #Uncomment for debugging
-        results = self.check_wifi_status(output)
+    def _wifi_events_steps(self, seen='', timeout=120):
+        """
+        Follow the events streamed by WIFI_EVENT_CMDS until wlan0 is associated and wwan is up.
+        `seen` is console output already read (events that came in early).
+        Returns False on timeout or when a listener is not available on the DUT.
+        """
+        pending = {0: "associated", 1: "got an address"}
+        for index, pattern in enumerate((WIFI_ASSOC_RE, WIFI_IFUP_RE)):
+            if re.search(pattern, seen):
+                self._log(f"✓ wlan0 {pending.pop(index)}\n")
+        end_time = time.monotonic() + timeout
+        while pending:
+            index, match, _ = yield Expect([WIFI_ASSOC_RE, WIFI_IFUP_RE, SHELL_NOT_FOUND_RE],
+                                           timeout=max(0, end_time - time.monotonic()), progress=True)
+            if index < 0:
+                self._log(f"\nNo WiFi events within {timeout} s\n")
+                return False
+            if index == 2:
+                logger.warning(f"WiFi events not available ({match.group(0).decode(errors='ignore')})")
+                return False
+            if index in pending:
+                self._log(f"\n✓ wlan0 {pending.pop(index)}\n")
+        return True
+
+    def _wifi_steps(self, setup_cmds, test_cmd, expect, wait_time=10, timeout=120):
+        start_time = time.monotonic()
+        if not (yield from self._wlan0_steps()):
+            self._log("wlan0 did not show up\n")
+            return False
 
-        start_time = int(round(time.time() * 1000))
-        current_time = 0
-        while not results:
-            self._log("\n\nRe-running WiFi status check...\n")
-            self.ser.write((test_cmd[0] + '\r\n').encode())
-            time.sleep(1)  # wait for command to execute
-            self.ser.write((test_cmd[1] + '\r\n').encode())
-            time.sleep(3)  # wait for command to execute
-            
-            output = ""
-            if self.ser.in_waiting > 0:
-                output = self.ser.read(self.ser.in_waiting).decode(errors='ignore')
-            
-            results = self.check_wifi_status(output)
-            current_time = (int(round(time.time() * 1000)) - start_time) / 1000
-            if current_time >= 120:
+        # Subscribe to the events first, so nothing is missed while the radio is reconfigured
+        self._log("Sending setup commands:")
+        output = ''
+        for cmd in WIFI_EVENT_CMDS + setup_cmds:
+            self._log(f"  -> {cmd}")
+            yield Write((cmd + '\r\n').encode())
+            _, _, text = yield Expect(SHELL_PROMPT_RE, timeout=5)
+            output += text
+
+        self._log("\nWaiting for association and DHCP...\n")
+        yield from self._wifi_events_steps(output, timeout=max(0, timeout - (time.monotonic() - start_time)))
+        yield Write((WIFI_EVENT_STOP_CMD + '\r\n').encode())
+        yield Expect(SHELL_PROMPT_RE, timeout=2)
+        yield Flush()   # flush prior bytes
+
+        # One status check confirms the link and its traffic; poll only if the events did not come
+        self._log("\nRunning test commands:")
+        while True:
+            poll_end = time.monotonic() + 4     # re-check the link every 4 s
+            for cmd in test_cmd[:2]:
+                self._log(f"  -> {cmd}")
+                yield Write((cmd + '\r\n').encode())
+            # ifconfig prints the byte counters last; stop reading once they are in
+            _, _, output = yield Expect(r'TX bytes:\d+', timeout=4)
+            with self._span("parse"):
+                results = self.check_wifi_status(output)
+            if results:
+                return results
+            if time.monotonic() - start_time >= timeout:
                 self._log("WiFi test timed out\n")
-                break
-
-        # for cmd in test_cmd[2:]:
-        #     self._log(f"  -> {cmd}")
-        #     self.ser.write((cmd + '\r\n').encode())
-        #     time.sleep(.5)  # wait for command to execute
-
-        return results
+                return results
+            self._log("\n\nRe-running WiFi status check...\n")
+            yield Guard(max(0, poll_end - time.monotonic()))
 
     def check_wifi_status(self, output):
         """
@@ -433,48 +723,231 @@ class UBootTester:
             return False
 
 # USB Tester
-    def run_usb_test_case(self, setup_cmds, expect):
-        self.ser.reset_input_buffer()   # flush prior bytes
-        # 1) Issue the boot command
-        self._log(f">>> Sending lsusb command\n")
-        self.ser.write((setup_cmds + '\r\n').encode())
-        found, prompt = self._wait_for_expected("Bus", timeout=5)
-        if not found:
-            self._log(">>> ERROR: lsusb prompt not seen\n")
-            return False
-        
-        time.sleep(0.2)  # small guard time
-        # 2) Read the output
-        output =  "".join(prompt) + self.ser.read(self.ser.in_waiting).decode(errors='ignore')      
-        #self._log(f"Output received:\n{output}\n\n")   #Uncomment for debugging
+    def _usb_steps(self, setup_cmds, expect, timeout=20):
+        """Re-run lsusb (short backoff) until every expected device is listed or `timeout` passes."""
+        start_time = time.monotonic()
+        delay = USB_POLL_MIN
+        while True:
+            yield Flush()   # flush prior bytes
+            self._log(">>> Sending lsusb command\n")
+            yield Write((setup_cmds + '\r\n').encode())
+            index, _, output = yield Expect(r'Bus \d+ Device', timeout=5)   # not "BusyBox"
+            if index < 0:
+                self._log(">>> ERROR: lsusb prompt not seen\n")
+                return False
+            # Read the rest of the listing, up to the next shell prompt
+            _, _, rest = yield Expect(SHELL_PROMPT_RE, timeout=0.5)
+            output += rest
+
+            with self._span("parse"):
+                found, missing = match_devices(parse_lsusb(output), expect)
+            remaining = timeout - (time.monotonic() - start_time)
+            if not missing or remaining <= 0:
+                break
+            self._log(f">>> Not enumerated yet: {', '.join(missing)}\n")
+            yield Guard(min(delay, remaining))
+            delay = min(delay * 2, USB_POLL_MAX)
 
-        flag = True
         for s in expect:
-            m = re.search(s, output)
-            if m: 
-                found = m.group(0)               # <-- the actual substring matched in output
-                self._log(f"[✔]{found}\n")
+            if s in found:
+                self._log(f"[✔]{found[s]}\n")
             else:
-                flag = False
                 self._log(f"[✘]{s}\n")
-                
-        if flag:
+        if not missing:
             self._log(">>> Test Passed\n")
             return True
         else:
             self._log(">>> Test Failed\n")
             return False
-        
-    def _wait_for_expected(self, expect_pattern, timeout=30):
-        """Return (found, all_lines)."""
-        end_time = time.time() + timeout
-        lines = []
-        while time.time() < end_time:
-            raw = self.ser.readline().decode('utf-8', errors='ignore')
-            if raw:
-                if self.debug:
-                    print(raw.strip())
-                lines.append(raw)
-                if expect_pattern in raw:
-                    return True, lines
-        return False, lines
\ No newline at end of file
+
+
+class UBootTester(ConsoleTestCases):
+    def __init__(self, port='/dev/ttyUSB0', baudrate=115200, timeout=0.1, debug=False, log_callback=None,
+                 paced=True, command_timeout=2.0, coalesce=True, session=None):
+        self.port = port
+        self.baudrate = baudrate
+        self.timeout = timeout
+        self.ser = None
+        self.session = session        # ConsoleSession lent by the app, owns the port
+        self.reader = None
+        self._cursor = None
+        self._expect = None
+        self.debug = debug
+        self.log_callback = log_callback
+        # Prompt pacing: send the next command as soon as "=>" is back (falls back to fixed waits)
+        self.paced = paced
+        self.command_timeout = command_timeout
+        # Pack setup sequences into ';'-separated lines (needs prompt pacing)
+        self.coalesce = coalesce
+        self._in_span = False
+        self._rx_time = 0.0           # host timestamp of the last chunk read from the console
+        self.power_fail_time = None   # battery sampler: seconds from the start of sampling to power fail
+        self._abort = threading.Event()
+
+    def _guard(self, seconds):
+        """Fixed wait (guard time, sampling period) that shows up as its own phase."""
+        with self._span("guard"):
+            if self._abort.wait(seconds):
+                raise TestAborted()
+
+    def abort(self):
+        """Stop the running test from another thread: its next console read or guard raises TestAborted."""
+        self._abort.set()
+
+    @property
+    def aborted(self):
+        return self._abort.is_set()
+
+    def connect(self):
+        # The port is shared with the GUI through one reader thread; we only get a cursor
+        with self._span("connect"):
+            if self.session:
+                self.session.borrow(type(self).__name__)
+                self.reader = self.session.reader
+            else:
+                self.reader = acquire_port_reader(self.port, self.baudrate, self.timeout)
+            self.ser = self.reader.serial
+            self._cursor = self.reader.cursor()
+            self._expect = SerialExpect(self._read_chunk, on_data=self._debug_print)
+
+    def _read_chunk(self):
+        # Returns as soon as anything arrives; blocks for at most self.timeout otherwise
+        if self._abort.is_set():
+            raise TestAborted()
+        chunks = self._cursor.read_chunks(timeout=self.timeout)
+        if chunks:
+            self._rx_time = chunks[-1][0]
+        return b"".join(data for _, data in chunks)
+
+    def _flush_input(self):
+        """Forget everything received so far (replaces ser.reset_input_buffer)."""
+        self._cursor.skip_to_end()
+        self._expect.flush()
+
+    def disconnect(self):
+        with self._span("disconnect"):
+            if self.session:
+                if self.reader:
+                    self.session.give_back()
+            elif self.reader:
+                release_port_reader(self.reader)
+            self.reader = None
+            self.ser = None
+        metrics.write_prometheus()
+
+    def _debug_print(self, msg):
+        if self.debug:
+            logger.debug(f"{self.port} << {msg!r}")
+
+    def _log_progress(self, _text):
+        self._log(".")
+
+    def wait_for(self, patterns, timeout=10, progress=False):
+        """
+        Wait for any of `patterns` (regex str/bytes or compiled) on the console.
+        Returns (index, match, text); index is -1 on timeout.
+        """
+        if not self.ser or not self.ser.is_open:
+            raise Exception("Serial port not open")
+        on_chunk = self._log_progress if progress else None
+        with self._span("expect"):
+            return self._expect.expect(patterns, timeout=timeout, on_chunk=on_chunk)
+
+    def report_dhcp_lease(self, server, mac, since):
+        """Log and record the lease latency of the unit `mac` as seen by the embedded DHCP responder."""
+        lease = server.wait_lease(mac, since=since, timeout=0.5)
+        if lease is None:
+            self._log(f">>> No lease from the station's DHCP responder for {mac}\n")
+            return None
+        metrics.record("dhcp_lease", test=type(self).__name__, port=self.port, seconds=lease.latency)
+        self._log(f">>> DHCP lease {lease.ip} in {lease.latency * 1000:.1f} ms\n")
+        return lease
+
+    def _drive(self, steps):
+        """Carry out the console operations of a shared test case with blocking I/O; returns its result."""
+        send, value = steps.send, None
+        while True:
+            try:
+                op = send(value)
+            except StopIteration as done:
+                return done.value
+            try:
+                value, send = self._do(op), steps.send
+            except BaseException as e:          # raised where the case yielded (TestAborted too)
+                value, send = e, steps.throw
+
+    def _do(self, op):
+        if isinstance(op, Expect):
+            return self.wait_for(op.patterns, timeout=op.timeout, progress=op.progress)
+        if isinstance(op, Write):
+            if not self.ser or not self.ser.is_open:
+                raise Exception("Serial port not open")
+            return self.ser.write(op.data)
+        if isinstance(op, Flush):
+            return self._flush_input()
+        if isinstance(op, Guard):
+            return self._guard(op.seconds)
+        if isinstance(op, Blocking):
+            return op.fn()
+        raise TypeError(f"Unknown console operation {op!r}")
+
+    # Commands and test cases, see ConsoleTestCases
+    def send_command_quick(self, command):
+        return self._drive(self._quick_command_steps(command))
+
+    def send_command_paced(self, command, timeout=None):
+        return self._drive(self._paced_command_steps(command, timeout))
+
+    def send_command_batch(self, setup_cmds):
+        return self._drive(self._batch_steps(setup_cmds))
+
+    def send_setup_commands(self, setup_cmds):
+        return self._drive(self._setup_steps(setup_cmds))
+
+    def send_and_wait_for_output(self, command, expect, timeout=10):
+        return self._drive(self._send_and_wait_steps(command, expect, timeout))
+
+    def run_test_case(self, setup_cmds, test_cmd, expect, wait_time=10):
+        return self._drive(self._test_case_steps(setup_cmds, test_cmd, expect, wait_time))
+
+    def run_eth_qualification_test_case(self, setup_cmds, min_throughput, tftp_port=TFTP_PORT, timeout=20):
+        return self._drive(self._eth_qualification_steps(setup_cmds, min_throughput, tftp_port, timeout))
+
+    def run_rtc_test_case(self, test_cmd, wait_time=2):
+        return self._drive(self._rtc_steps(test_cmd, wait_time))
+
+    def run_rtc_drift_test_case(self, test_cmd, tolerance=0.05, max_time=6.0, edge_margin=0.1):
+        return self._drive(self._rtc_drift_steps(test_cmd, tolerance, max_time, edge_margin))
+
+    def run_xbee_test_case(self, setup_cmds, wait_time=2):
+        return self._drive(self._xbee_steps(setup_cmds, wait_time))
+
+    def read_register(self, address, count=1):
+        return self._drive(self._read_register_steps(address, count))
+
+    def run_xbee_api_test_case(self, setup_cmds, command='VR', timeout=1.0, resend=0.3):
+        return self._drive(self._xbee_api_steps(setup_cmds, command, timeout, resend))
+
+    def run_batt_test_case(self, setup_cmds, wait_time=2):
+        return self._drive(self._batt_steps(setup_cmds, wait_time))
+
+    def gpio_exit_status_usable(self, gpio=POWER_FAIL_GPIO):
+        return self._drive(self._gpio_exit_status_steps(gpio))
+
+    def run_batt_sampler_test_case(self, setup_cmds, wait_time=10, interval=0.02):
+        return self._drive(self._batt_sampler_steps(setup_cmds, wait_time, interval))
+
+    def run_sim_test_case(self):
+        return self._drive(self._sim_steps())
+
+    def wait_for_wlan0(self, timeout=60):
+        return self._drive(self._wlan0_steps(timeout))
+
+    def wait_for_wifi_events(self, seen='', timeout=120):
+        return self._drive(self._wifi_events_steps(seen, timeout))
+
+    def run_wifi_test_case(self, setup_cmds, test_cmd, expect, wait_time=10, timeout=120):
+        return self._drive(self._wifi_steps(setup_cmds, test_cmd, expect, wait_time, timeout))
+
+    def run_usb_test_case(self, setup_cmds, expect, timeout=20):
+        return self._drive(self._usb_steps(setup_cmds, expect, timeout))
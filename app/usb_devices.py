@@ -0,0 +1,68 @@
+# usb_devices.py
+"""
+USB device listing of the DUT (OpenWRT `lsusb`) as structured records.
+
+- `lsusb` lines become USBDevice(bus, device, vid, pid, description); root
+  hubs and anything that is not a device line (shell echo, prompts) drop out.
+- Expected devices are regexes searched in "vid:pid description", so a test
+  can name a device by its ID ("1e0e:9001"), its product string ("SimTech")
+  or both. Each device satisfies at most one expectation.
+- A device that is still enumerating is simply missing from one listing:
+  callers re-poll until match_devices() reports nothing missing.
+
+Usage:
+    devices = parse_lsusb(output)
+    found, missing = match_devices(devices, [r"1e0e:9001|SimTech", r"Raspberry Pi"])
+"""
+
+from typing import Dict, List, NamedTuple, Sequence, Tuple
+import re
+
+__all__ = ["LSUSB_LINE_RE", "USBDevice", "parse_lsusb", "match_devices"]
+
+# "Bus 001 Device 002: ID 1e0e:9001 SimTech, Incorp."
+LSUSB_LINE_RE = re.compile(
+    r'Bus (\d{3}) Device (\d{3}): ID ([0-9a-fA-F]{4}):([0-9a-fA-F]{4})[ \t]*([^\r\n]*)')
+ROOT_HUB_VID = "1d6b"          # Linux Foundation
+
+
+class USBDevice(NamedTuple):
+    bus: int
+    device: int
+    vid: str
+    pid: str
+    description: str
+
+    @property
+    def id(self) -> str:
+        return f"{self.vid}:{self.pid}"
+
+    def __str__(self):
+        return f"{self.id} {self.description}".rstrip()
+
+
+def parse_lsusb(text: str) -> List[USBDevice]:
+    """Devices listed in `lsusb` output, without the root hubs."""
+    devices = []
+    for bus, device, vid, pid, description in LSUSB_LINE_RE.findall(text):
+        if vid.lower() == ROOT_HUB_VID:
+            continue
+        devices.append(USBDevice(int(bus), int(device), vid.lower(), pid.lower(), description.strip()))
+    return devices
+
+
+def match_devices(devices: Sequence[USBDevice], expect: Sequence[str]
+                  ) -> Tuple[Dict[str, USBDevice], List[str]]:
+    """({pattern: device} for the expectations found, [patterns still missing])."""
+    found: Dict[str, USBDevice] = {}
+    missing = []
+    used = set()
+    for pattern in expect:
+        for device in devices:
+            if device not in used and re.search(pattern, str(device)):
+                found[pattern] = device
+                used.add(device)
+                break
+        else:
+            missing.append(pattern)
+    return found, missing
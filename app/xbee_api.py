@@ -0,0 +1,155 @@
+# xbee_api.py
+"""
+XBee API frames (API mode, AP=1) and UART2 access through U-Boot.
+
+- Builds AT command frames (type 0x08) and decodes AT command responses
+  (type 0x88). Every frame is checked against its length and checksum, so a
+  reply is either a valid response or rejected; no substring matching.
+- The frames do not go through U-Boot's console (its line editor drops NUL
+  bytes and control characters). They are written straight into the data
+  register of UART2, where the XBee sits, with `mw`; the reply is read back
+  from the receive FIFO with `md`. No "+++" guard times are involved.
+
+Frame layout: 0x7E, length (2 bytes, big endian), frame data, checksum
+(0xFF minus the low byte of the sum of the frame data).
+
+Usage:
+    for cmd in uart_write_commands(at_command_frame("VR", frame_id=1)):
+        ...send cmd...
+    decoder = FrameDecoder()
+    for data in decoder.feed(bytes_read_from_fifo):
+        response = parse_at_response(data)
+"""
+
+from typing import List, NamedTuple, Optional
+import re
+
+__all__ = [
+    "START_DELIMITER",
+    "FrameError",
+    "ATResponse",
+    "checksum",
+    "build_frame",
+    "at_command_frame",
+    "FrameDecoder",
+    "parse_at_response",
+    "UART2_DAT",
+    "UART2_FIFOSTS",
+    "uart_write_commands",
+    "fifo_rx_count",
+    "parse_md_words",
+]
+
+START_DELIMITER = 0x7E
+AT_COMMAND = 0x08
+AT_RESPONSE = 0x88
+MAX_FRAME_DATA = 0x200         # longer "frames" are a 0x7E inside other data
+AT_STATUS = {0: "OK", 1: "ERROR", 2: "invalid command", 3: "invalid parameter", 4: "transmission failure"}
+
+# NUC980 UART2 (the XBee): data register (write = transmit, read = pop the RX FIFO) and FIFO status
+UART2_DAT = 0xb0072000
+UART2_FIFOSTS = 0xb0072018
+FIFOSTS_RXEMPTY = 1 << 14
+FIFOSTS_RXPTR_SHIFT = 8
+FIFOSTS_RXPTR_MASK = 0x3f
+
+MD_WORD_RE = re.compile(r'([0-9a-fA-F]{8}): ([0-9a-fA-F]{8})')
+
+
+class FrameError(ValueError):
+    pass
+
+
+class ATResponse(NamedTuple):
+    frame_id: int
+    command: str
+    status: int
+    value: bytes
+
+    @property
+    def ok(self) -> bool:
+        return self.status == 0
+
+    @property
+    def status_text(self) -> str:
+        return AT_STATUS.get(self.status, f"status {self.status}")
+
+
+def checksum(data: bytes) -> int:
+    return 0xFF - (sum(data) & 0xFF)
+
+
+def build_frame(data: bytes) -> bytes:
+    """Wrap frame data (frame type first) into an API frame."""
+    return bytes([START_DELIMITER]) + len(data).to_bytes(2, "big") + data + bytes([checksum(data)])
+
+
+def at_command_frame(command: str, frame_id: int = 1, parameter: bytes = b"") -> bytes:
+    """AT command frame, e.g. at_command_frame("VR") queries the firmware version."""
+    if len(command) != 2:
+        raise ValueError(f"AT command must be two characters: {command!r}")
+    if not 1 <= frame_id <= 0xFF:
+        raise ValueError("frame_id must be 1..255 (0 means no response)")
+    return build_frame(bytes([AT_COMMAND, frame_id]) + command.encode("ascii") + parameter)
+
+
+class FrameDecoder:
+    """Splits a byte stream into the data of valid API frames; bytes outside frames are skipped."""
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.errors = 0             # frames dropped for a bad checksum
+
+    def feed(self, data: bytes) -> List[bytes]:
+        self.buffer += data
+        frames = []
+        while True:
+            start = self.buffer.find(START_DELIMITER)
+            if start < 0:
+                self.buffer.clear()
+                break
+            del self.buffer[:start]
+            if len(self.buffer) < 3:
+                break
+            length = int.from_bytes(self.buffer[1:3], "big")
+            if not 0 < length <= MAX_FRAME_DATA:
+                del self.buffer[:1]
+                continue
+            if len(self.buffer) < length + 4:
+                break
+            data, check = bytes(self.buffer[3:3 + length]), self.buffer[3 + length]
+            if checksum(data) == check:
+                frames.append(data)
+                del self.buffer[:length + 4]
+            else:
+                # Not a frame after all (or a corrupted one): resync on the next delimiter
+                self.errors += 1
+                del self.buffer[:1]
+        return frames
+
+
+def parse_at_response(data: bytes) -> Optional[ATResponse]:
+    """AT command response in the data of a frame; None for other frame types (e.g. modem status)."""
+    if data[0] != AT_RESPONSE:
+        return None
+    if len(data) < 5:
+        raise FrameError(f"AT response too short: {data.hex(' ')}")
+    return ATResponse(data[1], data[2:4].decode("ascii", errors="replace"), data[4], bytes(data[5:]))
+
+
+# ------- UART2 through U-Boot -------
+def uart_write_commands(frame: bytes) -> List[str]:
+    """U-Boot commands transmitting `frame` on UART2 (fits its 16-byte TX FIFO)."""
+    return [f"mw {UART2_DAT:#x} {byte:#04x}" for byte in frame]
+
+
+def fifo_rx_count(fifosts: int) -> int:
+    """Bytes waiting in the RX FIFO according to the FIFO status register."""
+    if fifosts & FIFOSTS_RXEMPTY:
+        return 0
+    return max(1, (fifosts >> FIFOSTS_RXPTR_SHIFT) & FIFOSTS_RXPTR_MASK)
+
+
+def parse_md_words(text: str, address: int) -> List[int]:
+    """Values `md` printed for `address`, in order."""
+    return [int(value, 16) for addr, value in MD_WORD_RE.findall(text) if int(addr, 16) == address]
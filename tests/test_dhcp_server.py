@@ -0,0 +1,65 @@
+"""Embedded DHCP responder against its own client (request_lease) on loopback."""
+
+import socket
+import time
+
+import pytest
+
+from dhcp_server import DhcpServer, request_lease
+
+MAC = "02:00:00:00:00:01"
+
+
+@pytest.fixture
+def server():
+    server = DhcpServer("127.0.0.1", "127.0.0.100", pool_size=2, host="127.0.0.1", port=0)
+    server.start()
+    yield server
+    server.stop()
+
+
+def lease(server, mac=MAC):
+    result = request_lease(mac, server=("127.0.0.1", server.port), bind=("127.0.0.1", 0), timeout=2.0)
+    assert result is not None, f"no lease for {mac}"
+    return result
+
+
+def test_offered_address_is_acked_and_timed(server):
+    since = time.monotonic()
+    ip, seconds = lease(server)
+    assert ip == "127.0.0.100"
+
+    acked = server.wait_lease(MAC, since=since, timeout=1.0)
+    assert acked is not None
+    assert (acked.mac, acked.ip) == (MAC, ip)
+    assert since <= acked.discovered <= acked.acked <= time.monotonic()
+    # DISCOVER to ACK on the server is part of the client's round trips, and fast on loopback
+    assert 0 <= acked.latency <= seconds < 0.5
+
+
+def test_unit_keeps_its_address(server):
+    first, _ = lease(server)
+    other, _ = lease(server, "02:00:00:00:00:02")
+    assert other != first
+    assert lease(server)[0] == first
+
+
+def test_full_pool_reuses_the_oldest_lease(server):
+    first, _ = lease(server)
+    lease(server, "02:00:00:00:00:02")
+    since = time.monotonic()
+    assert lease(server, "02:00:00:00:00:03")[0] == first
+    assert server.wait_lease(MAC, timeout=0) is None
+    # The lease is recorded once the ACK is sent, which may be just after the client got it
+    assert server.wait_lease("02:00:00:00:00:03", since=since, timeout=1.0).ip == first
+
+
+def test_silent_server_gives_up_after_timeout():
+    silent = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    silent.bind(("127.0.0.1", 0))
+    try:
+        start = time.monotonic()
+        assert request_lease(MAC, server=silent.getsockname(), bind=("127.0.0.1", 0), timeout=0.3) is None
+        assert time.monotonic() - start < 1.0
+    finally:
+        silent.close()
@@ -0,0 +1,124 @@
+"""ExpectBuffer rescans and SerialExpect matching across chunk boundaries."""
+
+import re
+
+import pytest
+
+from serial_expect import ExpectBuffer, SerialExpect, compile_patterns, spans_lines
+
+
+def chunks(data: bytes, size: int):
+    """read_fn returning `data` `size` bytes at a time, then nothing."""
+    parts = [data[i:i + size] for i in range(0, len(data), size)]
+    return lambda: parts.pop(0) if parts else b""
+
+
+@pytest.mark.parametrize("pattern, multi_line", [
+    (r"=> ", False),
+    (r"DHCP client bound to address (\d+\.\d+\.\d+\.\d+)[^\r\n]*\r?\n", False),
+    (r"[\r\n]~0:(\d+)", False),
+    (r"~AGENT:BEGIN\r?\n", False),
+    (r"begin\r\n.*?end", True),
+    (r"(?s)begin.*end", True),
+    (r"a\nb", True),
+])
+def test_spans_lines(pattern, multi_line):
+    assert spans_lines(compile_patterns(pattern)[0]) is multi_line
+
+
+@pytest.mark.parametrize("size", [1, 2, 3, 7, 64])
+def test_match_straddles_chunks(size):
+    text = b"U-Boot 2024.01\r\nHit any key to stop autoboot:  1 \r\nDHCP client bound to address 10.0.0.7 (12 ms)\r\n=> "
+    exp = SerialExpect(chunks(text, size))
+    index, match, received = exp.expect([r"Unknown command", r"bound to address (\S+)[^\r\n]*\r?\n"], timeout=1)
+    assert index == 1
+    assert match.group(1) == b"10.0.0.7"
+    assert received.endswith("10.0.0.7 (12 ms)\r\n")
+    index, _, received = exp.expect(r"=> ", timeout=1)
+    assert index == 0
+    assert received == "=> "
+
+
+def test_open_ended_pattern_matches_on_a_partial_line():
+    # Why result patterns are anchored on the line end: \S+ stops at the end of the chunk
+    exp = SerialExpect(chunks(b"bound to address 10.0.0.7\r\n", 21))
+    _, match, _ = exp.expect(r"bound to address (\S+)", timeout=1)
+    assert match.group(1) == b"10.0"
+
+
+def test_long_line_fed_byte_by_byte():
+    # A single-line match longer than any fixed overlap window
+    line = b"~R:" + b"x" * 400 + b":END\r\n"
+    exp = SerialExpect(chunks(b"noise\r\n" + line, 1))
+    index, match, _ = exp.expect(r"~R:(x+):END\r?\n", timeout=1)
+    assert index == 0
+    assert len(match.group(1)) == 400
+
+
+def test_multi_line_pattern_searches_whole_buffer():
+    exp = SerialExpect(chunks(b"begin\r\nline 1\r\nline 2\r\nend\r\n", 4))
+    index, match, _ = exp.expect(re.compile(rb"begin\r\n(.*?)end", re.DOTALL), timeout=1)
+    assert index == 0
+    assert match.group(1) == b"line 1\r\nline 2\r\n"
+
+
+def test_earliest_match_wins():
+    buf = ExpectBuffer()
+    buf.feed(b"first Error then =>")
+    index, match = buf.search(compile_patterns([r"=>", r"Error"]))
+    assert (index, match.group(0)) == (1, b"Error")
+
+
+def test_rescan_starts_at_the_incomplete_line():
+    buf = ExpectBuffer()
+    patterns = compile_patterns(r"[\r\n]done\r?\n")
+    buf.feed(b"line one\r\n")
+    assert buf.search(patterns) is None
+    buf.feed(b"do")
+    assert buf.search(patterns) is None
+    # The anchor is the line break before the part already scanned
+    buf.feed(b"ne\r\n")
+    index, match = buf.search(patterns)
+    assert index == 0
+    assert match.start() == len(b"line one\r")
+
+
+def test_unmatched_data_stays_after_consume():
+    buf = ExpectBuffer()
+    buf.feed(b"=> tail")
+    _, match = buf.search(compile_patterns(r"=> "))
+    assert buf.consume(match.end()) == b"=> "
+    assert bytes(buf.buffer) == b"tail"
+
+
+def test_max_size_drops_oldest_bytes():
+    buf = ExpectBuffer(max_size=8)
+    buf.feed(b"0123456789")
+    assert bytes(buf.buffer) == b"23456789"
+    assert buf.search(compile_patterns(r"89")) is not None
+
+
+def test_timeout_returns_everything_received():
+    exp = SerialExpect(chunks(b"no prompt here", 5))
+    index, match, received = exp.expect(r"=> ", timeout=0.05)
+    assert (index, match) == (-1, None)
+    assert received == "no prompt here"
+
+
+def test_utf8_split_across_chunks():
+    seen = []
+    exp = SerialExpect(chunks("[✔]WiFi\r\n".encode(), 2), on_data=seen.append)
+    index, _, received = exp.expect(r"WiFi\r\n", timeout=1)
+    assert index == 0
+    assert received == "[✔]WiFi\r\n"
+    assert "".join(seen) == "[✔]WiFi\r\n"
+
+
+def test_poll_keeps_unmatched_data():
+    parts = [b"Hit any key", b""]
+    exp = SerialExpect(lambda: parts.pop(0) if parts else b"")
+    assert exp.poll(r"=> ")[0] == -1
+    parts[:] = [b" to stop\r\n=> ", b""]
+    index, _, received = exp.poll(r"=> ")
+    assert index == 0
+    assert received == "Hit any key to stop\r\n=> "
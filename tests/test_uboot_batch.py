@@ -0,0 +1,89 @@
+"""Coalescing U-Boot setup commands into ';'-separated lines and splitting their output back."""
+
+import re
+
+from uboot_batch import UBOOT_CBSIZE, build_line, coalesce_commands, marker_pattern, parse_batch_output
+
+
+def test_short_sequence_fits_one_line():
+    cmds = ["setenv ipaddr 10.0.0.2", "setenv serverip 10.0.0.1", "saveenv"]
+    batches = coalesce_commands(cmds)
+    assert batches == [[(0, cmds[0]), (1, cmds[1]), (2, cmds[2])]]
+    assert build_line(batches[0]) == ("setenv ipaddr 10.0.0.2;echo ~0:$?;"
+                                      "setenv serverip 10.0.0.1;echo ~1:$?;saveenv;echo ~2:$?")
+
+
+def test_lines_stay_within_the_command_buffer():
+    cmds = [f"setenv var{i} {'x' * 30}" for i in range(40)]
+    batches = coalesce_commands(cmds)
+    assert len(batches) > 1
+    for batch in batches:
+        # CONFIG_SYS_CBSIZE includes the line terminator
+        assert len(build_line(batch)) <= UBOOT_CBSIZE - 2
+    # Order and indexes are kept across batches
+    assert [i for batch in batches for i, _ in batch] == list(range(len(cmds)))
+    assert [c for batch in batches for _, c in batch] == cmds
+
+
+def test_line_of_exactly_max_len_is_not_split():
+    first = "setenv a 1"                                  # "setenv a 1;echo ~0:$?" = 21
+    second = "setenv b " + "y" * (254 - 21 - 1 - len("setenv b ;echo ~1:$?"))
+    batches = coalesce_commands([first, second])
+    assert len(batches) == 1
+    assert len(build_line(batches[0])) == 254
+    # One byte more and the second command goes on its own line
+    assert len(coalesce_commands([first, second + "y"])) == 2
+
+
+def test_overlong_command_gets_a_line_of_its_own():
+    long_cmd = "setenv bootargs " + "z" * 300
+    batches = coalesce_commands(["setenv a 1", long_cmd, "saveenv"])
+    assert batches == [[(0, "setenv a 1")], [(1, long_cmd)], [(2, "saveenv")]]
+
+
+def test_custom_max_len():
+    batches = coalesce_commands(["a", "b", "c", "d"], max_len=len("a;echo ~0:$?;b;echo ~1:$?"))
+    assert [[i for i, _ in batch] for batch in batches] == [[0, 1], [2, 3]]
+
+
+def test_marker_pattern_skips_the_echoed_line():
+    batch = [(4, "saveenv"), (5, "setenv x 1")]
+    pattern = re.compile(marker_pattern(batch))
+    assert not pattern.search("=> " + build_line(batch) + "\r\n")
+    assert pattern.search("~4:0\r\n~5:0\r\n")
+
+
+def test_parse_output_per_command():
+    batch = [(0, "setenv ipaddr 10.0.0.2"), (1, "saveenv"), (2, "ping 10.0.0.1")]
+    text = (build_line(batch) + "\r\n"
+            "~0:0\r\n"
+            "Saving Environment to SPI Flash... done\r\nOK\r\n~1:0\r\n"
+            "ping failed; host 10.0.0.1 is not alive\r\n~2:1\r\n=> ")
+    results = parse_batch_output(text, batch)
+    assert [r.status for r in results] == [0, 0, 1]
+    assert [r.error for r in results] == [None, None, "ping failed; host 10.0.0.1 is not alive"]
+    assert results[1].output == "Saving Environment to SPI Flash... done\r\nOK"
+
+
+def test_parse_output_without_hush():
+    # $? is not expanded: no status, errors come from the output alone
+    batch = [(0, "foo"), (1, "setenv a 1")]
+    text = "foo;echo ~0:$?;setenv a 1;echo ~1:$?\r\nUnknown command 'foo' - try 'help'\r\n~0:$?\r\n~1:$?\r\n"
+    results = parse_batch_output(text, batch)
+    assert [r.status for r in results] == [None, None]
+    assert results[0].error == "Unknown command 'foo' - try 'help'"
+    assert results[1].error is None
+
+
+def test_parse_output_missing_marker():
+    batch = [(0, "setenv a 1"), (1, "tftpboot 0x80000000 big.bin")]
+    results = parse_batch_output(build_line(batch) + "\r\n~0:0\r\nLoading: ####", batch)
+    assert results[0].error is None
+    assert results[1].status is None
+    assert results[1].error == "no output marker (command did not finish)"
+
+
+def test_nonzero_status_without_message():
+    batch = [(0, "itest 1 -eq 2")]
+    results = parse_batch_output(build_line(batch) + "\r\n~0:1\r\n", batch)
+    assert results[0].error == "exit status 1"
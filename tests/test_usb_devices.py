@@ -0,0 +1,63 @@
+"""Parsing the DUT's `lsusb` output and matching it against the expected devices."""
+
+from usb_devices import USBDevice, match_devices, parse_lsusb
+
+LSUSB = (
+    "root@OpenWrt:/# lsusb\r\n"
+    "Bus 001 Device 001: ID 1d6b:0002 Linux 6.6.73 ehci_hcd EHCI Host Controller\r\n"
+    "Bus 001 Device 002: ID 1E0E:9001 SimTech, Incorp.\r\n"
+    "Bus 001 Device 003: ID 2e8a:000a Raspberry Pi RP2040\r\n"
+    "Bus 002 Device 001: ID 1d6b:0001 Linux 6.6.73 ohci_hcd OHCI Host Controller\r\n"
+    "Bus 002 Device 004: ID 2fe3:0100\r\n"
+    "root@OpenWrt:/# "
+)
+
+
+def test_parse_lsusb():
+    devices = parse_lsusb(LSUSB)
+    assert devices == [
+        USBDevice(1, 2, "1e0e", "9001", "SimTech, Incorp."),
+        USBDevice(1, 3, "2e8a", "000a", "Raspberry Pi RP2040"),
+        USBDevice(2, 4, "2fe3", "0100", ""),
+    ]
+    assert devices[0].id == "1e0e:9001"
+    assert str(devices[0]) == "1e0e:9001 SimTech, Incorp."
+    assert str(devices[2]) == "2fe3:0100"
+
+
+def test_parse_lsusb_ignores_other_lines():
+    assert parse_lsusb("lsusb\r\n-ash: lsusb: not found\r\nroot@OpenWrt:/# ") == []
+    # Only root hubs: nothing plugged in
+    assert parse_lsusb("Bus 001 Device 001: ID 1d6b:0002 Linux Foundation 2.0 root hub\n") == []
+
+
+def test_match_by_id_or_description():
+    devices = parse_lsusb(LSUSB)
+    found, missing = match_devices(devices, [r"1e0e:9001|SimTech", r"Raspberry Pi", r"^2fe3:0100"])
+    assert missing == []
+    assert found["1e0e:9001|SimTech"].device == 2
+    assert found["Raspberry Pi"].id == "2e8a:000a"
+    assert found["^2fe3:0100"].bus == 2
+
+
+def test_missing_device_is_reported():
+    devices = parse_lsusb(LSUSB.replace("Bus 001 Device 003: ID 2e8a:000a Raspberry Pi RP2040\r\n", ""))
+    found, missing = match_devices(devices, [r"SimTech", r"Raspberry Pi"])
+    assert list(found) == ["SimTech"]
+    assert missing == ["Raspberry Pi"]
+
+
+def test_each_device_satisfies_one_expectation():
+    devices = parse_lsusb("Bus 001 Device 002: ID 2e8a:000a Raspberry Pi RP2040\r\n")
+    found, missing = match_devices(devices, [r"2e8a:", r"Raspberry Pi"])
+    assert list(found) == ["2e8a:"]
+    assert missing == ["Raspberry Pi"]
+    # Two identical boards satisfy two identical expectations
+    devices = parse_lsusb("Bus 001 Device 002: ID 2e8a:000a RP2040\r\nBus 001 Device 003: ID 2e8a:000a RP2040\r\n")
+    found, missing = match_devices(devices, [r"RP2040", r"2e8a:000a"])
+    assert missing == []
+    assert {d.device for d in found.values()} == {2, 3}
+
+
+def test_nothing_expected():
+    assert match_devices(parse_lsusb(LSUSB), []) == ({}, [])
@@ -0,0 +1,111 @@
+"""XBee API frame build/decode and the U-Boot `md` output it is read back from."""
+
+import pytest
+
+from xbee_api import (
+    UART2_DAT,
+    FrameDecoder,
+    FrameError,
+    at_command_frame,
+    build_frame,
+    checksum,
+    fifo_rx_count,
+    parse_at_response,
+    parse_md_words,
+    uart_write_commands,
+)
+
+# ATVR with frame id 1, as in the XBee manual
+VR_FRAME = bytes.fromhex("7E 00 04 08 01 56 52 4E")
+# Its response: firmware version 0x200A
+VR_RESPONSE = build_frame(bytes.fromhex("88 01 56 52 00 20 0A"))
+
+
+def test_checksum():
+    assert checksum(bytes.fromhex("08 01 56 52")) == 0x4E
+    # Frame data plus its checksum always sums to 0xFF
+    data = bytes(range(40))
+    assert (sum(data) + checksum(data)) & 0xFF == 0xFF
+
+
+def test_at_command_frame():
+    assert at_command_frame("VR", frame_id=1) == VR_FRAME
+    frame = at_command_frame("NI", frame_id=7, parameter=b"IG")
+    assert frame[:3] == bytes([0x7E, 0x00, 0x06])
+    assert frame[3:-1] == b"\x08\x07NIIG"
+
+
+@pytest.mark.parametrize("command, frame_id", [("V", 1), ("VRX", 1), ("VR", 0), ("VR", 256)])
+def test_at_command_frame_rejects(command, frame_id):
+    with pytest.raises(ValueError):
+        at_command_frame(command, frame_id=frame_id)
+
+
+def test_decode_response():
+    frames = FrameDecoder().feed(VR_RESPONSE)
+    assert len(frames) == 1
+    response = parse_at_response(frames[0])
+    assert (response.frame_id, response.command, response.value) == (1, "VR", b"\x20\x0a")
+    assert response.ok
+    assert response.status_text == "OK"
+
+
+def test_decode_byte_by_byte_with_noise():
+    decoder = FrameDecoder()
+    frames = []
+    for byte in b"\x00\x13garbage" + VR_RESPONSE + b"\xff" + VR_FRAME:
+        frames += decoder.feed(bytes([byte]))
+    assert frames == [VR_RESPONSE[3:-1], VR_FRAME[3:-1]]
+    assert decoder.errors == 0
+
+
+def test_bad_checksum_is_dropped_and_decoder_resyncs():
+    corrupted = VR_RESPONSE[:-1] + bytes([VR_RESPONSE[-1] ^ 0x01])
+    decoder = FrameDecoder()
+    assert decoder.feed(corrupted + VR_RESPONSE) == [VR_RESPONSE[3:-1]]
+    assert decoder.errors == 1
+
+
+def test_implausible_length_is_skipped():
+    # A 0x7E inside other data, followed by a length no frame can have
+    decoder = FrameDecoder()
+    assert decoder.feed(b"\x7e\xff\xff" + VR_RESPONSE) == [VR_RESPONSE[3:-1]]
+
+
+def test_incomplete_frame_waits_for_the_rest():
+    decoder = FrameDecoder()
+    assert decoder.feed(VR_RESPONSE[:5]) == []
+    assert decoder.feed(VR_RESPONSE[5:]) == [VR_RESPONSE[3:-1]]
+
+
+def test_parse_at_response_other_types():
+    assert parse_at_response(bytes.fromhex("8A 06")) is None        # modem status
+    with pytest.raises(FrameError):
+        parse_at_response(bytes.fromhex("88 01 56"))
+    error = parse_at_response(bytes.fromhex("88 01 58 58 02"))
+    assert not error.ok
+    assert error.status_text == "invalid command"
+    assert parse_at_response(bytes.fromhex("88 01 56 52 09")).status_text == "status 9"
+
+
+def test_uart_write_commands():
+    assert uart_write_commands(VR_FRAME[:2]) == [f"mw {UART2_DAT:#x} 0x7e", f"mw {UART2_DAT:#x} 0x00"]
+    assert len(uart_write_commands(VR_FRAME)) == len(VR_FRAME)
+
+
+def test_fifo_rx_count():
+    assert fifo_rx_count(1 << 14) == 0                  # RX empty
+    assert fifo_rx_count(5 << 8) == 5
+    assert fifo_rx_count(0) == 1                        # not empty, pointer wrapped: at least one byte
+
+
+def test_parse_md_words():
+    text = ("=> md 0xb0072000 1\r\n"
+            "b0072000: 0000007e    ~...\r\n"
+            "=> md 0xb0072018 1\r\n"
+            "b0072018: 00004000    .@..\r\n"
+            "=> md 0xb0072000 1\r\n"
+            "B0072000: 0000000A    ....\r\n")
+    assert parse_md_words(text, UART2_DAT) == [0x7E, 0x0A]
+    assert parse_md_words(text, 0xb0072018) == [0x4000]
+    assert parse_md_words("Unknown command 'md'", UART2_DAT) == []